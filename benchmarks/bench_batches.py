@@ -0,0 +1,56 @@
+"""
+Records/sec of the dictionary stream against iter_batches() column batches.
+
+    dicts: iterate the parser, building one nested dictionary per record
+    batches: StackExchangeParser.iter_batches, numpy arrays and lists per batch
+
+    python benchmarks/bench_batches.py --questions 20000 --batch-size 10000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).absolute().parents[1]))
+sys.path.insert(0, str(Path(__file__).absolute().parent))
+
+from separser import StackExchangeParser  # noqa: E402
+from synthetic import write_dump  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=20000, help='number of questions in the synthetic dump')
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--content-type', default='post_both')
+    parser.add_argument('--repeat', type=int, default=3, help='best of this many runs is reported')
+    args = parser.parse_args()
+    import numpy  # noqa: F401, imported up front so the batches are not timed with it
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = write_dump(tmp, questions=args.questions)
+        key = 'Comments' if args.content_type.startswith('comments') else 'Posts'
+
+        def stream():
+            return StackExchangeParser(files[key].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp,
+                                       content_type=args.content_type, reader='lines')
+
+        methods = [('dicts', lambda: sum(1 for _ in stream())),
+                   ('batches', lambda: sum(len(batch['Id']) for batch in stream().iter_batches(args.batch_size)))]
+        print('{:>8} {:>10} {:>10} {:>12} {:>8}'.format('output', 'records', 'seconds', 'records/s', 'speedup'))
+        baseline = None
+        for name, method in methods:
+            best = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                records = method()
+                seconds = time.perf_counter() - start
+                best = seconds if best is None else min(best, seconds)
+            baseline = baseline or best
+            print('{:>8} {:>10} {:>10.2f} {:>12.0f} {:>8.2f}'.format(name, records, best, records / best,
+                                                                    baseline / best))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Texts/sec of the HTML to text cleaning done for every record.
+
+    legacy: a fresh TagStripper (HTMLParser) per text followed by the newline regex, as _clean_text used to do
+    clean: TextCleaner.clean called once per text
+    clean_batch: TextCleaner.clean_batch called once on every text
+
+Also checks that the cleaner gives the same text as the legacy path for every body in the dump.
+
+    python benchmarks/bench_cleaner.py --questions 20000
+"""
+import argparse
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).absolute().parents[1]))
+sys.path.insert(0, str(Path(__file__).absolute().parent))
+
+from separser.utils import LineReader, TagStripper, TextCleaner  # noqa: E402
+from synthetic import write_dump  # noqa: E402
+
+NEWLINE = re.compile(r'\n+')
+
+
+def legacy_clean(text, newlines=True):
+    stripper = TagStripper()
+    stripper.feed(text)
+    return NEWLINE.sub('\n' if newlines else ' ', stripper.get_data())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=20000, help='number of questions in the synthetic dump')
+    parser.add_argument('--repeat', type=int, default=3, help='best of this many runs is reported')
+    parser.add_argument('--no-newlines', dest='newlines', action='store_false', help='time newlines=False')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_dump(tmp, questions=args.questions)['Posts']
+        texts = [atb['Body'] for atb in LineReader(path, fields={'Body'}) if 'Body' in atb]
+    cleaner = TextCleaner(newlines=args.newlines)
+    expected = [legacy_clean(text, args.newlines) for text in texts]
+    assert cleaner.clean_batch(texts) == expected, 'TextCleaner output differs from TagStripper'
+
+    methods = [('legacy', lambda: [legacy_clean(text, args.newlines) for text in texts]),
+               ('clean', lambda: [cleaner.clean(text) for text in texts]),
+               ('clean_batch', lambda: cleaner.clean_batch(texts))]
+    print('{:>12} {:>10} {:>10} {:>12} {:>8}'.format('method', 'texts', 'seconds', 'texts/s', 'speedup'))
+    baseline = None
+    for name, method in methods:
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            method()
+            seconds = time.perf_counter() - start
+            best = seconds if best is None else min(best, seconds)
+        baseline = baseline or best
+        print('{:>12} {:>10} {:>10.3f} {:>12.0f} {:>8.2f}'.format(name, len(texts), best, len(texts) / best,
+                                                                 baseline / best))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Scaling benchmark for the all_text comment join.
+
+Builds synthetic dumps of increasing size and times the CommentIndex build plus one lookup per post. The time per
+post stays flat as the dump grows. The legacy per-post XPath scan over the Comments tree is timed for the smaller
+sizes to show the quadratic behaviour it replaces.
+
+    python benchmarks/bench_comment_index.py --sizes 5000 10000 20000 40000 --legacy-max 5000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from xml.etree import ElementTree as ET
+
+sys.path.insert(0, str(Path(__file__).absolute().parents[1]))
+sys.path.insert(0, str(Path(__file__).absolute().parent))
+
+from separser.utils import CommentIndex, iterparse_rows  # noqa: E402
+from synthetic import write_dump  # noqa: E402
+
+
+def post_ids(posts_path):
+    return [atb['Id'] for atb in iterparse_rows(posts_path.as_posix()) if int(atb.get('CommentCount', 0)) > 0]
+
+
+def bench_index(files, ids):
+    start = time.perf_counter()
+    index = CommentIndex.from_xml(files['Comments'].as_posix())
+    built = time.perf_counter()
+    found = sum(len(index.get(i)) for i in ids)
+    return built - start, time.perf_counter() - built, found
+
+
+def bench_legacy(files, ids):
+    start = time.perf_counter()
+    tree = ET.parse(files['Comments'].as_posix()).getroot()
+    built = time.perf_counter()
+    found = sum(len(tree.findall("*[@PostId='{}']".format(i))) for i in ids)
+    return built - start, time.perf_counter() - built, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5000, 10000, 20000, 40000],
+                        help='number of questions in each synthetic dump')
+    parser.add_argument('--legacy-max', type=int, default=5000,
+                        help='largest size at which to also time the legacy XPath scan')
+    args = parser.parse_args()
+
+    print('{:>10} {:>10} {:>10} {:>10} {:>12} {:>12}'.format('questions', 'posts', 'comments', 'method', 'seconds',
+                                                             'us/post'))
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            files = write_dump(Path(tmp).joinpath(str(size)), questions=size)
+            ids = post_ids(files['Posts'])
+            n_posts = sum(1 for _ in iterparse_rows(files['Posts'].as_posix()))
+            methods = [('index', bench_index)]
+            if size <= args.legacy_max:
+                methods.append(('legacy', bench_legacy))
+            for name, method in methods:
+                build, lookup, found = method(files, ids)
+                total = build + lookup
+                print('{:>10} {:>10} {:>10} {:>10} {:>12.3f} {:>12.2f}'.format(size, n_posts, found, name, total,
+                                                                             1e6 * total / n_posts))
+
+
+if __name__ == '__main__':
+    main()
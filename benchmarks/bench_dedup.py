@@ -0,0 +1,75 @@
+"""
+Cost and accuracy of the dedup store.
+
+Parses a synthetic Posts.xml without dedup, with dedup into an empty store and again into the store the first dedup
+run filled, as the next run on the same community would. Then fills stores sized for --capacity texts at several
+error rates, and measures the share of other, new texts each takes for duplicates, its size and the memory it took.
+
+    python benchmarks/bench_dedup.py --questions 20000 --capacity 1000000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).absolute().parents[1]))
+sys.path.insert(0, str(Path(__file__).absolute().parent))
+
+from separser import StackExchangeParser  # noqa: E402
+from separser.utils import DedupStore  # noqa: E402
+from synthetic import write_dump  # noqa: E402
+
+
+def resident_mb():
+    # Current, not peak, resident set size, as the store's pages are mapped in
+    try:
+        with open('/proc/self/statm') as sf:
+            return int(sf.read().split()[1]) * 4096 / 1024**2
+    except OSError:
+        return float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=20000, help='number of questions in the synthetic dump')
+    parser.add_argument('--capacity', type=int, default=1000000, help='texts added to each store')
+    parser.add_argument('--probes', type=int, default=200000, help='new texts checked against each store')
+    parser.add_argument('--content-type', default='post_both')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_dump(tmp, questions=args.questions)['Posts'].as_posix()
+
+        print('{:>12} {:>10} {:>10} {:>8}'.format('run', 'records', 'seconds', 'speedup'))
+        baseline = None
+        for run, kwargs in (('plain', {}), ('dedup', {'dedup': True}), ('dedup again', {'dedup': True})):
+            stream = StackExchangeParser(path, 'synthetic.stackexchange.com', proj_dir=tmp,
+                                         content_type=args.content_type, **kwargs)
+            start = time.perf_counter()
+            records = sum(1 for _ in stream)
+            seconds = time.perf_counter() - start
+            baseline = baseline or seconds
+            print('{:>12} {:>10} {:>10.2f} {:>8.2f}'.format(run, records, seconds, baseline / seconds))
+
+        print('\n{:>10} {:>10} {:>12} {:>12} {:>10} {:>10} {:>10}'.format(
+            'error', 'texts', 'expected fp', 'measured fp', 'file MB', 'RSS MB', 'us/add'))
+        for error_rate in (0.01, 0.001, 0.0001):
+            store_path = Path(tmp, 'stores', '{}.bloom'.format(error_rate))
+            store = DedupStore(store_path, capacity=args.capacity, error_rate=error_rate)
+            before = resident_mb()
+            start = time.perf_counter()
+            for i in range(args.capacity):
+                store.add('<p>text {} of the store</p>'.format(i))
+            per_add = (time.perf_counter() - start) / args.capacity * 1e6
+            grown = resident_mb() - before
+            false_positives = sum('<p>new text {}</p>'.format(i) in store for i in range(args.probes))
+            stats = store.stats
+            print('{:>10} {:>10} {:>12.5f} {:>12.5f} {:>10.1f} {:>10.1f} {:>10.2f}'.format(
+                error_rate, stats['entries'], stats['false_positive_rate'], false_positives / args.probes,
+                stats['bytes'] / 1024**2, grown, per_add))
+            store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Cost of a delta parse of a new dump against a full parse of it.
+
+Writes a synthetic Posts.xml, saves its activity index with a first delta parse, then writes a "next dump" with
+--changed of the rows touched and times a full parse of it against a delta parse, for each reader.
+
+    python benchmarks/bench_delta.py --questions 20000 --changed 0.05
+"""
+import argparse
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).absolute().parents[1]))
+sys.path.insert(0, str(Path(__file__).absolute().parent))
+
+from separser import StackExchangeParser  # noqa: E402
+from synthetic import write_dump  # noqa: E402
+
+ACTIVITY = re.compile(rb'LastActivityDate="[^"]*"')
+
+
+def touch(path, fraction, seed=0):
+    # Move the LastActivityDate of a fraction of the rows past every date of the dump
+    rng = random.Random(seed)
+    with open(path, 'rb') as xf:
+        lines = xf.readlines()
+    with open(path, 'wb') as xf:
+        for line in lines:
+            if line.lstrip().startswith(b'<row') and rng.random() < fraction:
+                line = ACTIVITY.sub(b'LastActivityDate="2099-01-01T00:00:00.000"', line)
+            xf.write(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=20000, help='number of questions in the synthetic dump')
+    parser.add_argument('--changed', type=float, default=0.05, help='fraction of rows changed in the next dump')
+    parser.add_argument('--content-type', default='post_both')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_dump(tmp, questions=args.questions)['Posts'].as_posix()
+
+        def stream(reader, **kwargs):
+            return StackExchangeParser(path, 'synthetic.stackexchange.com', proj_dir=tmp,
+                                       content_type=args.content_type, reader=reader, **kwargs)
+
+        for _ in stream('lines', delta=True):
+            pass
+        touch(path, args.changed)
+
+        print('{:>10} {:>8} {:>10} {:>10} {:>8}'.format('reader', 'mode', 'records', 'seconds', 'speedup'))
+        for reader in ('iterparse', 'lines'):
+            baseline = None
+            for mode in ('full', 'delta'):
+                kwargs = {'delta': True} if mode == 'delta' else {}
+                if mode == 'delta':
+                    # Every delta run saves the index it compares the next dump with, so start from the same one
+                    saved = Path(tmp, 'activity').joinpath('synthetic.stackexchange.com_Posts.idx')
+                    index = saved.read_bytes()
+                start = time.perf_counter()
+                records = sum(1 for _ in stream(reader, **kwargs))
+                seconds = time.perf_counter() - start
+                if mode == 'delta':
+                    saved.write_bytes(index)
+                baseline = baseline or seconds
+                print('{:>10} {:>8} {:>10} {:>10.2f} {:>8.2f}'.format(reader, mode, records, seconds,
+                                                                      baseline / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Records/sec of re-parsing a dump against reading back an export of it.
+
+    parse: iterate a StackExchangeParser over Posts.xml
+    export: StackExchangeParser.export to each format, timed once
+    read: separser.utils.read_shards over the export
+
+    python benchmarks/bench_export.py --questions 20000 --workers 2
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).absolute().parents[1]))
+sys.path.insert(0, str(Path(__file__).absolute().parent))
+
+from separser import StackExchangeParser  # noqa: E402
+from separser.utils import read_shards  # noqa: E402
+from synthetic import write_dump  # noqa: E402
+
+FORMATS = [('jsonl', None), ('jsonl', 'gzip'), ('jsonl', 'zstd'), ('parquet', 'snappy'), ('parquet', 'zstd')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=20000, help='number of questions in the synthetic dump')
+    parser.add_argument('--content-type', default='post_both')
+    parser.add_argument('--shard-size', type=int, default=16, help='MB of text per shard')
+    parser.add_argument('--workers', type=int, default=2, help='shards written at the same time')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = write_dump(tmp, questions=args.questions)
+
+        def stream():
+            return StackExchangeParser(files['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp,
+                                       content_type=args.content_type)
+
+        start = time.perf_counter()
+        records = sum(1 for _ in stream())
+        seconds = time.perf_counter() - start
+        print('{:>16} {:>10} {:>10} {:>12} {:>10}'.format('', 'records', 'seconds', 'records/s', 'MB'))
+        print('{:>16} {:>10} {:>10.2f} {:>12.0f} {:>10.1f}'.format('parse', records, seconds, records / seconds,
+                                                                  files['Posts'].stat().st_size / 1024**2))
+        for file_format, compression in FORMATS:
+            name = '{} {}'.format(file_format, compression or '')
+            directory = Path(tmp).joinpath('export', name.replace(' ', '_'))
+            try:
+                start = time.perf_counter()
+                manifest = stream().export(directory, file_format=file_format, compression=compression,
+                                           shard_size=args.shard_size, workers=args.workers)
+                written = time.perf_counter() - start
+            except ImportError as e:
+                print('{:>16} skipped, {}'.format(name, e))
+                continue
+            size = sum(shard['bytes'] for shard in manifest['shards']) / 1024**2
+            start = time.perf_counter()
+            records = sum(1 for _ in read_shards(directory))
+            seconds = time.perf_counter() - start
+            print('{:>16} {:>10} {:>10.2f} {:>12.0f} {:>10.1f}   (export {:.2f}s, {} shards)'.format(
+                name, records, seconds, records / seconds, size, written, len(manifest['shards'])))
+
+
+if __name__ == '__main__':
+    main()
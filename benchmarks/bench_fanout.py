@@ -0,0 +1,52 @@
+"""
+One fan-out parse of a synthetic Posts.xml into several views against a separate parse for each view.
+
+    python benchmarks/bench_fanout.py --questions 20000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).absolute().parents[1]))
+sys.path.insert(0, str(Path(__file__).absolute().parent))
+
+from separser import StackExchangeParser  # noqa: E402
+from synthetic import write_dump  # noqa: E402
+
+VIEWS = {'titles': {'content_type': 'post_title'},
+         'bodies': {'content_type': 'post_body'},
+         'both': {'content_type': 'post_both'}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=20000, help='number of questions in the synthetic dump')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_dump(tmp, questions=args.questions)['Posts'].as_posix()
+
+        def stream(reader, **kwargs):
+            return StackExchangeParser(path, 'synthetic.stackexchange.com', proj_dir=tmp, reader=reader, **kwargs)
+
+        print('{:>10} {:>10} {:>10} {:>10} {:>8}'.format('reader', 'mode', 'records', 'seconds', 'speedup'))
+        for reader in ('iterparse', 'lines'):
+            start = time.perf_counter()
+            separate = {name: list(stream(reader, **view)) for name, view in VIEWS.items()}
+            baseline = time.perf_counter() - start
+            print('{:>10} {:>10} {:>10} {:>10.2f} {:>8.2f}'.format(
+                reader, 'separate', sum(len(records) for records in separate.values()), baseline, 1))
+
+            start = time.perf_counter()
+            views = {name: [] for name in VIEWS}
+            stream(reader).fan_out(VIEWS, {name: records.append for name, records in views.items()})
+            seconds = time.perf_counter() - start
+            assert views == separate, 'the views differ from the separate parses'
+            print('{:>10} {:>10} {:>10} {:>10.2f} {:>8.2f}'.format(
+                reader, 'fan-out', sum(len(records) for records in views.values()), seconds, baseline / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Cost of the rows a RowFilter rejects.
+
+Times a full parse of a synthetic Posts.xml against parses with filters that keep a shrinking share of the rows, for
+each reader. Rejected rows should cost close to nothing next to the ones that are cleaned and built into records.
+
+    python benchmarks/bench_filters.py --questions 20000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).absolute().parents[1]))
+sys.path.insert(0, str(Path(__file__).absolute().parent))
+
+from separser import StackExchangeParser  # noqa: E402
+from synthetic import write_dump  # noqa: E402
+
+FILTERS = [None, {'post_types': 2}, {'min_score': 15}, {'created_from': '2019', 'created_before': '2020'},
+           {'min_score': 15, 'post_types': 2, 'tags': 'python'}]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=20000, help='number of questions in the synthetic dump')
+    parser.add_argument('--content-type', default='post_both')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_dump(tmp, questions=args.questions)['Posts'].as_posix()
+
+        print('{:>10} {:>10} {:>10} {:>10}  {}'.format('reader', 'records', 'seconds', 'speedup', 'filters'))
+        for reader in ('iterparse', 'lines'):
+            baseline = None
+            for filters in FILTERS:
+                start = time.perf_counter()
+                records = sum(1 for _ in StackExchangeParser(path, 'synthetic.stackexchange.com', proj_dir=tmp,
+                                                             content_type=args.content_type, reader=reader,
+                                                             filters=filters))
+                seconds = time.perf_counter() - start
+                baseline = baseline or seconds
+                print('{:>10} {:>10} {:>10.2f} {:>10.2f}  {}'.format(reader, records, seconds, baseline / seconds,
+                                                                    filters))
+
+
+if __name__ == '__main__':
+    main()
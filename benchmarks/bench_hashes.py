@@ -0,0 +1,52 @@
+"""
+Cost of setting Prodigy hashes on every record, and the time saved by skipping already annotated tasks on a restart.
+
+Parses a synthetic Posts.xml without hashes, with hashes, and with the hashes of the first --known of the records
+passed as known_hashes, as a restarted annotation session would.
+
+    python benchmarks/bench_hashes.py --questions 20000 --known 0.9
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).absolute().parents[1]))
+sys.path.insert(0, str(Path(__file__).absolute().parent))
+
+from separser import StackExchangeParser  # noqa: E402
+from synthetic import write_dump  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=20000, help='number of questions in the synthetic dump')
+    parser.add_argument('--known', type=float, default=0.9, help='fraction of the records already annotated')
+    parser.add_argument('--content-type', default='post_both')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_dump(tmp, questions=args.questions)['Posts'].as_posix()
+
+        def stream(reader, **kwargs):
+            return StackExchangeParser(path, 'synthetic.stackexchange.com', proj_dir=tmp,
+                                       content_type=args.content_type, reader=reader, **kwargs)
+
+        print('{:>10} {:>10} {:>10} {:>10} {:>8}'.format('reader', 'mode', 'records', 'seconds', 'speedup'))
+        for reader in ('iterparse', 'lines'):
+            hashes = [record['_input_hash'] for record in stream(reader, hashes=True)]
+            known = set(hashes[:int(len(hashes) * args.known)])
+            baseline = None
+            for mode, kwargs in (('plain', {}), ('hashes', {'hashes': True}),
+                                 ('known', {'hashes': True, 'known_hashes': known})):
+                start = time.perf_counter()
+                records = sum(1 for _ in stream(reader, **kwargs))
+                seconds = time.perf_counter() - start
+                baseline = baseline or seconds
+                print('{:>10} {:>10} {:>10} {:>10.2f} {:>8.2f}'.format(reader, mode, records, seconds,
+                                                                      baseline / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Latency of get_post and get_thread through the post index, with a warm and a cold page cache.
+
+The cold runs ask the kernel to drop the cached pages of the xml files before every lookup (posix_fadvise
+DONTNEED, which needs no privileges but only drops clean pages, and is not available on every OS). The index file
+itself stays mapped, as it would in a long running process.
+
+    python benchmarks/bench_lookup.py --questions 20000 --lookups 2000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).absolute().parents[1]))
+sys.path.insert(0, str(Path(__file__).absolute().parent))
+
+from separser import StackExchangeParser  # noqa: E402
+from synthetic import write_dump  # noqa: E402
+
+
+def drop_cache(paths):
+    for path in paths:
+        fd = os.open(path.as_posix(), os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def percentiles(seconds):
+    seconds = sorted(seconds)
+    return [seconds[min(int(len(seconds) * q), len(seconds) - 1)] * 1000 for q in (0.5, 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=20000, help='number of questions in the synthetic dump')
+    parser.add_argument('--lookups', type=int, default=2000, help='lookups per measurement')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = write_dump(tmp, questions=args.questions)
+        stream = StackExchangeParser(files['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp,
+                                     content_type='post_both')
+        start = time.perf_counter()
+        ids = [record['meta']['Id'] for record in stream]
+        print('streaming the whole file: {:.2f}s'.format(time.perf_counter() - start))
+
+        lookup = StackExchangeParser(files['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp,
+                                     content_type='post_both')
+        start = time.perf_counter()
+        index = lookup.post_index
+        print('post index built in {:.2f}s, {} posts'.format(time.perf_counter() - start, len(index)))
+
+        rng = random.Random(0)
+        cold = hasattr(os, 'posix_fadvise')
+        print('{:>12} {:>6} {:>10} {:>10}'.format('', 'cache', 'p50 ms', 'p99 ms'))
+        for name, method in (('get_post', lookup.get_post), ('get_thread', lookup.get_thread)):
+            for cache in ('warm', 'cold'):
+                if cache == 'cold' and not cold:
+                    print('{:>12} {:>6} {:>10}'.format(name, cache, 'n/a'))
+                    continue
+                sample = [rng.choice(ids) for _ in range(args.lookups if cache == 'warm' else args.lookups // 4)]
+                for post_id in sample[:100]:
+                    method(post_id)  # Warm up the page cache and the index
+                seconds = []
+                for post_id in sample:
+                    if cache == 'cold':
+                        drop_cache([files['Posts'], files['Comments']])
+                    start = time.perf_counter()
+                    method(post_id)
+                    seconds.append(time.perf_counter() - start)
+                print('{:>12} {:>6} {:>10.3f} {:>10.3f}'.format(name, cache, *percentiles(seconds)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Memory footprint of streaming a large Posts.xml.
+
+Each reader runs in its own process over the same synthetic dump, and the resident set size is printed every
+--every rows. The legacy loop clears each row but leaves it attached to the root element, so its footprint grows with
+the row count. TreeReader and LineReader stay flat.
+
+    python benchmarks/bench_memory.py --questions 200000 --every 100000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from xml.etree import ElementTree as ET
+
+sys.path.insert(0, str(Path(__file__).absolute().parents[1]))
+sys.path.insert(0, str(Path(__file__).absolute().parent))
+
+from separser.utils import LineReader, TreeReader, peak_rss  # noqa: E402
+from synthetic import write_dump  # noqa: E402
+
+
+def current_rss():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024**2
+    except (OSError, ValueError, AttributeError):
+        return peak_rss()
+
+
+def legacy_rows(path):
+    for _, child in ET.iterparse(path, events=['end']):
+        if child.tag == 'row':
+            yield child.attrib
+        child.clear()
+
+
+def measure(reader, path, every):
+    rows = {'legacy': legacy_rows, 'tree': TreeReader, 'lines': LineReader}[reader](path)
+    n = 0
+    for n, _ in enumerate(rows, 1):
+        if n % every == 0:
+            print('{:>8} {:>12} {:>12.1f}'.format(reader, n, current_rss()), flush=True)
+    print('{:>8} {:>12} {:>12.1f} peak {:.1f} MB'.format(reader, n, current_rss(), peak_rss() or 0), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=200000, help='number of questions in the synthetic dump')
+    parser.add_argument('--every', type=int, default=100000, help='print the resident set size every this many rows')
+    parser.add_argument('--measure', nargs=2, metavar=('READER', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        return measure(args.measure[0], args.measure[1], args.every)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_dump(tmp, questions=args.questions, comments_per_post=0)['Posts'].as_posix()
+        print('{:>8} {:>12} {:>12}'.format('reader', 'rows', 'RSS MB'))
+        for reader in ('legacy', 'tree', 'lines'):
+            subprocess.check_call([sys.executable, __file__, '--every', str(args.every), '--measure', reader, path])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Throughput of the byte range parsing engine for increasing numbers of worker processes.
+
+Writes a synthetic Posts.xml and parses it with splits=0 (a single process) and then with each requested number of
+worker processes, printing records/sec and the speed up over the single process run.
+
+    python benchmarks/bench_parallel.py --questions 50000 --splits 1 2 4 8
+"""
+import argparse
+import sys
+import tempfile
+import time
+from multiprocessing import cpu_count
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).absolute().parents[1]))
+sys.path.insert(0, str(Path(__file__).absolute().parent))
+
+from separser import StackExchangeParser  # noqa: E402
+from synthetic import write_dump  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=50000, help='number of questions in the synthetic dump')
+    parser.add_argument('--splits', type=int, nargs='+', default=sorted({1, 2, cpu_count()}),
+                        help='numbers of worker processes to time')
+    parser.add_argument('--content-type', default='post_both')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = write_dump(tmp, questions=args.questions)
+        size = files['Posts'].stat().st_size / 1024**2
+        print('{:.1f} MB Posts.xml, {} CPUs'.format(size, cpu_count()))
+        print('{:>8} {:>10} {:>10} {:>12} {:>8}'.format('splits', 'records', 'seconds', 'records/s', 'speedup'))
+        baseline = None
+        for splits in [0] + args.splits:
+            start = time.perf_counter()
+            stream = StackExchangeParser(files['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp,
+                                         content_type=args.content_type, splits=splits)
+            records = sum(1 for _ in stream)
+            seconds = time.perf_counter() - start
+            baseline = baseline or seconds
+            print('{:>8} {:>10} {:>10.2f} {:>12.0f} {:>8.2f}'.format(splits, records, seconds, records / seconds,
+                                                                    baseline / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Throughput of the pipelined mode against parsing, enriching and cleaning each record in turn.
+
+The parse and enrich stages are threads and share the GIL, so the gain comes from cleaning text in the worker
+processes while the threads read the next batches. Expect no gain on a single core.
+
+    python benchmarks/bench_pipeline.py --questions 20000 --pipeline 0 2 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).absolute().parents[1]))
+sys.path.insert(0, str(Path(__file__).absolute().parent))
+
+from separser import StackExchangeParser  # noqa: E402
+from synthetic import write_dump  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=20000, help='number of questions in the synthetic dump')
+    parser.add_argument('--pipeline', type=int, nargs='+', default=[0, 2, 4], help='pipeline values to compare')
+    parser.add_argument('--content-type', default='post_both')
+    parser.add_argument('--reader', default='iterparse')
+    args = parser.parse_args()
+
+    print('{} cpus'.format(os.cpu_count()))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_dump(tmp, questions=args.questions)['Posts'].as_posix()
+
+        print('{:>10} {:>10} {:>10} {:>12} {:>10}'.format('pipeline', 'records', 'seconds', 'records/s', 'speedup'))
+        baseline = None
+        for pipeline in args.pipeline:
+            start = time.perf_counter()
+            records = sum(1 for _ in StackExchangeParser(path, 'synthetic.stackexchange.com', proj_dir=tmp,
+                                                         content_type=args.content_type, reader=args.reader,
+                                                         pipeline=pipeline))
+            seconds = time.perf_counter() - start
+            baseline = baseline or seconds
+            print('{:>10} {:>10} {:>10.2f} {:>12.0f} {:>10.2f}'.format(pipeline, records, seconds, records / seconds,
+                                                                      baseline / seconds))
+
+
+if __name__ == '__main__':
+    main()
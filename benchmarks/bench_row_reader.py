@@ -0,0 +1,71 @@
+"""
+Rows/sec of the line-oriented LineReader against the ElementTree iterparse loop used by StackExchangeParser.
+
+    iterparse: ET.iterparse over the file, reading every row's attributes and clearing it, as __iter__ does
+    lines (all): LineReader decoding every attribute
+    lines (posts): LineReader decoding only the attributes the parser uses, skipping non Question/Answer rows raw
+    lines (titles): as lines (posts), without the Body attribute, as for content_type='post_title'
+
+    python benchmarks/bench_row_reader.py --questions 50000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from xml.etree import ElementTree as ET
+
+sys.path.insert(0, str(Path(__file__).absolute().parents[1]))
+sys.path.insert(0, str(Path(__file__).absolute().parent))
+
+from separser import StackExchangeParser  # noqa: E402
+from separser.utils import LineReader  # noqa: E402
+from synthetic import write_dump  # noqa: E402
+
+
+def bench_iterparse(path):
+    rows = 0
+    for _, child in ET.iterparse(path, events=['end']):
+        if child.tag == 'row':
+            child.attrib.get('Body', None)
+            rows += 1
+        child.clear()
+    return rows
+
+
+def bench_lines(path, fields=None, where=None):
+    reader = LineReader(path, fields=fields, where=where)
+    for atb in reader:
+        atb.get('Body', None)
+    return reader.rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=50000, help='number of questions in the synthetic dump')
+    parser.add_argument('--repeat', type=int, default=3, help='best of this many runs is reported')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_dump(tmp, questions=args.questions)['Posts'].as_posix()
+        titles = set(StackExchangeParser._POST_FIELDS) - {'Body'}
+        methods = [('iterparse', lambda: bench_iterparse(path)),
+                   ('lines (all)', lambda: bench_lines(path)),
+                   ('lines (posts)', lambda: bench_lines(path, fields=StackExchangeParser._POST_FIELDS,
+                                                         where={'PostTypeId': (1, 2)})),
+                   ('lines (titles)', lambda: bench_lines(path, fields=titles, where={'PostTypeId': (1, 2)}))]
+        print('{:>14} {:>10} {:>10} {:>12} {:>8}'.format('reader', 'rows', 'seconds', 'rows/s', 'speedup'))
+        baseline = None
+        for name, method in methods:
+            best = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                rows = method()
+                seconds = time.perf_counter() - start
+                best = seconds if best is None else min(best, seconds)
+            baseline = baseline or best
+            print('{:>14} {:>10} {:>10.3f} {:>12.0f} {:>8.2f}'.format(name, rows, best, rows / best, baseline / best))
+
+
+if __name__ == '__main__':
+    main()
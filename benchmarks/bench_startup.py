@@ -0,0 +1,64 @@
+"""
+Startup cost of a parser: importing separser, constructing a StackExchangeParser and reading its first record, each
+timed in a fresh interpreter, as a short lived Prodigy worker would pay them.
+
+    python benchmarks/bench_startup.py --questions 20000 --repeat 5
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).absolute().parent))
+
+from synthetic import write_dump  # noqa: E402
+
+ROOT = str(Path(__file__).absolute().parents[1])
+
+# Run in a fresh interpreter, prints the seconds taken by each step as json
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+from separser import StackExchangeParser
+imported = time.perf_counter()
+parser = StackExchangeParser({file!r}, 'synthetic.stackexchange.com', proj_dir={proj_dir!r},
+                             content_type={content_type!r})
+constructed = time.perf_counter()
+next(iter(parser))
+first = time.perf_counter()
+print(json.dumps({{'import': imported - start, 'construct': constructed - imported, 'first': first - constructed,
+                  'modules': sorted(m for m in ('requests', 'bs4', 'prodigy') if m in sys.modules)}}))
+"""
+
+
+def run(file, proj_dir, content_type):
+    script = SCRIPT.format(root=ROOT, file=file, proj_dir=proj_dir, content_type=content_type)
+    out = subprocess.run([sys.executable, '-c', script], check=True, stdout=subprocess.PIPE)
+    return json.loads(out.stdout.decode().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=20000, help='number of questions in the synthetic dump')
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per content_type, the best is kept')
+    parser.add_argument('--content-types', nargs='+', default=['post_both', 'all_text', 'comments_both'])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = write_dump(tmp, questions=args.questions)
+        print('{:>14} {:>10} {:>13} {:>14} {:>10}  {}'.format('content_type', 'import ms', 'construct ms',
+                                                              'first rec ms', 'total ms', 'imported'))
+        for content_type in args.content_types:
+            file = files['Comments' if 'comments' in content_type else 'Posts'].as_posix()
+            runs = [run(file, tmp, content_type) for _ in range(args.repeat)]
+            best = {step: min(r[step] for r in runs) * 1000 for step in ('import', 'construct', 'first')}
+            print('{:>14} {:>10.1f} {:>13.1f} {:>14.1f} {:>10.1f}  {}'.format(
+                content_type, best['import'], best['construct'], best['first'], sum(best.values()),
+                ', '.join(runs[-1]['modules']) or '-'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Benchmark suite over every content_type a nightly parse uses, with results written as json to compare across versions.
+
+Writes a synthetic dump (see synthetic.py), then parses it with each content_type and reader in a fresh interpreter,
+so the peak RSS of one run is not carried into the next and each pays its own setup. Each run reports the time to
+the first record from the construction of the parser, the rows and records per second of the whole parse, MB/s,
+peak RSS and the seconds of each stage from StackExchangeParser.metrics. The fastest of --repeat runs is kept.
+
+    python benchmarks/bench_suite.py --questions 20000 --output results/2.0.1.json
+    python benchmarks/bench_suite.py --questions 20000 --output results/new.json --compare results/2.0.1.json
+
+With --compare, exits with status 1 if any rows/s, time to first record or peak RSS is worse than in the given
+results by more than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).absolute().parent))
+
+from synthetic import write_dump  # noqa: E402
+
+ROOT = str(Path(__file__).absolute().parents[1])
+CONTENT_TYPES = ['post_title', 'post_body', 'post_both', 'all_text', 'comments_body', 'comments_both']
+
+# Run in a fresh interpreter, prints the measurements as json
+SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+from separser import StackExchangeParser
+from separser.utils import peak_rss
+start = time.perf_counter()
+parser = StackExchangeParser({file!r}, 'synthetic.stackexchange.com', proj_dir={proj_dir!r},
+                             content_type={content_type!r}, reader={reader!r})
+records = iter(parser)
+next(records)
+first = time.perf_counter() - start
+count = 1 + sum(1 for _ in records)
+seconds = time.perf_counter() - start
+metrics = parser.metrics
+print(json.dumps({{'records': count, 'rows': metrics['rows'], 'bytes': metrics['bytes'], 'seconds': seconds,
+                  'first_record': first, 'stages': metrics['stages'], 'peak_rss_mb': peak_rss()}}))
+"""
+
+# Measurements compared with --compare, and whether a larger value is better
+COMPARED = [('rows_per_sec', True), ('first_record_ms', False), ('peak_rss_mb', False)]
+
+
+def run(file, proj_dir, content_type, reader):
+    script = SCRIPT.format(root=ROOT, file=file, proj_dir=proj_dir, content_type=content_type, reader=reader)
+    out = subprocess.run([sys.executable, '-c', script], check=True, stdout=subprocess.PIPE)
+    result = json.loads(out.stdout.decode().splitlines()[-1])
+    seconds = result['seconds']
+    return {'content_type': content_type, 'reader': reader, 'records': result['records'], 'rows': result['rows'],
+            'seconds': seconds, 'first_record_ms': result['first_record'] * 1000,
+            'rows_per_sec': result['rows'] / seconds, 'records_per_sec': result['records'] / seconds,
+            'mb_per_sec': result['bytes'] / 1024**2 / seconds, 'peak_rss_mb': result['peak_rss_mb'],
+            'stages': result['stages']}
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=ROOT, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL).stdout.decode().strip() or None
+    except OSError:
+        commit = None
+    return {'commit': commit, 'python': platform.python_version(), 'platform': platform.platform(),
+            'cpu_count': os.cpu_count(), 'date': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def compare(results, previous, threshold):
+    """
+    Print the ratio of each measurement to the previous results
+
+    :returns: List of (content_type, reader, measurement) that got worse by more than threshold
+    """
+    before = {(r['content_type'], r['reader']): r for r in previous['results']}
+    regressions = []
+    print('\ncompared with {}'.format(previous['environment'].get('commit')))
+    print('{:>14} {:>10} {:>12} {:>16} {:>12}'.format('content_type', 'reader', 'rows/s', 'first record', 'peak RSS'))
+    for result in results:
+        old = before.get((result['content_type'], result['reader']))
+        if old is None:
+            continue
+        ratios = []
+        for key, larger_is_better in COMPARED:
+            if not old.get(key) or result.get(key) is None:
+                ratios.append('n/a')
+                continue
+            ratio = result[key] / old[key]
+            worse = ratio < 1 - threshold if larger_is_better else ratio > 1 + threshold
+            if worse:
+                regressions.append((result['content_type'], result['reader'], key))
+            ratios.append('{:.2f}x{}'.format(ratio, ' !' if worse else ''))
+        print('{:>14} {:>10} {:>12} {:>16} {:>12}'.format(result['content_type'], result['reader'], *ratios))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=20000, help='number of questions in the synthetic dump')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic dump')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per content_type and reader, the fastest is kept')
+    parser.add_argument('--content-types', nargs='+', default=CONTENT_TYPES)
+    parser.add_argument('--readers', nargs='+', default=['iterparse', 'lines'])
+    parser.add_argument('--data', help='directory to write the dump into and keep, a temporary one by default. An '
+                                       'existing dump written with the same arguments is reused.')
+    parser.add_argument('--output', help='json file to write the results to')
+    parser.add_argument('--compare', help='json results of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative change reported as a regression')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data = Path(args.data or tmp).absolute()
+        stamp = data.joinpath('synthetic.json')
+        dump = {'questions': args.questions, 'seed': args.seed}
+        if not (stamp.exists() and json.loads(stamp.read_text()) == dump):
+            write_dump(data, questions=args.questions, seed=args.seed)
+            stamp.write_text(json.dumps(dump))
+        files = {file_type: data.joinpath('synthetic_{}.xml'.format(file_type)) for file_type in ('Posts', 'Comments')}
+        dump['megabytes'] = {file_type: path.stat().st_size / 1024**2 for file_type, path in files.items()}
+
+        print('{:>14} {:>10} {:>9} {:>10} {:>10} {:>8} {:>14} {:>10}'.format(
+            'content_type', 'reader', 'records', 'rows/s', 'records/s', 'MB/s', 'first rec ms', 'RSS MB'))
+        results = []
+        for content_type in args.content_types:
+            file = files['Comments' if 'comments' in content_type else 'Posts'].as_posix()
+            for reader in args.readers:
+                runs = [run(file, tmp, content_type, reader) for _ in range(args.repeat)]
+                best = min(runs, key=lambda r: r['seconds'])
+                results.append(best)
+                print('{:>14} {:>10} {:>9} {:>10.0f} {:>10.0f} {:>8.1f} {:>14.1f} {:>10.1f}'.format(
+                    content_type, reader, best['records'], best['rows_per_sec'], best['records_per_sec'],
+                    best['mb_per_sec'], best['first_record_ms'], best['peak_rss_mb'] or 0))
+
+    report = {'environment': environment(), 'dump': dump, 'repeat': args.repeat, 'results': results}
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+    if args.compare:
+        with open(args.compare) as cf:
+            regressions = compare(results, json.load(cf), args.threshold)
+        if regressions:
+            print('\n{} regressions beyond {:.0%}'.format(len(regressions), args.threshold))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Reading the posts of a tag through the inverted tag index against scanning the whole Posts.xml for them.
+
+    scan: onlytags with the lines reader, every row of the file is read
+    index: onlytags with tag_index=True, only the rows of the tag are read. The index is built on the first run.
+
+    python benchmarks/bench_tag_index.py --questions 20000 --tags git
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).absolute().parents[1]))
+sys.path.insert(0, str(Path(__file__).absolute().parent))
+
+from separser import StackExchangeParser  # noqa: E402
+from separser.utils import TagIndex  # noqa: E402
+from synthetic import write_dump  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=20000, help='number of questions in the synthetic dump')
+    parser.add_argument('--tags', nargs='+', default=['git'], help='tags to read the posts of')
+    parser.add_argument('--content-type', default='post_both')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = write_dump(tmp, questions=args.questions)
+        path = files['Posts'].as_posix()
+
+        with open(path, 'rb') as xf:
+            rows = sum(1 for line in xf if line.lstrip().startswith(b'<row'))
+        start = time.perf_counter()
+        index = TagIndex.from_xml(path, files['Tags'].as_posix())
+        print('index built in {:.2f}s, {} tags, {} of {} posts tagged {}'.format(
+            time.perf_counter() - start, len(index), len(index.offsets(args.tags)), rows, ', '.join(args.tags)))
+
+        print('{:>8} {:>10} {:>10} {:>10}'.format('', 'records', 'seconds', 'speedup'))
+        baseline = None
+        for mode, kwargs in (('scan', {}), ('index', {'tag_index': True}), ('index', {'tag_index': True})):
+            start = time.perf_counter()
+            records = sum(1 for _ in StackExchangeParser(path, 'synthetic.stackexchange.com', proj_dir=tmp,
+                                                         content_type=args.content_type, reader='lines',
+                                                         onlytags=args.tags, **kwargs))
+            seconds = time.perf_counter() - start
+            baseline = baseline or seconds
+            print('{:>8} {:>10} {:>10.2f} {:>10.2f}'.format(mode, records, seconds, baseline / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+"""
+Deterministic synthetic StackExchange dump files for the benchmarks in this directory.
+
+The files follow the shape of a real dump rather than only its format:
+    - Posts.xml is ordered by Id, which is the order posts were created in, so Answers come after their Question but
+      interleaved with the Questions asked meanwhile. Most Answers follow within hours, a few come years later.
+    - Besides Questions and Answers, Posts.xml holds the other PostTypeIds of a dump: a tag wiki and its excerpt for
+      every tag, moderator nominations and a wiki placeholder.
+    - The number of Answers of a Question and of comments on a post are skewed, most get few and some get many.
+    - Bodies are HTML with paragraphs, links, lists, quotes, inline code and code blocks with escaped characters.
+    - Comments.xml is ordered by comment Id, which interleaves the comments of different posts, and Tags.xml points
+      at the wiki posts of each tag.
+
+The same arguments always write the same bytes.
+
+    python benchmarks/synthetic.py dumps --questions 100000
+"""
+import argparse
+import random
+from array import array
+from datetime import datetime, timedelta
+from pathlib import Path
+
+WORDS = ['python', 'array', 'index', 'parser', 'stream', 'memory', 'network', 'model', 'layer', 'function', 'value',
+         'error', 'thread', 'file', 'buffer', 'query', 'table', 'string', 'object', 'class', 'method', 'loop']
+TAGS = ['python', 'neural-networks', 'machine-learning', 'xml', 'performance', 'pandas', 'numpy', 'regex', 'java',
+        'deep-learning', 'c++', 'linux', 'sql', 'optimization', 'git']
+
+# Questions are spread over ten years from START
+START = datetime(2009, 1, 1)
+SPAN = 10 * 365 * 86400
+LICENSE = 'CC BY-SA 4.0'
+
+
+def _escape(value):
+    return (value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+            .replace('\n', '&#xA;'))
+
+
+def _row(attribs):
+    return '  <row {} />\n'.format(' '.join('{}="{}"'.format(k, _escape(str(v))) for k, v in attribs
+                                            if v is not None))
+
+
+def _sentence(rng, n):
+    return ' '.join(rng.choice(WORDS) for _ in range(n))
+
+
+def _inline(rng, n):
+    # A sentence with some of its words marked up
+    words = []
+    for _ in range(n):
+        word, markup = rng.choice(WORDS), rng.random()
+        if markup < 0.04:
+            word = '<code>{}()</code>'.format(word)
+        elif markup < 0.06:
+            word = '<a href="https://example.com/{0}" rel="nofollow noreferrer">{0}</a>'.format(word)
+        elif markup < 0.08:
+            word = '<strong>{}</strong>'.format(word)
+        elif markup < 0.09:
+            word = '<em>{}</em>'.format(word)
+        words.append(word)
+    return ' '.join(words)
+
+
+def _body(rng):
+    blocks = ['<p>{}</p>'.format(_inline(rng, rng.randint(8, 40))) for _ in range(rng.randint(1, 4))]
+    if rng.random() < 0.15:
+        blocks.insert(rng.randint(0, len(blocks)),
+                      '<ul>\n{}\n</ul>'.format('\n'.join('<li>{}</li>'.format(_inline(rng, rng.randint(3, 10)))
+                                                         for _ in range(rng.randint(2, 5)))))
+    if rng.random() < 0.1:
+        blocks.insert(0, '<blockquote>\n  <p>{}</p>\n</blockquote>'.format(_inline(rng, rng.randint(5, 20))))
+    if rng.random() < 0.3:
+        a, b = rng.choice(WORDS), rng.choice(WORDS)
+        blocks.append('<pre><code>for {a} in {b}:\n    if {a} &lt; 0 and {b} &amp; 1:\n        {a} = {b}("&gt;")\n'
+                      '</code></pre>'.format(a=a, b=b))
+    return '\n\n'.join(blocks) + '\n'
+
+
+def _date(seconds):
+    date = START + timedelta(seconds=seconds)
+    return date.strftime('%Y-%m-%dT%H:%M:%S.') + '{:03d}'.format(date.microsecond // 1000)
+
+
+def _count(rng, mean, cap=40):
+    # Geometric, so most posts get none or one and a few get many
+    if mean <= 0:
+        return 0
+    p, n = mean / (1.0 + mean), 0
+    while n < cap and rng.random() < p:
+        n += 1
+    return n
+
+
+def _schedule(rng, questions, answers_per_question):
+    """
+    When every post is created
+
+    :returns: sorted List of (seconds, PostTypeId, owner, number) tuples, where owner is the index of the Question of
+        an Answer or of the tag of a tag wiki, Array of the number of Answers of each Question, and Array of the number
+        of the accepted Answer of each Question, 0 if none
+    """
+    gap = SPAN / max(questions, 1)
+    posts, answers, accepted = [], array('l'), array('l')
+    for question in range(questions):
+        asked = (question + rng.random()) * gap
+        posts.append((asked, 1, question, 0))
+        n_answers = _count(rng, answers_per_question)
+        for number in range(1, n_answers + 1):
+            if rng.random() < 0.05:
+                delay = rng.random() * (SPAN - asked)
+            else:
+                delay = rng.expovariate(1 / (20 * gap))
+            posts.append((asked + delay + 1, 2, question, number))
+        answers.append(n_answers)
+        accepted.append(rng.randint(1, n_answers) if n_answers and rng.random() < 0.6 else 0)
+    for tag in range(len(TAGS)):
+        created = rng.random() * SPAN
+        posts.append((created, 4, tag, 0))
+        posts.append((created + 1, 5, tag, 0))
+    for election in range(max(questions // 5000, 1)):
+        posts.append((rng.random() * SPAN, 6, election, 0))
+    posts.append((0.0, 7, 0, 0))
+    posts.sort()
+    return posts, answers, accepted
+
+
+def _activity(rng, created):
+    return created + rng.expovariate(1 / 86400.0) if rng.random() < 0.5 else created
+
+
+def write_dump(directory, questions=1000, answers_per_question=2, comments_per_post=2, community='synthetic',
+               seed=0):
+    """
+    Write <community>_Posts.xml, <community>_Comments.xml and <community>_Tags.xml into directory.
+
+    :param directory: string or Path, created if missing
+    :param questions: int, number of Questions
+    :param answers_per_question: float, mean number of Answers of a Question
+    :param comments_per_post: float, mean number of comments on a Question or Answer
+    :param community: string, prefix of the file names
+    :param seed: int, the same seed writes the same files
+    :returns: dictionary of file type to Path
+    """
+    rng = random.Random(seed)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    posts_path = directory.joinpath('{}_Posts.xml'.format(community))
+    comments_path = directory.joinpath('{}_Comments.xml'.format(community))
+    tags_path = directory.joinpath('{}_Tags.xml'.format(community))
+
+    schedule, answers, accepted = _schedule(rng, questions, answers_per_question)
+    # Ids follow creation order, so the Id of an accepted Answer or a tag wiki is known before its row is written
+    question_ids, accepted_ids = array('l', [0]) * questions, array('l', [0]) * questions
+    wiki_ids = {}
+    for post_id, (_, post_type, owner, number) in enumerate(schedule, 1):
+        if post_type == 1:
+            question_ids[owner] = post_id
+        elif post_type == 2 and number == accepted[owner]:
+            accepted_ids[owner] = post_id
+        elif post_type in (4, 5):
+            wiki_ids[owner, post_type] = post_id
+
+    comments = []
+    counts = dict.fromkeys(TAGS, 0)
+    with open(posts_path, 'w', encoding='utf-8') as posts:
+        posts.write('<?xml version="1.0" encoding="utf-8"?>\n<posts>\n')
+        for post_id, (created, post_type, owner, number) in enumerate(schedule, 1):
+            user = rng.randint(1, 5000)
+            edited = created + rng.expovariate(1 / 86400.0) if rng.random() < 0.3 else None
+            n_comments = _count(rng, comments_per_post) if post_type in (1, 2) else 0
+            if post_type == 1:
+                picked = rng.sample(TAGS, rng.randint(1, 5))
+                for tag in picked:
+                    counts[tag] += 1
+                closed = created + rng.expovariate(1 / 3600.0) if rng.random() < 0.03 else None
+                row = [('Id', post_id), ('PostTypeId', 1), ('AcceptedAnswerId', accepted_ids[owner] or None),
+                       ('CreationDate', _date(created)), ('Score', int(rng.paretovariate(1.5)) - 2),
+                       ('ViewCount', int(rng.paretovariate(1.2) * 40)), ('Body', _body(rng)), ('OwnerUserId', user),
+                       ('LastEditorUserId', user if edited else None), ('LastEditDate', edited and _date(edited)),
+                       ('LastActivityDate', _date(_activity(rng, edited or created))),
+                       ('Title', _sentence(rng, rng.randint(4, 12)) + '?'),
+                       ('Tags', ''.join('<{}>'.format(t) for t in picked)), ('AnswerCount', answers[owner]),
+                       ('CommentCount', n_comments), ('FavoriteCount', rng.randint(0, 10) or None),
+                       ('ClosedDate', closed and _date(closed)), ('ContentLicense', LICENSE)]
+            elif post_type == 2:
+                row = [('Id', post_id), ('PostTypeId', 2), ('ParentId', question_ids[owner]),
+                       ('CreationDate', _date(created)), ('Score', int(rng.paretovariate(1.5)) - 2),
+                       ('Body', _body(rng)), ('OwnerUserId', user), ('LastEditorUserId', user if edited else None),
+                       ('LastEditDate', edited and _date(edited)),
+                       ('LastActivityDate', _date(_activity(rng, edited or created))), ('CommentCount', n_comments),
+                       ('ContentLicense', LICENSE)]
+            elif post_type == 4:
+                row = [('Id', post_id), ('PostTypeId', 4), ('CreationDate', _date(created)), ('Score', 0),
+                       ('Body', _sentence(rng, rng.randint(8, 25)).capitalize() + '.'),
+                       ('LastActivityDate', _date(created)), ('CommentCount', 0), ('ContentLicense', LICENSE)]
+            elif post_type == 5:
+                row = [('Id', post_id), ('PostTypeId', 5), ('CreationDate', _date(created)), ('Score', 0),
+                       ('Body', _body(rng)), ('LastActivityDate', _date(created)), ('CommentCount', 0),
+                       ('ContentLicense', LICENSE)]
+            elif post_type == 6:
+                row = [('Id', post_id), ('PostTypeId', 6), ('CreationDate', _date(created)), ('Score', 0),
+                       ('Body', _body(rng)), ('OwnerUserId', user), ('LastActivityDate', _date(created)),
+                       ('Title', '{} Moderator Election'.format(_date(created)[:4])), ('CommentCount', 0),
+                       ('ContentLicense', LICENSE)]
+            else:
+                row = [('Id', post_id), ('PostTypeId', post_type), ('CreationDate', _date(created)), ('Score', 0),
+                       ('Body', ''), ('LastActivityDate', _date(created)), ('CommentCount', 0),
+                       ('ContentLicense', LICENSE)]
+            posts.write(_row(row))
+            comments.extend((created + rng.expovariate(1 / 36000.0), post_id) for _ in range(n_comments))
+        posts.write('</posts>\n')
+
+    # Comments.xml is ordered by comment Id, which interleaves the comments of different posts
+    comments.sort()
+    with open(comments_path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n<comments>\n')
+        for comment_id, (created, parent) in enumerate(comments, 1):
+            f.write(_row([('Id', comment_id), ('PostId', parent), ('Score', int(rng.paretovariate(2)) - 1),
+                          ('Text', _sentence(rng, rng.randint(5, 25))), ('CreationDate', _date(created)),
+                          ('UserId', rng.randint(1, 5000)), ('ContentLicense', LICENSE)]))
+        f.write('</comments>\n')
+
+    with open(tags_path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n<tags>\n')
+        for tag_id, tag in enumerate(TAGS, 1):
+            f.write(_row([('Id', tag_id), ('TagName', tag), ('Count', counts[tag]),
+                          ('ExcerptPostId', wiki_ids[tag_id - 1, 4]), ('WikiPostId', wiki_ids[tag_id - 1, 5])]))
+        f.write('</tags>\n')
+
+    return {'Posts': posts_path, 'Comments': comments_path, 'Tags': tags_path}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('directory', help='directory to write the dump into')
+    parser.add_argument('--questions', type=int, default=20000, help='number of Questions')
+    parser.add_argument('--answers', type=float, default=2, help='mean number of Answers of a Question')
+    parser.add_argument('--comments', type=float, default=2, help='mean number of comments on a post')
+    parser.add_argument('--community', default='synthetic', help='prefix of the file names')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    files = write_dump(args.directory, questions=args.questions, answers_per_question=args.answers,
+                       comments_per_post=args.comments, community=args.community, seed=args.seed)
+    for file_type, path in files.items():
+        print('{:>10} {:>10.1f} MB  {}'.format(file_type, path.stat().st_size / 1024**2, path))
+
+
+if __name__ == '__main__':
+    main()
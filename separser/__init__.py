@@ -1 +1,2 @@
 from .stackExchangeParser import StackExchangeParser
+from .batch import BatchRunner
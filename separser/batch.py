@@ -0,0 +1,253 @@
+import json
+import os
+import time
+from multiprocessing import Pool, cpu_count
+from multiprocessing.pool import ThreadPool
+from pathlib import Path
+from queue import Queue
+from .stackExchangeParser import StackExchangeParser
+from .utils import CommunityManifest, fetch_listing, download_file, threaded, peak_rss, ARCHIVE_URL
+from .utils.log import get_log
+
+# Files each content_type reads, as named in an extracted archive
+_FILE_TYPES = {'post_title': ['Posts'], 'post_body': ['Posts'], 'post_both': ['Posts'],
+               'all_text': ['Posts', 'Comments'], 'comments_both': ['Comments'], 'comments_body': ['Comments'],
+               'tags': ['Tags']}
+
+
+def _process_community(community, proj_dir, output, parser_kwargs, export_kwargs):
+    """
+    Extract and parse one community in a worker process, exporting its records to output
+
+    :returns: dictionary of timings and counts, with the error message if it failed
+    """
+    result = {'community': community, 'output': output.as_posix()}
+    try:
+        start = time.perf_counter()
+        # The archive is in proj_dir already, so the parser finds it there, or the xml files extracted from it. The
+        # parser only extracts and indexes on first use, so it is prepared here to time that apart from the parse.
+        parser = StackExchangeParser(None, community, proj_dir=proj_dir, offline=True, **parser_kwargs).prepare()
+        result['extract_seconds'] = time.perf_counter() - start
+        start = time.perf_counter()
+        manifest = parser.export(output, **export_kwargs)
+        result['parse_seconds'] = time.perf_counter() - start
+        result['records'] = manifest['records']
+        result['shards'] = len(manifest['shards'])
+        result['peak_rss'] = peak_rss()
+    except Exception as e:
+        result['error'] = '{}: {}'.format(type(e).__name__, e)
+    return result
+
+
+class BatchRunner(object):
+    """
+    Download, extract and parse a list of communities, exporting the records of each to its own directory.
+
+    Communities are scheduled largest archive first, so the longest parses start early and the small ones fill in
+    the gaps at the end. Archives are downloaded one at a time in a background thread, each over several connections,
+    and up to `prefetch` of them are kept ready ahead of the pool, so the next archive downloads while the current ones
+    are parsed. Each community is then extracted and parsed by a process of its own, and a failed community is
+    recorded in the summary without stopping the others.
+
+        BatchRunner(['ai.stackexchange.com', 'datascience.stackexchange.com'], proj_dir='dumps',
+                    content_type='post_both').run('exports')
+    """
+
+    def __init__(self, communities, proj_dir='.', processes=2, prefetch=1, archive_url=None, offline=False,
+                 manifest_ttl=24, connections=4, **parser_kwargs):
+        """
+        :param communities: List of community names, or 'all' for every community in the archive
+        :param proj_dir: string or Path, the project directory archives are downloaded and extracted into
+        :param processes: int, number of communities extracted and parsed at the same time. If negative, use the CPU
+            count minus two.
+        :param prefetch: int, number of downloaded archives kept waiting for a free process
+        :param archive_url: string, url of the StackExchange dump directory listing, archive.org by default
+        :param offline: Boolean, If True, only use archives and xml files already in proj_dir
+        :param manifest_ttl: int, hours the cached list of community names is trusted for
+        :param connections: int, number of byte ranges each archive is downloaded in at the same time
+        :param parser_kwargs: StackExchangeParser settings used for every community, e.g. content_type or filters
+        """
+        self.proj_dir = Path(proj_dir).absolute()
+        self.proj_dir.mkdir(parents=True, exist_ok=True)
+        self.processes = int(processes)
+        if self.processes < 0:
+            self.processes = max(cpu_count() - 2, 1)
+        assert self.processes > 0, "processes must be a positive int, or negative for the CPU count minus two"
+        self.prefetch = max(int(prefetch), 1)
+        self.URL = archive_url or ARCHIVE_URL
+        if not self.URL.endswith('/'):
+            self.URL += '/'
+        self.offline = offline
+        self.connections = connections
+        for key in ('file', 'community', 'proj_dir', 'splits', 'checkpoint'):
+            if key in parser_kwargs:
+                raise ValueError("{} is set by the batch runner and cannot be passed".format(key))
+        self.parser_kwargs = parser_kwargs
+        self.content_type = parser_kwargs.get('content_type', 'post_body')
+        self.manifest = CommunityManifest(self.proj_dir.joinpath('communities.json'), url=self.URL, ttl=manifest_ttl)
+
+        # Resolved by the log property when first used, as it may import Prodigy
+        self._log = None
+
+        self.communities = self._resolve(communities)
+
+    @property
+    def log(self):
+        """
+        Callable taking a message, Prodigy's log when Prodigy is installed, else one writing to proj_dir/logs
+        """
+        if self._log is None:
+            self._log = get_log('batch', self.proj_dir.joinpath('logs/'))
+        return self._log
+
+    def _resolve(self, communities):
+        """
+        :returns: List of verified community names, in the order given
+        """
+        if isinstance(communities, str):
+            communities = communities.split(',') if communities != 'all' else None
+        archive, _ = self.manifest.load(lambda: fetch_listing(self.URL), offline=self.offline)
+        if communities is None:
+            if not archive:
+                raise ValueError("The list of communities in the archive is not available offline")
+            return sorted(archive)
+        names = []
+        for community in communities:
+            community = '.'.join(community.strip().split('_'))
+            if archive and community not in archive:
+                raise ValueError("StackExchange community--{}--not found in online archive at {}"
+                                 .format(community, self.URL))
+            if community not in names:
+                names.append(community)
+        return names
+
+    def _cached(self, community):
+        """
+        :returns: Path of the archive of community in proj_dir, the directory if its xml files were extracted, or
+            None if it has to be downloaded
+        """
+        archive = self.proj_dir.joinpath(community + '.7z')
+        if archive.exists():
+            return archive
+        stem = community.split('.')[0]
+        types = _FILE_TYPES[self.content_type.lower()]
+        if all(self.proj_dir.joinpath('{}_{}.xml'.format(stem, file_type)).exists() for file_type in types):
+            return self.proj_dir
+        return None
+
+    def _size(self, community):
+        """
+        :returns: int, bytes of the archive of community, from proj_dir or the archive's headers, 0 if unknown
+        """
+        cached = self._cached(community)
+        if cached is not None:
+            if cached.is_file():
+                return cached.stat().st_size
+            stem = community.split('.')[0]
+            # Extracted xml files are around seven times the size of their archive
+            return sum(path.stat().st_size for path in cached.glob('{}_*.xml'.format(stem))) // 7
+        if self.offline:
+            return 0
+        import requests
+        try:
+            r = requests.head(self.URL + community + '.7z', allow_redirects=True, timeout=60)
+            r.raise_for_status()
+        except requests.RequestException:
+            return 0
+        return int(r.headers.get('Content-Length', 0))
+
+    def schedule(self):
+        """
+        :returns: List of (community, archive bytes) tuples, largest first. Communities of unknown size come last.
+        """
+        with ThreadPool(max(self.connections, 1)) as pool:
+            sizes = pool.map(self._size, self.communities)
+        return sorted(zip(self.communities, sizes), key=lambda item: -item[1])
+
+    def _downloads(self, schedule):
+        """
+        :returns: generator of (community, bytes, download seconds, error message or None) tuples, in schedule order
+        """
+        for community, size in schedule:
+            start = time.perf_counter()
+            error = None
+            if self._cached(community) is None:
+                if self.offline:
+                    error = "{} is not cached in {} and cannot be downloaded offline".format(community, self.proj_dir)
+                else:
+                    import requests
+                    self.log("BATCH: Downloading {}".format(community))
+                    try:
+                        download_file(self.URL + community + '.7z', self.proj_dir.joinpath(community + '.7z'),
+                                      connections=self.connections, log=self.log)
+                    except (requests.RequestException, OSError) as e:
+                        error = '{}: {}'.format(type(e).__name__, e)
+            yield community, size, time.perf_counter() - start, error
+
+    def run(self, output_dir, file_format='jsonl', compression='gzip', shard_size=64, workers=2):
+        """
+        Process every community, writing its records to output_dir/<community> as StackExchangeParser.export does,
+        and a summary.json of the timings of each community to output_dir. The summary is rewritten as each community
+        finishes.
+
+        :param output_dir: string or Path of the directory to write into
+        :param file_format: string, 'jsonl' or 'parquet', see StackExchangeParser.export
+        :param compression: string or None, see StackExchangeParser.export
+        :param shard_size: int, approximate uncompressed MB of text per shard
+        :param workers: int, number of shards written at the same time by each community
+        :returns: dictionary, the summary
+        """
+        output_dir = Path(output_dir).absolute()
+        output_dir.mkdir(parents=True, exist_ok=True)
+        export_kwargs = {'file_format': file_format, 'compression': compression, 'shard_size': shard_size,
+                         'workers': workers}
+        start = time.perf_counter()
+        schedule = self.schedule()
+        self.log("BATCH: {} communities scheduled, {} processes".format(len(schedule), self.processes))
+        results = {community: {'community': community, 'bytes': size} for community, size in schedule}
+        summary = {'processes': self.processes, 'content_type': self.content_type, 'communities': results}
+        done = Queue()
+
+        def finish(result):
+            results[result['community']].update(result)
+            if 'error' in result:
+                self.log("BATCH: {} failed, {}".format(result['community'], result['error']))
+            else:
+                self.log("BATCH: {} done, {} records".format(result['community'], result['records']))
+            summary['seconds'] = time.perf_counter() - start
+            self._write_summary(output_dir, summary)
+
+        # A fresh process per community returns the memory of its caches and indexes once it is done
+        with Pool(self.processes, maxtasksperchild=1) as pool:
+            in_flight = 0
+            for community, size, seconds, error in threaded(self._downloads(schedule), self.prefetch):
+                results[community]['download_seconds'] = seconds
+                if error is not None:
+                    finish({'community': community, 'error': error})
+                    continue
+                while in_flight >= self.processes:
+                    finish(done.get())
+                    in_flight -= 1
+                pool.apply_async(_process_community, (community, self.proj_dir, output_dir.joinpath(community),
+                                                      self.parser_kwargs, export_kwargs), callback=done.put,
+                                 error_callback=lambda e, community=community: done.put(
+                                     {'community': community, 'error': '{}: {}'.format(type(e).__name__, e)}))
+                in_flight += 1
+            while in_flight:
+                finish(done.get())
+                in_flight -= 1
+
+        failed = [community for community, result in results.items() if 'error' in result]
+        summary['failed'] = failed
+        summary['seconds'] = time.perf_counter() - start
+        self._write_summary(output_dir, summary)
+        self.log("BATCH: {} communities in {:.0f}s, {} failed".format(len(results), summary['seconds'], len(failed)))
+        return summary
+
+    @staticmethod
+    def _write_summary(output_dir, summary):
+        path = output_dir.joinpath('summary.json')
+        partial = path.with_name(path.name + '.partial')
+        with open(partial, 'w') as sf:
+            json.dump(summary, sf, indent=2)
+        os.replace(str(partial), str(path))
@@ -1,50 +1,64 @@
 import re
-from html.parser import HTMLParser
-from xml.etree import ElementTree as ET
 from pathlib import Path
-import requests
-from bs4 import BeautifulSoup
 import subprocess
-import time
-from .utils import find_program, capture_7zip_stdout, chunker, generate_file_markers
-try:
-    from prodigy import log
-except (ImportError, ModuleNotFoundError):
-    from .utils.log import Log
-from itertools import chain
-import numpy as np
+from .utils import find_program, capture_7zip_stdout, chunker, generate_file_markers, CommentIndex, \
+    PostLookup, ArchiveMember, iterparse_rows, map_ranges, LineReader, TreeReader, peak_rss, TextCleaner, \
+    write_shards, Checkpoint, ActivityIndex, parse_row, CommunityManifest, fetch_listing, ARCHIVE_URL, \
+    download_file, ParentCache, RowFilter, TagIndex, OffsetReader, PostIndex, threaded, worker_pool, call_async, \
+    Metrics, TaskHasher, DedupStore, import_optional
+from .utils.log import get_log
+from itertools import zip_longest, islice
+from collections import namedtuple, deque
+from io import BytesIO
+from array import array
+from bisect import bisect_left
+import random
 from multiprocessing import cpu_count
+import threading
+import time
+import atexit
+import weakref
 
+# Fields of a Question or Answer row, shared between the sequential parser and the byte range workers
+_Post = namedtuple('_Post', ['posttype', 'id', 'parentid', 'title', 'body', 'tags', 'answers', 'comments',
+                             'favorites', 'score', 'views', 'accepted', 'created', 'edited', 'active'])
+# Fields of a Comment row
+_Comment = namedtuple('_Comment', ['id', 'postid', 'score', 'created'])
+# Fields of a Tags row
+_Tag = namedtuple('_Tag', ['id', 'name', 'count', 'excerpt', 'wiki'])
+# Settings of one output of iter_views
+_View = namedtuple('_View', ['name', 'content_type', 'newlines', 'cleaner', 'row_filter', 'tags'])
 
-class StackExchangeParser(object):
-    
-    class _TagStripper(HTMLParser):
-        """
-        HTML Parser that receives a string with HTML tags, strips out tags. get_data() will return a string devoid of
-        HTML tags.
-        
-        """
-        def __init__(self, convert_charrefs=True):
-            super().__init__()
-            self.reset()
-            self.strict = False
-            self.convert_charrefs = convert_charrefs
-            self.fed = []
-
-        def handle_data(self, d):
-            self.fed.append(d)
-
-        def get_data(self):
-            return ''.join(self.fed)
 
-        def error(self, message):
-            pass
+class StackExchangeParser(object):
 
+    # Attributes read from Posts and Comments rows, the only ones the lines reader decodes
+    _POST_FIELDS = ('Id', 'PostTypeId', 'ParentId', 'Title', 'Body', 'Tags', 'AnswerCount', 'CommentCount',
+                    'FavoriteCount', 'Score', 'ViewCount', 'AcceptedAnswerId', 'CreationDate', 'LastEditDate',
+                    'LastActivityDate')
+    _COMMENT_FIELDS = ('Id', 'PostId', 'Text', 'Score', 'CreationDate')
+    # Attributes needed to track Questions for their Answers
+    _QUESTION_FIELDS = {'Id', 'PostTypeId', 'Title', 'Tags', 'AnswerCount'}
+    _TAG_PATTERN = re.compile('<(.+?)>')
+    # Records per batch handed between the stages of the pipelined mode
+    _PIPELINE_BATCH = 256
+    # Raw attributes read by delta parsing before a row is decoded
+    _RAW_ID = re.compile(rb' Id="([0-9]+)"')
+    _RAW_DATES = re.compile(rb' (?:CreationDate|LastEditDate|LastActivityDate)="([^"]*)"')
+    
     def __init__(self, file, community, proj_dir='.', resume_from=False, content_type='post_body', newlines=True,
-                 onlytags=None, order='default', splits=0):
+                 onlytags=None, order='default', splits=0, extract=True, reader='iterparse', checkpoint=0,
+                 delta=False, archive_url=None, offline=False, manifest_ttl=24,
+                 connections=4, cache_size=256, filters=None, tag_index=False, pipeline=0, metrics_callback=None,
+                 metrics_every=10000, hashes=False, known_hashes=None, dedup=False, dedup_capacity=10000000,
+                 dedup_error=0.001, tag_synonyms=None):
         """
         A Prodigy compliant corpus loader that reads a StackExchange xml file (or list of community urls) and yields a
         stream of text in dictionary format.
+
+        The constructor only checks its arguments. Checking the community name, locating, downloading and extracting
+        the files and building the secondary indexes wait for the first read, or for prepare(), so errors about the
+        files or the community are raised then, and a community found from the file names is only set then.
         
         :param file: None or string path name to xml file. If None, read files from Archive.org using communities param.
             string can be comma delimited to pass in two files from the same community.
@@ -56,6 +70,11 @@ class StackExchangeParser(object):
                 edited since the last parse was run.
             Date: The date of the archive.org data dump from previous parse. This WILL re-parse posts that have changed
                 since the last parse was run.
+            Checkpoint: None to carry on from the checkpoint this parser saves in proj_dir, or the path of a checkpoint
+                file. Seeks straight to where the checkpoint was taken and restores the Answer bookkeeping, so no row
+                is read twice. Needs the lines reader. Records yielded after the checkpoint was taken are yielded
+                again.
+            With the lines reader, an Id resume also seeks to the saved checkpoint when it lies before that Id.
         :param content_type: string, select the type of text to return.
             post_title: Use the Posts.xml file and set 'text' to the post title.
             post_body: Use the Posts.xml file and set 'text' to the post body
@@ -64,48 +83,250 @@ class StackExchangeParser(object):
                 for BOTH posts and comments.
             comments_body: Use the Comments.xml file and set 'text' to the comment body.
             comments_both: Use the Comments.xml file and set 'text' to BOTH the parent title and comment body
+            tags: Use the Tags.xml file and set 'text' to the tag name.
         :param newlines: Boolean, If True, keep newlines in text, if False, replace newlines with space.
-        :param onlytags: Only return posts which contain one or more of the provided tags
+        :param onlytags: Only return posts which contain one or more of the provided tags. The same as filters with
+            only tags set.
+        :param order: string, order in which the byte ranges of the Posts file are parsed when splits is set.
+            default/beginning: file order. Records come out in Id order, as they do without splits.
+            ending: last range first.
+            shuffle: random order.
+            split: round robin across `splits` contiguous sections of the file.
+            completed: file order, but records from each range come out as soon as it is parsed.
+            Answers only get their Question's title and tags when the Question's range came out first.
+        :param splits: int, number of worker processes used to parse byte ranges of the Posts file in parallel. 0
+            parses in a single process, a negative number uses all but two of the CPUs. Only for the post_title,
+            post_body and post_both content_types, reading an xml file on disk.
+        :param reader: string, how rows are read from the xml file.
+            iterparse: build an ElementTree element for every row, detaching it once read so memory stays flat.
+            lines: scan the one <row/> per line layout of the dump files directly, skip Posts that are not
+                Questions or Answers on their raw bytes, and decode only the attributes that are used. Yields the
+                same records as iterparse.
+        :param extract: Boolean, If True, rename and extract the xml files of a 7zip archive to disk before parsing.
+            If False, stream the xml straight out of the archive with '7z e -so', leaving the archive untouched and
+            writing nothing to disk.
+        :param checkpoint: int, save the byte offset and Answer bookkeeping to proj_dir/checkpoints every `checkpoint`
+            rows, so resume_from={'Checkpoint': None} can carry on from there. 0 saves no checkpoints. Needs the lines
+            reader and an xml file on disk, without splits.
+        :param delta: Boolean, If True, only yield rows that are new or changed since the last delta parse of this
+            community's file, and list the Ids of rows that have gone in `deleted_ids` once the file has been read.
+            An Id -> last activity index of every row is saved to proj_dir/activity after each delta parse; the
+            first one yields every row. With the lines reader, unchanged rows are skipped on their raw bytes.
+            Cannot be combined with splits or resume_from.
+        :param archive_url: string, url of the StackExchange dump directory on archive.org, or of a stand-in for it.
+        :param offline: Boolean, If True, never contact the archive. Local files are trusted without checking the
+            community name against the archive, and a community that is not cached in proj_dir cannot be downloaded.
+        :param manifest_ttl: number of hours the archive's community list is cached in proj_dir before it is fetched
+            again. A stale list is used when the archive cannot be reached.
+        :param connections: int, number of byte ranges of a community archive downloaded at the same time. An
+            interrupted download is resumed by the next parser that downloads the same community into proj_dir.
+        :param cache_size: int, MB of memory for the Questions kept for their Answers' title and tags. Questions left
+            waiting longest past that are moved to an sqlite file in proj_dir, and read back if an Answer needs them.
+        :param filters: separser.utils.RowFilter, or a dictionary of its arguments, e.g. {'min_score': 5,
+            'post_types': 2, 'created_from': '2019', 'created_before': '2020'}. Rows are checked before any text is
+            cleaned, and with the lines reader before they are decoded. Questions that are filtered out are still
+            read for the title and tags of their Answers.
+        :param tag_index: Boolean, If True, read only the posts of the onlytags (or filters) tags, by seeking straight
+            to them through an inverted tag index of the Posts file. The index is built by one pass over the file
+            the first time, and kept in proj_dir/indexes until the file changes. Needs reader='lines' and a Posts
+            xml file on disk, without splits or delta.
+        :param pipeline: int, number of processes cleaning text in the pipelined mode, in which rows are parsed in one
+            thread, enriched with their Question or parent post in a second, and cleaned in batches by the processes,
+            with bounded queues between the stages. Records keep their order, and a slow consumer holds every stage
+            back. 0 to parse, enrich and clean each record in turn. If negative, use the CPU count minus two.
+            Cannot be combined with splits or checkpoint. The threads and processes stop when the stream is closed,
+            including the one next() reads when the parser is closed or dropped.
+        :param metrics_callback: optional callable, given a snapshot of the metrics every metrics_every rows read and
+            once the file is finished
+        :param metrics_every: int, number of rows read between two metrics reports
+        :param hashes: Boolean, If True, set the '_input_hash' and '_task_hash' of every record, so Prodigy does not
+            hash the tasks itself. See separser.utils.TaskHasher.
+        :param known_hashes: optional iterable of the '_input_hash' values of tasks already annotated, e.g. from
+            Prodigy's db.get_input_hashes(dataset). Their rows are dropped before their text is cleaned. Only matches
+            hashes set by this loader.
+        :param dedup: Boolean, If True, drop records whose HTML text was already emitted, in this run or an earlier
+            one, before their text is cleaned. The texts are kept in a Bloom filter in proj_dir/dedup, one per
+            community, each under its content_type and newlines setting, so a text emitted as post_both is still new
+            to an all_text run. A small share of new texts are dropped as well, see separser.utils.DedupStore and the
+            'dedup' entry of the metrics. A text is only added to the store once its record is handed to the caller,
+            so records read ahead but never consumed are not. The store is written to disk with every checkpoint.
+        :param dedup_capacity: int, number of texts the Bloom filter of a community is sized for when it is created
+        :param dedup_error: float, the false positive rate of a new Bloom filter once it holds dedup_capacity texts
+        :param tag_synonyms: optional dictionary of tag name to the tag name it stands for, e.g. {'js': 'javascript'}.
+            The onlytags (or filters) tags, of the parser and of its views, are replaced by the tags they stand for,
+            and the tag index keeps the synonyms. The index is built again when they change.
         """
-        # TODO split __iter__ logic into methods where possible
         # Variables for working with multiple XML streams
         self.cpu_count = cpu_count()
+        self._ORDERS = ['default', 'beginning', 'ending', 'shuffle', 'split', 'completed']
         self.order = order.lower()
+        assert (self.order in self._ORDERS), " Acceptable orders include {}".format(self._ORDERS)
         self.splits = int(splits)
+        if self.splits < 0:
+            self.splits = max(self.cpu_count - 2, 1)
         self.proj_dir = Path(proj_dir).absolute()
+        self.community = community
+        self.extract = extract
+        self._READERS = ['iterparse', 'lines']
+        self.reader = reader.lower()
+        assert (self.reader in self._READERS), " Acceptable readers include {}".format(self._READERS)
+        # Byte offsets of the only Posts rows to read, from the tag index
+        self._tag_offsets = None
 
         if not self.proj_dir.exists():
             self.proj_dir.mkdir(parents=True)
         self.log_dir = self.proj_dir.joinpath('logs/')
-        try:
-            self.log = log
-        except NameError:
-            self.log = Log(name=community, log_dir=self.log_dir)
-
-        self.iter = iter(self)
+        # Resolved by the log property when first used, as it may import Prodigy
+        self._log = None
+
+        # next() reads a stream that runs on a second handle to the state of this parser. The stage threads of a
+        # pipelined stream only hold that handle, so they do not keep the parser alive, and the stream is closed once
+        # the parser is dropped.
+        handle = object.__new__(type(self))
+        handle.__dict__ = self.__dict__
+        self.iter = iter(handle)
+        self._close_iter = weakref.finalize(self, self.iter.close)
         if file:
             file = file.split(',')  # If a single file is passed in, it will be placed into a list
             if len(file) == 1:  # Only one file was passed in, so remove it from the list before testing
                 file = file[0]
 
-        self._resume_keys = ['Id', 'Date']
+        self._resume_keys = ['Id', 'Date', 'Checkpoint']
         if resume_from:
             assert([*resume_from][0] in self._resume_keys)
         self.resume_from = resume_from
 
-        # Check that the path actually exists and is a recognizable XML file
-        self.URL = 'https://archive.org/download/stackexchange/'
-        self.communities, self.latest_data_date = self._get_community_names()
+        # The archive's community names are only fetched when a community name has to be checked, and are cached
+        self.URL = archive_url or ARCHIVE_URL
+        if not self.URL.endswith('/'):
+            self.URL += '/'
+        self.offline = offline
+        self.connections = connections
+        self.manifest = CommunityManifest(self.proj_dir.joinpath('communities.json'), url=self.URL, ttl=manifest_ttl)
+        self._communities, self._latest_data_date = None, None
 
-        # Regex to find newlines
+        # HTML to text cleaner, shared by every row
         self.newlines = newlines
-        self.newline = re.compile(r'\n+')
+        self.cleaner = TextCleaner(newlines=newlines)
 
         # Acceptable types of StackExchange text content
         self._TYPES = ['post_title', 'post_body', 'post_both', 'all_text', 'comments_both', 'comments_body', 'tags']
         assert (content_type.lower() in self._TYPES), " Acceptable content_types include {}".format(self._TYPES)
         self.content_type = content_type
 
+        # The file read for the content_type
+        if self.content_type in self._TYPES[:4]:
+            self.type = 'Posts'
+        elif self.content_type in self._TYPES[4:6]:
+            self.type = 'Comments'
+        else:
+            self.type = 'Tags'
+
+        # The files are located, downloaded and extracted, and the secondary indexes built, on the first read
+        self._source = file
+        self._ready = False
+        self.file = {}
+        self.tree = None
+        self.second_tree, self.second_type = None, None
+        self.comment_index, self.post_lookup = None, None
+
+        # To identify even more specific results a user can supply a StackExchange tag or tags.
+        # Only Posts with one or more tags will be returned
+        if type(onlytags) == str:
+            onlytags = [onlytags]
+        self.tag_synonyms = dict(tag_synonyms) if tag_synonyms else {}
+        if isinstance(filters, dict):
+            filters = RowFilter(**filters)
+        if onlytags:
+            if filters is not None and filters.tags:
+                raise ValueError("Pass the tags to keep either as onlytags or in filters, not both")
+            filters = RowFilter(**dict(filters.criteria if filters is not None else {}, tags=onlytags))
+        self.row_filter = self._resolve_synonyms(filters) if filters else None
+        if self.row_filter is not None:
+            self.row_filter.check_file_type(self.type)
+        self.onlytags = self.row_filter.tags if self.row_filter is not None else None
+
+        # Inverted index of the posts of each tag
+        self.tag_index = None
+        self._use_tag_index = tag_index
+        if tag_index and (self.type != 'Posts' or self.reader != 'lines' or self.splits or delta):
+            raise ValueError("tag_index needs reader='lines' and a Posts xml file on disk, without splits or delta")
+
+        # Keep a count of total and parsed rows
+        self.total = 0
+        self.parsed = 0
+
+        # Progress counters and stage timings, see the metrics property
+        self.metrics_callback = metrics_callback
+        self._metrics = Metrics(every=metrics_every)
+
+        # Prodigy hashes, set on the records and checked against the hashes of annotated tasks
+        self.hashes = hashes
+        self.known_hashes = set(known_hashes) if known_hashes is not None else None
+        self._hasher = None
+
+        # Bloom filter of the texts emitted by every run on this community
+        self.dedup = dedup
+        self.dedup_capacity = dedup_capacity
+        self.dedup_error = dedup_error
+        self._dedup = None
+
+        # Keep track of Question tags for use by Answer Posts
+        # Also keep a count of the number of expected answers and the number of seen answers
+        self.cache_size = cache_size
+        self.parent_post_attribs = ParentCache(cache_size * 1024**2, directory=self.proj_dir)
+
+        # Byte offset checkpoints of the main file
+        self.checkpoint = int(checkpoint)
+        self.checkpoints = None
+        resume_key = [*self.resume_from][0] if self.resume_from else None
+        if (self.checkpoint or resume_key == 'Checkpoint') and (self.reader != 'lines' or self.splits):
+            raise ValueError("Checkpoints need reader='lines' and an xml file on disk, without splits")
+
+        # Delta parsing against the activity index of the previous dump
+        self.delta = delta
+        self.deleted_ids = None
+        if self.delta and (self.splits or self.resume_from):
+            raise ValueError("delta cannot be combined with splits or resume_from")
+
+        # The lines reader skips unchanged and filtered out rows on their raw bytes. Ids and byte offsets of the
+        # skipped Questions with Answers are kept, for the Answers that are parsed to look up.
+        self._question_ids, self._question_offsets = None, None
+        self._question_file = None
+        self._filter_lines = False
+
+        self.pipeline = int(pipeline)
+        if self.pipeline < 0:
+            self.pipeline = max(self.cpu_count - 2, 1)
+        if self.pipeline and (self.splits or self.checkpoint):
+            raise ValueError("pipeline cannot be combined with splits or checkpoint")
+
+        # Outputs of a fan-out parse, see iter_views
+        self._views = None
+
+        # Random access to single posts and threads, through an index built on first use
+        self._post_index = None
+        self._lookup_files = {}
+        self._lookup_lock = threading.Lock()
+
+    def prepare(self):
+        """
+        Locate, download and extract the files and build the secondary indexes now, rather than on the first read,
+        e.g. to raise errors about the files early. Every method that reads the files calls it.
+
+        :returns: self
+        """
+        if not self._ready:
+            self._setup()
+            self._ready = True
+        return self
+
+    def _setup(self):
+        """
+        Resolve the file and community arguments to the xml files, downloading and extracting the archive if needed,
+        open the main file and build the secondary indexes
+        """
+        file, community = self._source, self.community
         if 'post' in self.content_type:
             _name = 'Posts'
             _ = ''
@@ -136,8 +357,11 @@ class StackExchangeParser(object):
 
         # File is a string and a 7-Zip file
         elif string_like and '.7z' in file:
-            file = self._rename_and_extract_7zip(file, _name)
-            se_files = {key: Path(file).absolute() for key, file in file.items()}
+            if self.extract:
+                file = self._rename_and_extract_7zip(file, _name)
+                se_files = {key: Path(file).absolute() for key, file in file.items()}
+            else:
+                se_files = self._stream_7zip(file, _name)
 
         # File is a string and an XML file
         elif string_like and '.xml' in file:
@@ -171,7 +395,10 @@ class StackExchangeParser(object):
                 self.log('STREAM: Cached 7zip files found!')
                 file = cache['7z']
                 self.log('STREAM: {} downloaded. Attempting to decompress {} file{}'.format(file, _name, _))
-                se_files = self._rename_and_extract_7zip(file, _name)
+                if self.extract:
+                    se_files = self._rename_and_extract_7zip(file, _name)
+                else:
+                    se_files = self._stream_7zip(file, _name)
 
             else:
                 self.log('STREAM: No cached files found in project directory')
@@ -180,7 +407,10 @@ class StackExchangeParser(object):
                 download_file = self._download_community(self.community)
                 # Rename the file's so they have the community tag prepended and extract
                 self.log('STREAM: {} downloaded. Attempting to decompress {} file{}'.format(download_file, _name, _))
-                se_files = self._rename_and_extract_7zip(download_file, _name)
+                if self.extract:
+                    se_files = self._rename_and_extract_7zip(download_file, _name)
+                else:
+                    se_files = self._stream_7zip(download_file, _name)
 
         else:
             raise ValueError("File not understood. Please check file parameter and try again.")
@@ -213,10 +443,14 @@ class StackExchangeParser(object):
             self.log('STREAM: {} file found'.format(se_file.as_posix()))
             self.file[key] = se_file
 
+        if self.splits and (self.content_type not in self._TYPES[:3] or not isinstance(self.file['Posts'], Path)):
+            raise ValueError("splits can only be used with the {} content_types on an xml file"
+                             .format(self._TYPES[:3]))
+
         # Lazily load the xml file, puts a blocking lock on the file
         # Just parse posts
         if self.content_type in self._TYPES[:3]:
-            self.tree = ET.iterparse(self.file['Posts'].as_posix(), events=['end'])
+            self.tree = self._row_reader('Posts')
             self.type = 'Posts'
             self.second_tree = None
 
@@ -225,80 +459,231 @@ class StackExchangeParser(object):
 
             # Parse posts with Comments
             if self.content_type == self._TYPES[3]:
-                self.tree = ET.iterparse(self.file['Posts'].as_posix(), events=['end'])
+                self.tree = self._row_reader('Posts')
                 self.type = 'Posts'
-                self.second_tree = ET.parse(self.file['Comments'].as_posix()).getroot()
+                self.second_tree = None
                 self.second_type = 'Comments'
+                # Group the comments by PostId once, instead of searching the Comments tree for every post
+                self.comment_index = CommentIndex.from_xml(self._open(self.file['Comments']))
 
             # Parse Comments with parent post metadata
             else:
-                self.tree = ET.iterparse(self.file['Comments'].as_posix(), events=['end'])
+                self.tree = self._row_reader('Comments')
                 self.type = 'Comments'
 
+                self.second_tree = None
                 try:
-                    self.second_tree = ET.parse(self.file['Posts'].as_posix()).getroot()
+                    posts = self.file['Posts']
                     self.second_type = 'Posts'
 
                 # a 'Posts.xml' file was not passed in, check for it in the same dir before setting second tree to None
                 except KeyError:
-                    tree, self.second_type = self._find_other_file(self.file['Comments'], 'Posts')
-                    self.second_tree = ET.parse(tree.as_posix()).getroot()
+                    posts, self.second_type = self._find_other_file(self.file['Comments'], 'Posts')
+
+                # Only the parent Title and Tags are needed, so keep a compact Id lookup rather than the whole tree
+                self.post_lookup = PostLookup.from_xml(self._open(posts)) if posts else None
 
         # Parse tags
         elif self.content_type == self._TYPES[6]:
-            self.tree = ET.iterparse(self.file['Tags'].as_posix(), events=['end'])
+            self.tree = self._row_reader('Tags')
             self.type = 'Tags'
             self.second_tree = None
             self.second_type = None
-        
-        # To identify even more specific results a user can supply a StackExchange tag or tags.
-        # Only Posts with one or more tags will be returned
-        if type(onlytags) == str:
-            onlytags = [onlytags]
-        self.onlytags = onlytags
-        
-        # Keep a count of total and parsed rows
-        self.total = 0
-        self.parsed = 0
-        
-        # Keep track of Question tags for use by Answer Posts
-        # Also keep a count of the number of expected answers and the number of seen answers
-        self.parent_post_attribs = {}
+
+        # Inverted index of the posts of each tag
+        if self._use_tag_index:
+            if not isinstance(self.file['Posts'], Path):
+                raise ValueError("tag_index needs reader='lines' and a Posts xml file on disk, without splits or delta")
+            self.tag_index = self._load_tag_index()
+            if self.onlytags:
+                missing = [tag for tag in self.onlytags if tag not in self.tag_index]
+                if missing:
+                    self.log("STREAM: No posts are tagged {}".format(', '.join(missing)))
+                self._tag_offsets = self.tag_index.offsets(self.onlytags)
+                self.log("STREAM: Reading the {} posts tagged {}".format(len(self._tag_offsets),
+                                                                         ', '.join(self.onlytags)))
+                self.tree = self._row_reader('Posts')
+
+        # Byte offset checkpoints of the main file
+        self.checkpoints = Checkpoint(self.proj_dir.joinpath('checkpoints', '{}_{}_{}.ckpt'.format(
+            self.community, self.type, self.content_type)))
+        resume_key = [*self.resume_from][0] if self.resume_from else None
+        if (self.checkpoint or resume_key == 'Checkpoint') and not isinstance(self.file[self.type], Path):
+            raise ValueError("Checkpoints need reader='lines' and an xml file on disk, without splits")
+        if resume_key == 'Checkpoint' or (resume_key == 'Id' and self.reader == 'lines'
+                                          and isinstance(self.file[self.type], Path) and not self.splits):
+            self._restore_checkpoint()
+
+        # Delta parsing against the activity index of the previous dump
+        if self.delta:
+            self.activity_path = self.proj_dir.joinpath('activity', '{}_{}.idx'.format(self.community, self.type))
+            self.previous_activity = ActivityIndex.load(self.activity_path)
+            self.activity = ActivityIndex()
+
+        # Skipped Questions are read back from the file, so the filter is checked on decoded rows of a 7zip stream
+        self._filter_lines = self.row_filter is not None and self.reader == 'lines' and \
+            isinstance(self.file[self.type], Path)
+        if self.reader == 'lines' and (self.delta or self._filter_lines):
+            self._question_ids, self._question_offsets = array('q'), array('q')
+            self.tree.keep = self._keep_line
+
+    def _load_tag_index(self):
+        """
+        Load the tag index of the Posts file from proj_dir/indexes, building it if it is missing or out of date
+
+        :returns: TagIndex
+        """
+        posts = self.file['Posts']
+        path = self.proj_dir.joinpath('indexes', '{}.tags'.format(posts.stem))
+        index = TagIndex.load(path)
+        if index is None or index.source != TagIndex.describe(posts) or index.synonyms != self.tag_synonyms:
+            self.log("STREAM: Building the tag index of {}".format(posts.as_posix()))
+            tags, _ = self._find_other_file(posts, 'Tags')
+            index = TagIndex.from_xml(posts, self._open(tags) if tags else None, self.tag_synonyms)
+            index.save(path)
+        return index
+
+    def _resolve_synonyms(self, filters):
+        """
+        :param filters: RowFilter
+        :returns: RowFilter, the same criteria with every tag that is a synonym replaced by the tag it stands for
+        """
+        if not filters.tags or not self.tag_synonyms:
+            return filters
+        tags = list(dict.fromkeys(self.tag_synonyms.get(tag, tag) for tag in filters.tags))
+        return RowFilter(**dict(filters.criteria, tags=tags))
+
+    def _activity_changed(self, row_id, stamp):
+        """
+        Record a row of the new dump in the activity index
+
+        :returns: Boolean, True if the row is new or has changed since the previous dump
+        """
+        self.activity.add(row_id, stamp)
+        return self.previous_activity is None or self.previous_activity.changed(row_id, stamp)
+
+    def _keep_line(self, line):
+        """
+        Check a row of the lines reader for changes and against the row filter on its raw bytes, before it is decoded
+
+        :param line: bytes, the <row/> element
+        :returns: Boolean, True if the row is new or changed, passes the filter, and should be parsed
+        """
+        row_id, reason = None, 'unchanged'
+        if self.delta:
+            row_id = int(self._RAW_ID.search(line).group(1))
+            stamp = ActivityIndex.stamp(*[date.decode() for date in self._RAW_DATES.findall(line)])
+            keep = self._activity_changed(row_id, stamp)
+        else:
+            keep = True
+        if keep and self._filter_lines:
+            keep, reason = self.row_filter.match_line(line), 'filter'
+        if keep:
+            return True
+        dropped = self._metrics.dropped_raw
+        dropped[reason] = dropped.get(reason, 0) + 1
+        if self.type == 'Posts' and b' PostTypeId="1"' in line and b' AnswerCount="0"' not in line:
+            # Remember where skipped Questions are, for the Answers that are parsed to look up
+            if row_id is None:
+                row_id = int(self._RAW_ID.search(line).group(1))
+            self._question_ids.append(row_id)
+            self._question_offsets.append(self.tree.offset - len(line))
+        return False
+
+    def _load_question(self, post_id):
+        """
+        Read an unchanged Question skipped by the delta filter back in, so its Answers get its title and tags
+        """
+        i = bisect_left(self._question_ids, int(post_id))
+        if i == len(self._question_ids) or self._question_ids[i] != int(post_id):
+            return
+        if self._question_file is None:
+            self._question_file = open(self.file['Posts'].as_posix(), 'rb')
+        self._question_file.seek(self._question_offsets[i])
+        atb = parse_row(self._question_file.readline(), self._QUESTION_FIELDS)
+        self._enrich_post(self._read_post(atb))
+
+    def _finish_delta(self):
+        previous = self.previous_activity
+        self.deleted_ids = previous.deleted(self.activity) if previous is not None else array('q')
+        self.activity.save(self.activity_path)
+        self.log("STREAM: {} rows new or changed, {} deleted since the previous dump".format(self.parsed,
+                                                                                              len(self.deleted_ids)))
+
+    def _restore_checkpoint(self):
+        """
+        Load a checkpoint, reopen the main file at its offset and restore the row counts and Answer bookkeeping
+        """
+        (key, value), = self.resume_from.items()
+        checkpoints = self.checkpoints if key != 'Checkpoint' or value is None else Checkpoint(value)
+        state = checkpoints.load()
+        if state is None:
+            if key == 'Checkpoint':
+                raise ValueError("No checkpoint found at {}".format(checkpoints.path))
+            return
+        if key == 'Id' and (state['last_id'] is None or int(state['last_id']) > int(value)):
+            return  # The checkpoint is past the Id, so it does not help
+
+        source = self.file[self.type]
+        if state['file'] != source.as_posix() or state['content_type'] != self.content_type:
+            if key != 'Checkpoint':
+                return
+            raise ValueError("Checkpoint {} was taken for {} of {}".format(checkpoints.path, state['content_type'],
+                                                                            state['file']))
+        if state['size'] != source.stat().st_size:
+            if key != 'Checkpoint':
+                return
+            raise ValueError("{} has changed since checkpoint {} was taken".format(source, checkpoints.path))
+
+        self.log("STREAM: Resuming from byte {} of {}".format(state['offset'], source.as_posix()))
+        self.tree = self._row_reader(self.type, start=state['offset'])
+        self.total = state['total']
+        # The rows before the offset are not read again, so they count as dropped by the resume
+        self._metrics.drop('resume', state['total'])
+        self.parsed = state['parsed']
+        self.parent_post_attribs = state['parent_post_attribs']
+
+    def _save_checkpoint(self, offset, total, last_id):
+        """
+        :param offset: int, byte offset of the first line not yet processed
+        :param total: int, rows before offset
+        :param last_id: string, Id of the last row before offset
+        """
+        source = self.file[self.type]
+        self.checkpoints.save({'file': source.as_posix(), 'size': source.stat().st_size,
+                               'content_type': self.content_type, 'offset': offset, 'total': total,
+                               'parsed': self.parsed, 'last_id': last_id,
+                               'parent_post_attribs': self.parent_post_attribs})
+        if self._dedup is not None:
+            self._dedup.flush()
 
     def chunk_and_order_file(self):
-        if self.splits < 0 or not isinstance(self.splits, int):
-            self.splits = splits = self.cpu_count - 2
-        order = self.order
-        markers = generate_file_markers(self.file['Posts'])
-        return self._order_file_markers(markers, order, splits)
+        """
+        Split the Posts file into row-aligned byte ranges and order them for the worker processes
+
+        :returns: List of (start byte, end byte) tuples
+        """
+        self.prepare()
+        markers = generate_file_markers(self.file['Posts'].as_posix(), mem_size=32)
+        return self._order_file_markers(markers, self.order, self.splits)
 
     def _order_file_markers(self, markers, order, n):
-        ORDERS = ['default', 'beginning', 'ending', 'shuffle', 'split']
         order = order.lower()
-        if order not in ORDERS:
-            print("The order you provided is not recognized")
-            answer = input("Do you wish to use default sorting order?: ")
-            if answer.lower() in ['y', 'yes', 'ye', 'okay', 'ok']:
-                order = 'beginning'
-            else:
-                return None
-
-        splits = chunker(markers, n)
-
-        if order == 'default':
-            return splits
 
-        elif order == 'beginning':
-            return list(chain.from_iterable(splits))
+        if order in ('default', 'beginning', 'completed'):
+            return markers
 
         elif order == 'ending':
-            return [split[::-1] for split in splits]
+            return markers[::-1]
 
         elif order == 'shuffle':
-            return [np.random.shuffle(split) for split in splits]
+            markers = list(markers)
+            random.shuffle(markers)
+            return markers
 
         elif order == 'split':
-            return list(zip(*splits))
+            splits = list(chunker(markers, n))
+            return [marker for group in zip_longest(*splits) for marker in group if marker is not None]
 
     def _check_for_cached(self, com, file_type):
         files = {x.name: x for x in self.proj_dir.iterdir() if x.is_file()}
@@ -316,6 +701,9 @@ class StackExchangeParser(object):
             return {}
 
     def _find_other_file(self, file, other):
+        if isinstance(file, ArchiveMember):
+            test = file.sibling(other)
+            return (test, other) if test is not None else (None, None)
         com_file = file.name
         # We only want to load the other file if we know it's from the same community,
         # because the file type is prepended by the community i.e. 'ai_Posts.xml'
@@ -326,24 +714,37 @@ class StackExchangeParser(object):
             return None, None
 
     def _get_community_names(self):
-        URL = self.URL
-        page = requests.get(URL)
-        page_html = BeautifulSoup(page.text, 'lxml')
-        div = page_html.find('div', class_='download-directory-listing')
-        coms, dates = [], set()
-        for row in div.select('table.directory-listing-table tr'):
-            contents = row.contents
-            com = str(contents[1].contents[0].contents[0])
-            if '7z' in com:
-                coms.append(com.replace('.7z', ''))
-                d = contents[3].contents[0][:11]
-                dates.add(d[3:].replace('-', ''))
-
-        return coms, dates.pop()
+        return fetch_listing(self.URL)
+
+    def _load_communities(self):
+        self._communities, self._latest_data_date = self.manifest.load(self._get_community_names,
+                                                                       offline=self.offline)
+        self.log("STREAM: {} community names read from the {}".format(len(self._communities),
+                                                                     self.manifest.source or 'offline mode'))
+
+    @property
+    def communities(self):
+        """
+        Set of the community names in the archive
+        """
+        if self._communities is None:
+            self._load_communities()
+        return self._communities
+
+    @property
+    def latest_data_date(self):
+        """
+        Date of the latest archive dump, YYYYMMDD
+        """
+        if self._communities is None:
+            self._load_communities()
+        return self._latest_data_date
 
     def _verify_community_names(self, com):
         com = '.'.join(re.split('[._]', com))
         assert isinstance(com, str), "Community name must be in string format. Instead got {}".format(type(com))
+        if self.offline:
+            return com
         if com not in self.communities:
             self.log("STREAM: {com} not found in online archive at {url}".format(com=com, url=self.URL))
             raise ValueError("StackExchange community--{com}--not found in online archive at {url}"
@@ -351,6 +752,119 @@ class StackExchangeParser(object):
         else:
             return com
 
+    @staticmethod
+    def _archive_file_names(name):
+        posts = 'Posts' in name
+        comments = 'Comments' in name
+        tags = 'Tags' in name
+
+        if (posts and not comments) or (not posts and not comments and not tags):
+            return ['Posts.xml']
+        elif comments and not posts:
+            return ['Comments.xml']
+        elif comments and posts:
+            return ['Posts.xml', 'Comments.xml']
+        elif tags:
+            return ['Tags.xml']
+        else:
+            return None
+
+    def _stream_7zip(self, file, name):
+        """
+        Locate the requested xml files inside a 7zip archive without modifying or extracting it
+
+        :param file: string or Path to a StackExchange 7zip archive
+        :param name: string, file types to read, e.g. 'Posts' or 'Posts & Comments'
+        :returns: dictionary mapping file type to ArchiveMember
+        """
+        program = find_program(name=self.community)
+        if program is None:
+            raise EnvironmentError("7-Zip not found in OS environment. Archive cannot be read")
+
+        se_file_name = Path(file).absolute()
+        assert (se_file_name.exists()), "Cannot find {} file. Please check the path name and try again"\
+            .format(se_file_name.as_posix())
+        input_names = self._archive_file_names(name)
+        if input_names is None:
+            self.type = None
+            return None
+
+        # Archives extracted by earlier runs have their files renamed to '<community>_Posts.xml'
+        members = capture_7zip_stdout([program, "l", "-ba", "-slt", se_file_name.as_posix()])
+        output_files = {}
+        for input_name in input_names:
+            renamed = [m for m in members if m.split('_')[-1] == input_name]
+            member = input_name if input_name in members or not renamed else renamed[0]
+            output_files[input_name.replace('.xml', '')] = ArchiveMember(program, se_file_name, member, members)
+        return output_files
+
+    @staticmethod
+    def _open(se_file):
+        """
+        :param se_file: Path to an xml file or ArchiveMember of a 7zip archive
+        :returns: source that ElementTree can parse incrementally
+        """
+        if isinstance(se_file, ArchiveMember):
+            return se_file.open()
+        return se_file.as_posix()
+
+    def _row_reader(self, key, start=0, end=None):
+        """
+        :param key: string, the file to read, 'Posts', 'Comments' or 'Tags'
+        :param start: int, byte offset to start reading at, lines reader only
+        :param end: int or None, byte offset to stop reading at, lines reader only
+        :returns: TreeReader or LineReader over the file, depending on the reader setting
+        """
+        if self.reader == 'iterparse':
+            return TreeReader(self._open(self.file[key]))
+
+        fields, where = None, None
+        if key == 'Posts':
+            fields = set(self._POST_FIELDS)
+            if self.content_type == 'post_title':
+                fields.discard('Body')
+            where = {'PostTypeId': (1, 2)}
+        elif key == 'Comments':
+            fields = self._COMMENT_FIELDS
+        if key == 'Posts' and self._tag_offsets is not None:
+            return OffsetReader(self._open(self.file[key]), self._tag_offsets, start=start, end=end, fields=fields,
+                                where=where)
+        return LineReader(self._open(self.file[key]), start=start, end=end, fields=fields, where=where)
+
+    def _rows(self):
+        """
+        Read the main file, checking that it matches the content_type
+
+        :returns: generator of attribute dictionaries, one per row
+        """
+        counted = self.total
+        metrics, clock = self._metrics, time.perf_counter
+        start = clock()
+        for atb in self.tree:
+            if counted == self.total:
+                self._check_root(self.tree.root)
+            # Rows skipped by the lines reader on their raw bytes are counted too
+            self.total = counted + self.tree.rows
+            metrics.parse += clock() - start
+            yield atb
+            start = clock()
+        self.total = counted + self.tree.rows
+        metrics.parse += clock() - start
+
+    def _check_root(self, tag):
+        # Start of file, check that the file matches the expected content_type
+        if self.content_type in self._TYPES[:4]:
+            assert(tag == 'posts'), "Input file is not a StackExchange Posts.xml file. \
+            Please check the path name and try again"
+
+        elif self.content_type in self._TYPES[4:6]:
+            assert(tag == 'comments'), "Input file is not a StackExchange Comments.xml file. \
+            Please check the path name and try again"
+
+        elif self.content_type == self._TYPES[6]:
+            assert(tag == 'tags'), "Input file is not a StackExchange Tags.xml file. \
+            Please check the path name and try again"
+
     def _rename_and_extract_7zip(self, file, name):
         program = find_program(name=self.community)
         if program is None:
@@ -365,28 +879,12 @@ class StackExchangeParser(object):
         file_name = se_file_name.name
         file_path = se_file_name.as_posix()
 
-        posts = 'Posts' in name
-        comments = 'Comments' in name
-        tags = 'Tags' in name
-
         com_name = file_name.split('.')[0]
-        if (posts and not comments) or (not posts and not comments and not tags):
-
-            input_names = ['Posts.xml']
-            output_names = ['{}_Posts.xml'.format(com_name)]
-        elif comments and not posts:
-            input_names = ['Comments.xml']
-            output_names = ['{}_Comments.xml'.format(com_name)]
-        elif comments and posts:
-            input_names = ['Posts.xml', 'Comments.xml']
-            output_names = ['{}_Posts.xml'.format(com_name), '{}_Comments.xml'.format(com_name)]
-        elif tags:
-            input_names = ['Tags.xml']
-            output_names = ['{}_Tags.xml'.format(com_name)]
-
-        else:
+        input_names = self._archive_file_names(name)
+        if input_names is None:
             self.type = None
             return None
+        output_names = ['{}_{}'.format(com_name, input_name) for input_name in input_names]
         parent = se_file_name.parent
 
         archive_details = capture_7zip_stdout([program, "l", "-ba", "-slt", file_path])
@@ -400,29 +898,30 @@ class StackExchangeParser(object):
         return output_files
 
     def _download_community(self, community):
+        if self.offline:
+            raise EnvironmentError("{} is not cached in {} and cannot be downloaded offline".format(community,
+                                                                                                 self.proj_dir))
         url = self.URL + community + '.7z'
         local_filename = self.proj_dir.joinpath(url.split('/')[-1])
+        return download_file(url, local_filename, connections=self.connections, log=self.log)
 
-        with requests.get(url, stream=True) as r:
-            r.raise_for_status()
-            with open(local_filename, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    if chunk:  # filter out keep-alive new chunks
-                        f.write(chunk)
-        time.sleep(2)  # Under conditions of heavy disk usage, the filesystem may not unlock the file for a few seconds
-        return local_filename
+    def _strip_html(self, text, complete=False):
+        """
+        Remove HTML tags from text and unescape HTML character references
 
-    def _clean_text(self, text):
-        stripper = self._TagStripper()
-        stripper.feed(text)
-        text = stripper.get_data()
+        :param text: string of HTML
+        :param complete: Boolean, If True, return None when the HTML ends part way through a tag or a <script> or
+            <style> element, i.e. when stripping text + more would not equal stripping text, then stripping more.
+        :returns: string devoid of HTML tags, or None
+        """
+        return self.cleaner.strip(text, complete)
 
+    def _collapse_newlines(self, text):
         # Remove extra newlines or all newlines
-        if self.newlines:
-            cleantext = self.newline.sub(r'\n', text)
-        else:
-            cleantext = self.newline.sub(r' ', text)
-        return cleantext
+        return self.cleaner.collapse(text)
+
+    def _clean_text(self, text):
+        return self.cleaner.clean(text)
 
     def _parse_tags(self, tags):
         """
@@ -435,254 +934,1240 @@ class StackExchangeParser(object):
         if tags == '':
             return None
         else:
-            t = re.compile('<(.+?)>')
-            m = t.findall(tags)
-            return m
+            return self._TAG_PATTERN.findall(tags)
 
-    def __next__(self):
-        return self.iter.__next__()
+    def _skip_row(self, atb):
+        """
+        Check a row against the resume_from setting
 
-    def __iter__(self):
-        # Get values for filtering out rows
-        if self.resume_from is None or self.resume_from is False:
-            key, value = None, None
+        :param atb: dictionary of row attributes
+        :returns: True if the row should be skipped
+        """
+        # If the user wants to resume parsing from a previous stopping point
+        # then check for the value of that attribute for the current child
+        if not self.resume_from:
+            return False  # Not filtering results
+        (key, value), = self.resume_from.items()
+        if value is None:
+            return False
+        elif key == 'Id':
+            # Resume after the row with this Id
+            return int(atb.get(key, 0)) <= int(value)
+        elif key == 'Date':
+            default = '2001-01-01'
+            create = atb.get('CreationDate', default)
+            edit = atb.get('LastEditDate', default)
+            active = atb.get('LastActivityDate', default)
+
+            item = max(create, edit, active)
+            return value > item
+        return False
+
+    def _track_skipped(self, atb):
+        """
+        Keep the Answer bookkeeping for a Posts row before the resume point. The row is not emitted, but a Question
+        before the point is still tracked for its Answers after it.
+
+        :param atb: dictionary of row attributes
+        """
+        if self.content_type not in self._TYPES[:4]:
+            return
+        post = self._read_post(atb)
+        if post is None:
+            return
+        if self._question_ids is not None and post.posttype == 2 and post.parentid not in self.parent_post_attribs:
+            self._load_question(post.parentid)
+        self._enrich_post(post)
+
+    def _read_post(self, atb):
+        """
+        Pull the fields of a Question or Answer row out of its attributes
+
+        :param atb: dictionary of row attributes
+        :returns: _Post, or None if the row is not a Question or an Answer
+        """
+        posttype = int(atb.get('PostTypeId', None))
+        if posttype not in (1, 2):  # Only interested in Post Type 1 (Question) and 2 (Answer)
+            return None
+        tags = atb.get('Tags', None)
+        if tags is not None:
+            tags = self._parse_tags(tags)
+        aa = atb.get('AcceptedAnswerId', None)
+        return _Post(posttype=posttype,
+                     id=atb.get('Id', None),
+                     parentid=atb.get('ParentId', None),
+                     title=atb.get('Title', None),
+                     body=atb.get('Body', None),
+                     tags=tags,
+                     answers=int(atb.get('AnswerCount', 0)),
+                     comments=int(atb.get('CommentCount', 0)),
+                     favorites=int(atb.get('FavoriteCount', 0)),
+                     score=int(atb.get('Score', 0)),
+                     views=int(atb.get('ViewCount', 0)),
+                     accepted=int(aa) if aa is not None else aa,
+                     created=atb.get('CreationDate', None),
+                     edited=atb.get('LastEditDate', None),
+                     active=atb.get('LastActivityDate', None))
+
+    def _enrich_post(self, post):
+        """
+        Keep track of Questions for their Answers, give Answers the title and tags of their Question, and apply the
+        onlytags filter. Must see the posts in file order.
+
+        :param post: _Post
+        :returns: Tuple of (title, tags) for the post, or None if the post is filtered out
+        """
+        # Preserve Tag information from Questions for reference by Answers
+        if post.posttype == 1:
+            if post.answers > 0:
+                self.parent_post_attribs.add(post.id, post.title, post.tags, post.answers)
+            title, tags = post.title, post.tags
+
+        # If this post is an answer, lookup the tags and title of the parent question. The cache counts the seen
+        # answers, and drops the Question once all of them have been seen
         else:
-            key, value = self.resume_from.items()
+            parent = self.parent_post_attribs.answer(post.parentid) if post.parentid is not None else None
+            title, tags = parent if parent is not None else (None, None)
+
+        # If the user only wants text from Posts with specific stackExchange tags,
+        # only return content that matches. Naively iterates through the stream of Posts.
+        # It does not know if the tag actually exists.
+        # If the user supplies tags, and no tags match, skip this post
+        if self.onlytags and not tags:
+            return None
+        elif self.onlytags and not any([tag for tag in tags if tag in self.onlytags]):
+            return None
+        return title, tags
 
-        # Iterate through the file and yield the text
-        for _, child in self.tree:
-
-            self.total += 1
-            if self.total % 10000 == 0:
-                self.log("STREAM: Fetching {} child element".format(self.total))
-
-            # Start of file, check that the file matches the expected content_type
-            if child.tag != 'row':
-                if self.content_type in self._TYPES[:4]:
-                    assert(child.tag == 'posts'), "Input file is not a StackExchange Posts.xml file. \
-                    Please check the path name and try again"
-
-                elif self.content_type in self._TYPES[4:6]:
-                    assert(child.tag == 'comments'), "Input file is not a StackExchange Comments.xml file. \
-                    Please check the path name and try again"
-
-            else:   
-                atb = child.attrib
-                # If the user wants to resume parsing from a previous stopping point
-                # then check for the value of that attribute for the current child
-                if key is None or value is None:
-                    pass  # Not filtering results
-                elif key == 'Id':
-                    item = atb.get(key, None)
-                    if value != item:
-                        child.clear()
-                        continue
-                elif key == 'Date':
-                    default = '2001-01-01'
-                    create = atb.get('CreationDate', default)
-                    edit = atb.get('LastEditDate', default)
-                    active = atb.get('LastActivityDate', default)
-
-                    item = max(create, edit, active)
-                    if value > item:
-                        child.clear()
-                        continue
-
-                # Fetch the necessary information based on the content_type specified
-                if self.content_type in self._TYPES[:4]:
-                    # Assemble the prodigy stream compliant dictionary object
-                    info = {"meta": {"source": "            ", "Community": self.community, "file_type": self.type}}
-
-                    id = atb.get('Id', None)
-                    title = atb.get('Title', None)
-                    body = atb.get('Body', None)
-                    tags = atb.get('Tags', None)
-                    if tags is not None:
-                        tags = self._parse_tags(tags)
-                    posttype = int(atb.get('PostTypeId', None))
-                    answers = int(atb.get('AnswerCount', 0))
-                    comments = int(atb.get('CommentCount', 0))
-
-                    if self.content_type == 'all_text' and comments > 0:
-                        post_comments = self.second_tree.findall("*[@PostId='{}']".format(id))
-                        if post_comments:
-                            comments_text = [comment.attrib['Text'] for comment in post_comments]
-                        else:
-                            comments_text = []
-                    else:
-                        post_comments = None
-                        comments_text = []
-
-                    # Preserve Tag information from Questions for reference by Answers
-                    if posttype == 1:
-                        if answers > 0:
-                            self.parent_post_attribs[id] = {'tags': tags, 'title': title, 'answers': answers, 'seen': 0}
-                        parentid = None
-
-                    # If this post is an answer, lookup the tags and title of the parent question
-                    elif posttype == 2:
-                        parentid = atb.get("ParentId", None)
-                        parent = parentid in self.parent_post_attribs.keys()
-                        
-                        if parent:
-                            # Update the seen answer count
-                            self.parent_post_attribs[parentid]['seen'] += 1
-                            # Get parent attributes
-                            tags = self.parent_post_attribs[parentid].get('tags', None)
-                            title = self.parent_post_attribs[parentid].get('title', None)
-
-                            if self.parent_post_attribs[parentid]['seen'] >= \
-                                    self.parent_post_attribs[parentid]['answers']:
-                                # We've seen all the answers, delete the Parent Id entry to free up memory
-                                del self.parent_post_attribs[parentid]
-                        else:
-                            tags = None
-                            title = None
-                    else:  # Only interested in Post Type 1 (Question) and 2 (Answer)
-                        child.clear()
-                        continue
-
-                    # If the user only wants text from Posts with specific stackExchange tags,
-                    # only return content that matches. Naively iterates through the stream of Posts.
-                    # It does not know if the tag actually exists.
-                    # If the user supplies tags, and no tags match, skip this post
-                    if self.onlytags and not tags:
-                        child.clear()
-                        continue
-
-                    elif self.onlytags and not any([tag for tag in tags if tag in self.onlytags]):
-                        child.clear()
-                        continue
-                    # This post has what we want
-                    else:   
-                        
-                        if self.content_type == 'all_text':
-                            if post_comments:
-                                text = title + '\n' + body + '\n'.join(comments_text)
-                            else:
-                                if title and body:
-                                    text = title + '\n' + body
-                                elif body and not title:
-                                    text = body
-                                elif title and not body:
-                                    text = title
-                                else:
-                                    text = None
-
-                        elif self.content_type in 'post_both':
-                            if title and body:
-                                text = title + '\n' + body
-                            elif body and not title:
-                                text = body
-                            elif title and not body:
-                                text = title
-                            else:
-                                text = None
-
-                        elif self.content_type == 'post_title':
-                            text = title
-
-                        elif self.content_type == 'post_body':
-                            text = body
-
-                    # unescape HTML encoding and remove html tags
-                    # Preserve the original HTML
-                    info['html'] = text
-
-                    # TODO: Sometimes causes problems in the HTML stripper, disable for now, investigate later
-                    # text = html.unescape(text)
-                    cleantext = self._clean_text(text)
+    def _post_text(self, post, title, content_type=None):
+        """
+        :param post: _Post
+        :param title: string, title of the post, or of its Question for an Answer
+        :param content_type: string, content_type to build the text for, the parser's if None
+        :returns: the HTML text to return for the content_type, or None
+        """
+        body = post.body
+        content_type = content_type or self.content_type
+        if content_type == 'all_text':
+            comments_text = self.comment_index.get(post.id) if post.comments > 0 else []
+            if comments_text:
+                return (title + '\n' if title else '') + (body or '') + '\n'.join(comments_text)
+
+        if content_type in ('all_text', 'post_both'):
+            if title and body:
+                return title + '\n' + body
+            elif body and not title:
+                return body
+            elif title and not body:
+                return title
+            else:
+                return None
 
-                    # Append the text and additional metadata to the stream dictionary
-                    info['text'] = cleantext
-                    info['meta']['Id'] = int(id)
-                    if posttype == 2:
-                        info['meta']['ParentTitle'] = title
-                        info['meta']['ParentTags'] = tags
-                        info['meta']['ParentId'] = int(parentid)
-                    else:
-                        info['meta']['Title'] = title
-                        info['meta']['Tags'] = tags
-                    info['meta']['FavoriteCount'] = int(atb.get('FavoriteCount', 0))
-                    info['meta']['PostScore'] = int(atb.get('Score', 0))
-                    info['meta']['CommentCount'] = comments
-                    info['meta']['Views'] = int(atb.get('ViewCount', 0))
-                    aa = atb.get('AcceptedAnswerId', None)
-                    info['meta']['AcceptedAnswer'] = int(aa) if aa is not None else aa
-                    info['meta']['CreationDate'] = atb.get('CreationDate', None)
-                    info['meta']['LastEditDate'] = atb.get('LastEditDate', None)
-                    info['meta']['LastActivityDate'] = atb.get('LastActivityDate', None)
-
-                    # yield the dictionary
-                    self.parsed += 1
-                    if self.total % 10000 == 0:
-                        self.log("STREAM: {p} of {t} XML child element parsed".format(p=self.parsed, t=self.total), info)
-                    yield info
-
-                elif self.content_type in self._TYPES[4:6]:
-                    # Assemble the prodigy stream compliant dictionary object
-                    info = {"meta": {"source": "StackExchange", "Community": self.community, "file_type": self.type}}
-                    id = atb.get('Id', None)
-                    postid = atb.get('PostId', None)
-                    body = atb.get('Text', None)
-                    # Get attributes from parent post
-                    if self.second_tree:
-                        parent = self.second_tree.find("*[@Id='{}']".format(postid))
-                        parent_tags = parent.attrib.get('Tags', '')
-                        if parent_tags:
-                            parent_tags = self._parse_tags(parent_tags)
-                        parent_title = parent.attrib.get('Title', '')
-                        parent.clear()
-                    else:
-                        parent_tags = None
-                        parent_title = None
+        elif content_type == 'post_title':
+            return title
 
-                    if self.onlytags and not parent_tags:
-                        child.clear()
-                        continue
+        elif content_type == 'post_body':
+            return body
 
-                    elif self.onlytags and not any([tag for tag in parent_tags if tag in self.onlytags]):
-                        child.clear()
-                        continue
+    def _post_info(self, post, title, tags, text, cleantext):
+        """
+        Assemble the prodigy stream compliant dictionary object for a post
+        """
+        info = {"meta": {"source": "            ", "Community": self.community, "file_type": self.type}}
+
+        # Preserve the original HTML
+        info['html'] = text
+
+        # Append the text and additional metadata to the stream dictionary
+        info['text'] = cleantext
+        info['meta']['Id'] = int(post.id)
+        if post.posttype == 2:
+            info['meta']['ParentTitle'] = title
+            info['meta']['ParentTags'] = tags
+            info['meta']['ParentId'] = int(post.parentid)
+        else:
+            info['meta']['Title'] = title
+            info['meta']['Tags'] = tags
+        info['meta']['FavoriteCount'] = post.favorites
+        info['meta']['PostScore'] = post.score
+        info['meta']['CommentCount'] = post.comments
+        info['meta']['Views'] = post.views
+        info['meta']['AcceptedAnswer'] = post.accepted
+        info['meta']['CreationDate'] = post.created
+        info['meta']['LastEditDate'] = post.edited
+        info['meta']['LastActivityDate'] = post.active
+        return info
+
+    def _read_comment(self, atb):
+        """
+        Pull the fields of a Comment row out of its attributes and look up its parent post
 
-                    # This comment has what we want
-                    else:
-                        if self.content_type == 'comments_both' and parent_title:
-                            text = parent_title + '\n' + body
-                        else:
-                            text = body
-
-                        # unescape HTML encoding and remove html tags
-                        # Preserve the original HTML
-                        info['html'] = text
-
-                        # Check to see if valid text was found, if not, skip to the next xml child element
-                        if text is None:
-                            child.clear()
-                            continue
-
-                        else:
-                            cleantext = self._clean_text(text)
-
-                            # Append the text and additional metadata to the stream dictionary
-                            info['text'] = cleantext
-                            info['meta']['Id'] = int(id)
-                            info['meta']['PostId'] = int(postid)
-                            info['meta']['Score'] = int(atb.get('Score', 0))
-                            info['meta']['CreationDate'] = atb.get('CreationDate', None)
-                            info['meta']['PostTitle'] = parent_title
-                            info['meta']['PostTags'] = parent_tags
-
-                            # yield the dictionary
-                            self.parsed += 1
-                            if self.total % 10000 == 0:
-                                self.log("STREAM: {p} of {t} XML child element parsed".format(p=self.parsed, t=self.total), info)
-                            yield info
+        :param atb: dictionary of row attributes
+        :returns: Tuple of (_Comment, parent title, parent tags, HTML text), or None if the comment is filtered out or
+            has no text
+        """
+        postid = atb.get('PostId', None)
+        body = atb.get('Text', None)
+        # Get attributes from parent post
+        if self.post_lookup is not None:
+            parent_title, parent_tags = self.post_lookup.get(postid, ('', None))
+            parent_title = parent_title if parent_title is not None else ''
+            parent_tags = parent_tags if parent_tags else ''
+        else:
+            parent_tags = None
+            parent_title = None
+
+        if self.onlytags and not parent_tags:
+            return None
+
+        elif self.onlytags and not any([tag for tag in parent_tags if tag in self.onlytags]):
+            return None
+
+        # This comment has what we want
+        if self.content_type == 'comments_both' and parent_title:
+            text = parent_title + '\n' + body
+        else:
+            text = body
+
+        # Check to see if valid text was found, if not, skip to the next xml child element
+        if text is None:
+            return None
+
+        comment = _Comment(id=int(atb.get('Id', None)),
+                           postid=int(postid),
+                           score=int(atb.get('Score', 0)),
+                           created=atb.get('CreationDate', None))
+        return comment, parent_title, parent_tags, text
+
+    def _comment_info(self, comment, title, tags, text, cleantext):
+        """
+        Assemble the prodigy stream compliant dictionary object for a comment
+        """
+        info = {"meta": {"source": "StackExchange", "Community": self.community, "file_type": self.type}}
+
+        # Preserve the original HTML
+        info['html'] = text
+
+        # Append the text and additional metadata to the stream dictionary
+        info['text'] = cleantext
+        info['meta']['Id'] = comment.id
+        info['meta']['PostId'] = comment.postid
+        info['meta']['Score'] = comment.score
+        info['meta']['CreationDate'] = comment.created
+        info['meta']['PostTitle'] = title
+        info['meta']['PostTags'] = tags
+        return info
+
+    def _read_tag(self, atb):
+        """
+        :param atb: dictionary of row attributes
+        :returns: _Tag, or None if the tag is filtered out by onlytags
+        """
+        name = atb.get('TagName', None)
+        if name is None or (self.onlytags and name not in self.onlytags):
+            return None
+        excerpt, wiki = atb.get('ExcerptPostId', None), atb.get('WikiPostId', None)
+        return _Tag(id=int(atb.get('Id', None)),
+                    name=name,
+                    count=int(atb.get('Count', 0)),
+                    excerpt=int(excerpt) if excerpt is not None else excerpt,
+                    wiki=int(wiki) if wiki is not None else wiki)
+
+    def _tag_info(self, tag, text):
+        """
+        Assemble the prodigy stream compliant dictionary object for a tag
+        """
+        info = {"meta": {"source": "StackExchange", "Community": self.community, "file_type": self.type}}
+        info['html'] = text
+        info['text'] = text
+        info['meta']['Id'] = tag.id
+        info['meta']['TagName'] = tag.name
+        info['meta']['Count'] = tag.count
+        info['meta']['ExcerptPostId'] = tag.excerpt
+        info['meta']['WikiPostId'] = tag.wiki
+        return info
+
+    def _parse_range(self, start, end):
+        """
+        Parse the rows in one row-aligned byte range of the Posts file. Runs in a worker process.
+
+        Questions are returned with their cleaned text. An Answer's text may start with its Question's title, which
+        only the main process knows, so Answers are returned with their body stripped of HTML and the text is
+        finished by _finish_answer once the Question has been looked up.
+
+        :returns: Tuple of (number of rows, number of bytes, dictionary of dropped rows by reason, List of (_Post,
+            reason or None, cleaned text or None, stripped body or None) tuples). The reason is 'filter' for Questions
+            the row filter drops and 'resume' for Questions before the resume point, only returned for their Answers.
+            The stripped body is None when the stripper did not consume all of it, and the Answer is cleaned in full.
+        """
+        if self.reader == 'lines':
+            rows = self._row_reader('Posts', start, end)
+        else:
+            with open(self.file['Posts'].as_posix(), 'rb') as xf:
+                xf.seek(start)
+                data = xf.read(end - start)
+            lines = [line for line in data.split(b'\n') if line.lstrip().startswith(b'<row')]
+            rows = iterparse_rows(BytesIO(b'<rows>' + b'\n'.join(lines) + b'</rows>'))
+        results, questions, texts = [], [], []
+        metrics = Metrics()
+        for atb in rows:
+            # Questions before the resume point are kept for their Answers, like the ones the row filter drops
+            reason = 'resume' if self._skip_row(atb) else None
+            if reason is None and self.row_filter is not None and not self.row_filter.match(atb):
+                reason = 'filter'
+            if reason is not None and (atb.get('PostTypeId', None) != '1' or atb.get('AnswerCount', '0') == '0'):
+                metrics.drop(reason)
+                continue
+            post = self._read_post(atb)
+            if post is None:
+                metrics.drop('post_type')
+                continue
+
+            if post.posttype == 1:
+                if self.onlytags and not (post.tags and any(tag in self.onlytags for tag in post.tags)):
+                    metrics.drop('resume' if reason == 'resume' else 'tags')
+                    continue  # Its Answers will not find it either, and are filtered out in turn
+                if reason is not None:
+                    # Only its title and tags are needed, for its Answers
+                    results.append((post, reason, None, None))
+                    continue
+                questions.append(len(results))
+                texts.append(self._post_text(post, post.title))
+                results.append((post, None, None, None))
+            else:
+                stripped = None
+                if post.body and self.content_type != 'post_title':
+                    stripped = self._strip_html(post.body, complete=True)
+                results.append((post, None, None, stripped))
+        # Question texts are cleaned together, in one call
+        for i, cleantext in zip(questions, self.cleaner.clean_batch(texts)):
+            results[i] = (results[i][0], None, cleantext, None)
+        if isinstance(rows, LineReader):
+            metrics.drop('post_type', rows.skipped)
+            return rows.rows, end - start, metrics.dropped, results
+        return len(lines), end - start, metrics.dropped, results
+
+    def _finish_answer(self, post, text, stripped):
+        """
+        Clean the text of an Answer parsed by a worker, reusing its already stripped body
+
+        :param post: _Post
+        :param text: string, the HTML text of the Answer for the content_type
+        :param stripped: string or None, the Answer body stripped of HTML
+        :returns: string, the same as _clean_text(text)
+        """
+        if stripped is not None and text.endswith(post.body):
+            # The text is the body, or the Question title and the body. Stripping the title on its own only gives
+            # the same result as stripping the whole text if the title leaves the stripper in a clean state.
+            head = self._strip_html(text[:len(text) - len(post.body)], complete=True)
+            if head is not None:
+                return self._collapse_newlines(head + stripped)
+        return self._clean_text(text)
+
+    def _iter_parallel(self):
+        markers = self.chunk_and_order_file()
+        self.log("STREAM: Parsing {} byte ranges across {} processes".format(len(markers), self.splits))
+        ranges = map_ranges(self, '_parse_range', markers, processes=self.splits, ordered=self.order != 'completed')
+        # The workers parse and clean Questions, so parse is the time spent waiting for them, and enrich includes
+        # finishing the text of Answers
+        metrics, clock = self._metrics, time.perf_counter
+        screen = self.hashes or self.known_hashes or self.dedup
+        metrics.start()
+        start = clock()
+        for rows, size, dropped, results in ranges:
+            metrics.parse += clock() - start
+            self.total += rows
+            metrics.bytes += size
+            for reason, count in dropped.items():
+                metrics.drop(reason, count)
+            if self.total >= metrics.due:
+                self._report()
+            start = clock()
+            records = []
+            for post, reason, cleantext, stripped in results:
+                enriched = self._enrich_post(post)
+                if enriched is None or reason is not None:
+                    metrics.drop(reason if reason == 'resume' or enriched is not None else 'tags')
+                    continue
+                title, tags = enriched
+                text = self._post_text(post, title)
+                if text is None:
+                    metrics.drop('no_text')
+                    continue
+                records.append((post, title, tags, text, cleantext, stripped))
+            # The input hashes of a range are computed together
+            records = self._screen(records) if screen else [record + (None,) for record in records]
+            for post, title, tags, text, cleantext, stripped, input_hash in records:
+                if cleantext is None:
+                    cleantext = self._finish_answer(post, text, stripped)
+                self.parsed += 1
+                metrics.enrich += clock() - start
+                yield post, title, tags, text, cleantext, input_hash
+                start = clock()
+            metrics.enrich += clock() - start
+            start = clock()
+
+    @property
+    def peak_rss(self):
+        """
+        Peak resident memory of the parsing process in MB, None where the OS does not report it. Stays flat once the
+        secondary indexes are built, however many rows are parsed.
+        """
+        return peak_rss()
+
+    @property
+    def metrics(self):
+        """
+        Snapshot of the progress of the parse, as a dictionary of
+            rows: rows read from the main file
+            emitted: records yielded
+            dropped: dictionary of the rows dropped by reason. 'resume', rows before the resume_from point or the
+                checkpoint resumed from; 'unchanged', rows unchanged since the previous dump; 'filter', rows the filters
+                reject; 'post_type', rows that are not Questions or Answers; 'tags', rows without one of the onlytags;
+                'no_text', rows without text; 'known', rows in known_hashes; 'duplicate', texts already emitted
+            bytes: bytes read from the main file
+            seconds, rows_per_sec, mb_per_sec: time since reading started, and the rates over it
+            stages: dictionary of the seconds spent in the parse, enrich and clean stages. In the pipelined mode and
+                with splits, the stages overlap, and a stage that runs in worker processes counts the time spent
+                waiting for them.
+            finished: Boolean, True once every record has been yielded
+            dedup: with dedup, the stats of the DedupStore, with its expected false positive rate and size in bytes
+        Rows read but not yet emitted or dropped are still in flight between the stages.
+        """
+        skipped = getattr(self.tree, 'skipped', 0) if not self.splits else 0
+        bytes_read = getattr(self.tree, 'bytes', 0) if not self.splits else 0
+        snapshot = self._metrics.snapshot(self.total, bytes_read, skipped)
+        snapshot['peak_rss'] = self.peak_rss
+        if self._dedup is not None:
+            snapshot['dedup'] = self._dedup.stats
+        return snapshot
+
+    def _report(self):
+        """
+        Log the metrics and hand them to the metrics_callback. In the pipelined mode it is called from the enrich
+        thread while the file is read.
+        """
+        metrics = self._metrics
+        metrics.due = self.total + metrics.every
+        snapshot = self.metrics
+        self.log("STREAM: {} rows read, {} emitted, {:.0f} rows/s, {:.1f} MB/s, peak RSS {:.0f} MB".format(
+            snapshot['rows'], snapshot['emitted'], snapshot['rows_per_sec'], snapshot['mb_per_sec'],
+            snapshot['peak_rss'] or 0))
+        if self.metrics_callback is not None:
+            self.metrics_callback(snapshot)
+
+    def _task_hasher(self):
+        """
+        :returns: TaskHasher of the records of the main file, once the community is known
+        """
+        if self._hasher is None:
+            self.prepare()
+            self._hasher = TaskHasher(self.community, self.type, self.newlines)
+        return self._hasher
+
+    def _dedup_store(self):
+        """
+        :returns: DedupStore of the community, once the community is known
+        """
+        if self._dedup is None:
+            self.prepare()
+            self._dedup = DedupStore(self.proj_dir.joinpath('dedup', '{}.bloom'.format(self.community)),
+                                     capacity=self.dedup_capacity, error_rate=self.dedup_error)
+        return self._dedup
+
+    def _screen(self, records):
+        """
+        Drop the records whose input hash is in known_hashes, then the ones whose text the dedup store already holds,
+        and add the input hash to the rest. The input hashes of the records are computed in one call.
+
+        :param records: List of tuples that start with (_Post, _Comment or _Tag, title, tags, HTML text)
+        :returns: List of the kept tuples, each with its input hash, or None unless hashes or known_hashes are set,
+            appended
+        """
+        metrics, known = self._metrics, self.known_hashes
+        if self.hashes or known:
+            inputs = self._task_hasher().input_hashes([record[0].id for record in records],
+                                                      [record[3] for record in records])
+        else:
+            inputs = [None] * len(records)
+        dedup = self._dedup_store() if self.dedup else None
+        kept = []
+        for record, input_hash in zip(records, inputs):
+            if known and input_hash in known:
+                metrics.drop('known')
+            elif dedup is not None and not dedup.hold(self._dedup_key(record[3])):
+                metrics.drop('duplicate')
+            else:
+                kept.append(record + (input_hash,))
+        return kept
+
+    def _dedup_key(self, text, content_type=None, newlines=None):
+        """
+        :param text: string, HTML text of a record
+        :param content_type: string, content_type the text was made for, the parser's by default
+        :param newlines: Boolean, newlines setting the text is cleaned with, the parser's by default
+        :returns: string the dedup store keeps for text. The same text under other settings is another task.
+        """
+        return '{}\x1f{:d}\x1f{}'.format(content_type or self.content_type,
+                                          self.newlines if newlines is None else newlines, text)
+
+    def _finish_dedup(self):
+        if self._dedup is not None:
+            self._dedup.flush()
+            self.log("STREAM: Dedup store {}".format(self._dedup.stats))
+
+    def __getstate__(self):
+        # Worker processes only need the settings, not the open xml streams or the secondary indexes
+        state = self.__dict__.copy()
+        for key in ('iter', '_close_iter', 'tree', 'comment_index', 'post_lookup', 'parent_post_attribs',
+                    '_post_index', '_lookup_files', '_lookup_lock', '_dedup'):
+            state.pop(key, None)
+        return state
+
+    def _build_record(self, atb):
+        """
+        Apply the content_type and filters to one row of the main file
+
+        :param atb: dictionary of row attributes
+        :returns: a tuple of _records, or None if the row is dropped. Why it is dropped is counted in the metrics.
+        """
+        metrics = self._metrics
+        if self._skip_row(atb):
+            self._track_skipped(atb)
+            metrics.drop('resume')
+            return None
+
+        # The lines reader has already dropped unchanged and filtered out rows
+        changed, reason = True, None
+        if self.delta and self.reader != 'lines':
+            changed = self._activity_changed(int(atb['Id']), ActivityIndex.stamp(
+                atb.get('CreationDate', None), atb.get('LastEditDate', None), atb.get('LastActivityDate', None)))
+            reason = 'unchanged'
+        if changed and self.row_filter is not None and not self._filter_lines:
+            changed, reason = self.row_filter.match(atb), 'filter'
+
+        # Fetch the necessary information based on the content_type specified
+        if self.content_type in self._TYPES[:4]:
+            post = self._read_post(atb)
+            if post is None:
+                metrics.drop('post_type')
+                return None
+
+            if self._question_ids is not None and post.posttype == 2 and \
+                    post.parentid not in self.parent_post_attribs:
+                self._load_question(post.parentid)
+            # Questions are enriched even when they are dropped, for their Answers
+            enriched = self._enrich_post(post)
+            if enriched is None or not changed:
+                metrics.drop('tags' if enriched is None else reason)
+                return None
+            title, tags = enriched
+
+            # This post has what we want
+            text = self._post_text(post, title)
+            if text is None:
+                metrics.drop('no_text')
+                return None
+
+            # TODO: Sometimes causes problems in the HTML stripper, disable for now, investigate later
+            # text = html.unescape(text)
+            return post, title, tags, text, None
 
+        elif self.content_type in self._TYPES[4:6]:
+            comment = self._read_comment(atb) if changed else None
+            if comment is None:
+                metrics.drop(reason if not changed else 'no_text' if atb.get('Text', None) is None else 'tags')
+                return None
+            return comment + (None,)
+
+        tag = self._read_tag(atb) if changed else None
+        if tag is None:
+            metrics.drop(reason if not changed else 'no_text' if atb.get('TagName', None) is None else 'tags')
+            return None
+        # Tag names are plain text, there is nothing to clean
+        return tag, None, None, tag.name, tag.name
+
+    def _build_views(self, atb):
+        """
+        Route one row of the Posts file to the views of a fan-out parse. The row is decoded and enriched once, and the
+        parser's own resume_from, delta and filters apply to every view.
+
+        :param atb: dictionary of row attributes
+        :returns: Tuple of (_Post, title, tags, List of (_View, HTML text) tuples), or None if no view takes the row
+        """
+        metrics = self._metrics
+        if self._skip_row(atb):
+            self._track_skipped(atb)
+            metrics.drop('resume')
+            return None
+        changed, reason = True, None
+        if self.delta and self.reader != 'lines':
+            changed = self._activity_changed(int(atb['Id']), ActivityIndex.stamp(
+                atb.get('CreationDate', None), atb.get('LastEditDate', None), atb.get('LastActivityDate', None)))
+            reason = 'unchanged'
+        if changed and self.row_filter is not None and not self._filter_lines:
+            changed, reason = self.row_filter.match(atb), 'filter'
+
+        post = self._read_post(atb)
+        if post is None:
+            metrics.drop('post_type')
+            return None
+        if self._question_ids is not None and post.posttype == 2 and post.parentid not in self.parent_post_attribs:
+            self._load_question(post.parentid)
+        enriched = self._enrich_post(post)
+        if enriched is None or not changed:
+            metrics.drop('tags' if enriched is None else reason)
+            return None
+        title, tags = enriched
+
+        routed = []
+        for view in self._views:
+            if view.row_filter is not None and not view.row_filter.match(atb):
+                continue
+            # Answers are matched against the tags of their Question
+            if view.tags and not (tags and any(tag in view.tags for tag in tags)):
+                continue
+            text = self._post_text(post, title, view.content_type)
+            if text is not None:
+                routed.append((view, text))
+        if not routed:
+            metrics.drop('views')
+            return None
+        return post, title, tags, routed
+
+    def _strip_views(self, post, texts):
+        """
+        Strip the HTML of the texts of a row's views, each distinct text once. When several of them end with the
+        body, the body is stripped once and only what comes before it is stripped for each.
+
+        :param post: _Post
+        :param texts: List of HTML strings
+        :returns: dictionary of HTML text to stripped text
+        """
+        stripped = {}
+        body = post.body
+        if body and sum(1 for text in set(texts) if text.endswith(body)) > 1:
+            stripped[body] = self._strip_html(body)
+        else:
+            body = None
+        for text in texts:
+            if text in stripped:
+                continue
+            if body is not None and text.endswith(body):
+                head = self._strip_html(text[:len(text) - len(body)], complete=True)
+                if head is not None:
+                    stripped[text] = head + stripped[body]
+                    continue
+            stripped[text] = self._strip_html(text)
+        return stripped
+
+    def _records(self, rows=None, screen=True):
+        """
+        Read the main file and apply the content_type and filters
+
+        :param rows: iterable of row attribute dictionaries to use instead of reading the main file, from the same
+            reader
+        :param screen: Boolean, If False, yield the records before they are checked against the known hashes and the
+            dedup store, without an input hash or a count in parsed, for the caller to pass to _screen in batches
+        :returns: generator of (_Post, _Comment or _Tag, title, tags, HTML text, cleaned text or None, input hash or
+            None) tuples. The cleaned text is None when it is left to the caller. The input hash is None unless
+            hashes or known_hashes are set.
+        """
+        self.prepare()
+        if self.splits:
+            for record in self._iter_parallel():
+                yield record
+            return
+
+        # Where the row before this one ended, the point a checkpoint taken now carries on from
+        offset, total, last_id = self.tree.offset if self.checkpoint else 0, self.total, None
+        saved = self.total
+
+        # Iterate through the file and yield the text
+        metrics, clock = self._metrics, time.perf_counter
+        build = self._build_record if self._views is None else self._build_views
+        # Views are checked against the known hashes and the dedup store one by one, in iter_views
+        views = self._views is not None
+        screening = screen and not views and (self.hashes or self.known_hashes or self.dedup)
+        metrics.start()
+        for atb in rows if rows is not None else self._rows():
+            if self.checkpoint:
+                if self.total - saved >= self.checkpoint:
+                    self._save_checkpoint(offset, total, last_id)
+                    saved = self.total
+                offset, total, last_id = self.tree.offset, self.total, atb.get('Id', last_id)
+            if self.total >= metrics.due:
+                self._report()
+
+            start = clock()
+            record = build(atb)
+            if record is not None and not views:
+                if screening:
+                    screened = self._screen([record])
+                    record = screened[0] if screened else None
                 else:
-                    break
+                    record += (None,)
+            metrics.enrich += clock() - start
+            if record is None:
+                continue
+            if screen:
+                self.parsed += 1
+            yield record
+
+        if self.checkpoint:
+            self._save_checkpoint(self.tree.offset, self.total, last_id)
+        if self.delta:
+            self._finish_delta()
+        if self._question_file is not None:
+            self._question_file.close()
+            self._question_file = None
+        if self.type == 'Posts':
+            self.log("STREAM: Question cache {}".format(self.parent_post_attribs.stats))
+            self.parent_post_attribs.close()
+
+    def _iter_pipelined(self):
+        """
+        _records in stages: rows are parsed in one thread and enriched in a second, and the text of each batch of
+        records is cleaned by a pool of processes. Every stage hands batches on through a queue of at most 2 *
+        pipeline batches, so a slow consumer stops the stages before it instead of letting records pile up.
+
+        :returns: generator of the same tuples as _records, in the same order, with the cleaned text
+        """
+        self.prepare()
+        size, depth = self._PIPELINE_BATCH, 2 * self.pipeline
+
+        def parse():
+            rows = self._rows()
+            while True:
+                batch = list(islice(rows, size))
+                if not batch:
+                    return
+                yield batch
+
+        def enrich(pool):
+            rows = threaded(parse(), depth)
+            try:
+                records = self._records((atb for batch in rows for atb in batch), screen=not screen)
+                while True:
+                    batch = list(islice(records, size))
+                    if not batch:
+                        return
+                    if screen:
+                        # The input hashes of a batch are computed together
+                        start = clock()
+                        batch = self._screen([record[:5] for record in batch])
+                        self.parsed += len(batch)
+                        metrics.enrich += clock() - start
+                    pending = [i for i, record in enumerate(batch) if record[4] is None]
+                    yield batch, pending, call_async(pool, 'clean_batch', [batch[i][3] for i in pending])
+            finally:
+                rows.close()
+
+        # Cleaning overlaps the other stages, so clean is the time spent waiting for cleaned batches
+        metrics, clock = self._metrics, time.perf_counter
+        screen = self.hashes or self.known_hashes or self.dedup
+        pool = worker_pool(self.cleaner, self.pipeline)
+        batches = threaded(enrich(pool), depth)
+        stopped = threading.Event()
+
+        def stop():
+            # Stop the stages, then let the few batches already sent finish. Terminating the pool while its task
+            # pipe is full of text can hang.
+            atexit.unregister(stop)
+            if stopped.is_set():
+                return
+            stopped.set()
+            batches.close()
+            pool.close()
+            pool.join()
+
+        # A stream still open at exit is stopped before multiprocessing's exit handler terminates the pool
+        atexit.register(stop)
+        try:
+            for batch, pending, cleaned in batches:
+                start = clock()
+                cleaned = cleaned.get()
+                metrics.clean += clock() - start
+                for i, cleantext in zip(pending, cleaned):
+                    batch[i] = batch[i][:4] + (cleantext, batch[i][5])
+                for record in batch:
+                    yield record
+        finally:
+            stop()
+
+    def _columns(self, records):
+        """
+        Assemble a column batch from a list of records
+
+        :param records: List of tuples from _records
+        :returns: dictionary of column name to numpy array or List
+        """
+        np = import_optional('numpy', 'batches')
+
+        n = len(records)
+        texts = [record[3] for record in records]
+        cleaned = [record[4] for record in records]
+        pending = [i for i, cleantext in enumerate(cleaned) if cleantext is None]
+        start = time.perf_counter()
+        for i, cleantext in zip(pending, self.cleaner.clean_batch([texts[i] for i in pending])):
+            cleaned[i] = cleantext
+        self._metrics.clean += time.perf_counter() - start
+
+        def ints(values):
+            return np.fromiter(values, dtype=np.int64, count=n)
+
+        def dates(values):
+            return np.array(list(values), dtype='datetime64[ms]')
+
+        if self.content_type == self._TYPES[6]:
+            tags = [record[0] for record in records]
+            columns = {'Id': ints(t.id for t in tags),
+                       'TagName': [t.name for t in tags],
+                       'Count': ints(t.count for t in tags),
+                       'ExcerptPostId': ints(t.excerpt if t.excerpt is not None else -1 for t in tags),
+                       'WikiPostId': ints(t.wiki if t.wiki is not None else -1 for t in tags),
+                       'html': texts,
+                       'text': cleaned}
+
+        elif self.content_type in self._TYPES[4:6]:
+            comments = [record[0] for record in records]
+            columns = {'Id': ints(c.id for c in comments),
+                       'PostId': ints(c.postid for c in comments),
+                       'Score': ints(c.score for c in comments),
+                       'CreationDate': dates(c.created for c in comments),
+                       'PostTitle': [record[1] for record in records],
+                       'PostTags': [record[2] for record in records],
+                       'html': texts,
+                       'text': cleaned}
+
+        else:
+            posts = [record[0] for record in records]
+            questions = [post.posttype == 1 for post in posts]
+            columns = {'Id': ints(int(p.id) for p in posts),
+                       'PostTypeId': np.fromiter((p.posttype for p in posts), dtype=np.int8, count=n),
+                       'ParentId': ints(int(p.parentid) if p.parentid is not None else -1 for p in posts),
+                       'Title': [r[1] if q else None for r, q in zip(records, questions)],
+                       'Tags': [r[2] if q else None for r, q in zip(records, questions)],
+                       'ParentTitle': [None if q else r[1] for r, q in zip(records, questions)],
+                       'ParentTags': [None if q else r[2] for r, q in zip(records, questions)],
+                       'FavoriteCount': ints(p.favorites for p in posts),
+                       'PostScore': ints(p.score for p in posts),
+                       'CommentCount': ints(p.comments for p in posts),
+                       'Views': ints(p.views for p in posts),
+                       'AcceptedAnswer': ints(p.accepted if p.accepted is not None else -1 for p in posts),
+                       'CreationDate': dates(p.created for p in posts),
+                       'LastEditDate': dates(p.edited for p in posts),
+                       'LastActivityDate': dates(p.active for p in posts),
+                       'html': texts,
+                       'text': cleaned}
+
+        if self.hashes:
+            inputs = [record[5] for record in records]
+            columns['_input_hash'] = ints(inputs)
+            columns['_task_hash'] = ints(TaskHasher.task_hashes(inputs))
+        return columns
+
+    def iter_batches(self, batch_size=10000):
+        """
+        Stream the records as column batches rather than one dictionary per record. The columns are named after the
+        'meta' keys of the dictionary stream, plus 'html' and 'text', and every batch of a content_type has the same
+        columns:
+            Ids, counts and scores: numpy int64 arrays, with -1 where the dictionary holds None (ParentId of a
+                Question, AcceptedAnswer). PostTypeId is an int8 array.
+            Dates: numpy datetime64[ms] arrays, NaT where missing.
+            Titles, tags and text: Lists. Title and Tags are None for Answers, ParentTitle and ParentTags for
+                Questions.
+            _input_hash and _task_hash: numpy int64 arrays, when hashes is set, hashed a batch at a time.
+        The text of a batch is cleaned in one call. Requires numpy, from the batches extra.
+
+        :param batch_size: int, maximum number of records per batch
+        :returns: generator of dictionaries of column name to numpy array or List, e.g. for pandas.DataFrame()
+        """
+        dedup = self._dedup_store() if self.dedup else None
+        records = self._records()
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            columns = self._columns(batch)
+            if dedup is not None:
+                for text in columns['html']:
+                    dedup.commit(self._dedup_key(text))
+            self._metrics.emitted += len(batch)
+            yield columns
+        self._metrics.stop()
+        self._finish_dedup()
+        self._report()
+
+    def export(self, directory, file_format='jsonl', compression='gzip', shard_size=64, workers=2):
+        """
+        Parse the file once and write every record to size bounded shards, with a manifest.json describing them.
+        separser.utils.read_shards streams the records back, the same as iterating this parser.
+
+        :param directory: string or Path, directory to write the shards into
+        :param file_format: string, 'jsonl' or 'parquet' (needs the parquet extra)
+        :param compression: string or None. jsonl: 'gzip' or 'zstd' (needs the zstd extra). parquet: 'snappy', 'gzip' or
+            'zstd'.
+        :param shard_size: int, approximate uncompressed MB of text per shard
+        :param workers: int, number of shards encoded and written at the same time
+        :returns: dictionary, the manifest
+        """
+        self.prepare()
+        info = {'community': self.community, 'file_type': self.type, 'content_type': self.content_type,
+                'newlines': self.newlines, 'onlytags': self.onlytags, 'source': self.file[self.type].as_posix(),
+                'filters': self.row_filter.criteria if self.row_filter is not None else None}
+        manifest = write_shards(self, directory, file_format=file_format, compression=compression,
+                                shard_size=shard_size, workers=workers, info=info)
+        self.log("EXPORT: Wrote {} records to {} shards in {}".format(manifest['records'], len(manifest['shards']),
+                                                                     directory))
+        return manifest
+
+    def _make_views(self, views):
+        """
+        :param views: dictionary of view name to dictionary of its settings, see iter_views
+        :returns: List of _View
+        """
+        if not views:
+            raise ValueError("A fan-out parse needs at least one view")
+        made = []
+        for name, settings in views.items():
+            settings = dict(settings or {})
+            unknown = set(settings) - {'content_type', 'newlines', 'filters', 'onlytags'}
+            if unknown:
+                raise ValueError("Unknown settings {} for view {}".format(', '.join(sorted(unknown)), name))
+            content_type = settings.get('content_type', self.content_type).lower()
+            if content_type not in self._TYPES[:4]:
+                raise ValueError("Views can only use the {} content_types".format(self._TYPES[:4]))
+            newlines = settings.get('newlines', self.newlines)
+            filters, onlytags = settings.get('filters', None), settings.get('onlytags', None)
+            if isinstance(filters, dict):
+                filters = RowFilter(**filters)
+            if onlytags:
+                if filters is not None and filters.tags:
+                    raise ValueError("Pass the tags of view {} either as onlytags or in filters, not both".format(name))
+                filters = RowFilter(**dict(filters.criteria if filters is not None else {}, tags=onlytags))
+            filters = self._resolve_synonyms(filters) if filters else None
+            made.append(_View(name=name, content_type=content_type, newlines=newlines,
+                              cleaner=self.cleaner if newlines == self.newlines else TextCleaner(newlines=newlines),
+                              row_filter=filters, tags=filters.tags if filters is not None else None))
+        return made
+
+    def iter_views(self, views):
+        """
+        Read and parse the Posts file once for several outputs, e.g. the titles, bodies and titles with bodies of the
+        same posts. Each row is decoded, looked up against its Question and stripped of HTML once, and routed to every
+        view that takes it. The parser's own settings (reader, resume_from, delta, onlytags, filters) apply to every
+        view, and each view can narrow them further.
+
+            parser.iter_views({'titles': {'content_type': 'post_title'},
+                               'bodies': {'content_type': 'post_body', 'newlines': False},
+                               'python': {'content_type': 'post_both', 'filters': {'tags': 'python', 'min_score': 5}}})
+
+        The metrics count a row as emitted once, however many views take it, and rows no view takes as dropped for
+        'views'. Needs a Posts content_type, without splits or pipeline.
+
+        :param views: dictionary of view name to dictionary of its settings, each optional:
+            content_type: 'post_title', 'post_body', 'post_both' or 'all_text', the parser's by default
+            newlines: Boolean, the parser's by default
+            filters: RowFilter or dictionary of its arguments, applied on top of the parser's filters
+            onlytags: string or List of tags, the same as filters with only tags set
+        :returns: generator of (view name, record dictionary) tuples. Records are in file order, and the records of
+            one row in the order of views.
+        """
+        if self.type != 'Posts' or self.splits or self.pipeline:
+            raise ValueError("iter_views needs a Posts content_type, without splits or pipeline")
+        made = self._make_views(views)
+        self.prepare()
+        if self.comment_index is None and any(view.content_type == 'all_text' for view in made):
+            comments = self.file.get('Comments', None)
+            if comments is None:
+                comments, _ = self._find_other_file(self.file['Posts'], 'Comments')
+            if comments is None:
+                raise ValueError("An all_text view needs the Comments file of the community")
+            self.comment_index = CommentIndex.from_xml(self._open(comments))
+        # The lines reader of a post_title parser leaves the bodies undecoded
+        fields = getattr(self.tree, 'fields', None)
+        if fields is not None and any(view.content_type != 'post_title' for view in made):
+            self.tree.fields = set(fields) | {'Body'}
+        self._views = made
+
+        # Each newlines setting cleans the text differently, so gives other hashes
+        known = self.known_hashes
+        dedup = self._dedup_store() if self.dedup else None
+        hashers = {newlines: TaskHasher(self.community, self.type, newlines) for newlines in {v.newlines for v in made}}
+        metrics, clock = self._metrics, time.perf_counter
+        for post, title, tags, routed in self._records():
+            inputs = None
+            if self.hashes or known:
+                inputs = [hashers[view.newlines].input_hash(post.id, text) for view, text in routed]
+            if known:
+                kept = [i for i, input_hash in enumerate(inputs) if input_hash not in known]
+                if not kept:
+                    metrics.drop('known')
+                    continue
+                routed, inputs = [routed[i] for i in kept], [inputs[i] for i in kept]
+            if dedup is not None:
+                # A text new in this row goes to every view of the row that takes it with the same settings, and is
+                # added to the store with the first of them that is handed over
+                keys = [self._dedup_key(text, view.content_type, view.newlines) for view, text in routed]
+                new = {}
+                for key in keys:
+                    if key not in new:
+                        new[key] = dedup.hold(key)
+                kept = [i for i, key in enumerate(keys) if new[key]]
+                if not kept:
+                    metrics.drop('duplicate')
+                    continue
+                routed, keys = [routed[i] for i in kept], [keys[i] for i in kept]
+                inputs = [inputs[i] for i in kept] if inputs is not None else None
+            start = clock()
+            stripped = self._strip_views(post, [text for _, text in routed])
+            cleaned = [view.cleaner.collapse(stripped[text]) for view, text in routed]
+            metrics.clean += clock() - start
+            metrics.emitted += 1
+            for i, ((view, text), cleantext) in enumerate(zip(routed, cleaned)):
+                info = self._post_info(post, title, tags, text, cleantext)
+                if self.hashes:
+                    info['_input_hash'] = inputs[i]
+                    info['_task_hash'] = TaskHasher.task_hash(inputs[i])
+                if dedup is not None and new.pop(keys[i], False):
+                    dedup.commit(keys[i])
+                yield view.name, info
+        metrics.stop()
+        self._finish_dedup()
+        self._report()
+
+    def fan_out(self, views, sinks):
+        """
+        Parse the Posts file once, handing the records of each view to its own sink
 
-            # clear the child from memory before moving to the next child element
-            child.clear()
+            with open('titles.jsonl', 'w') as titles, open('bodies.jsonl', 'w') as bodies:
+                parser.fan_out({'titles': {'content_type': 'post_title'}, 'bodies': {'content_type': 'post_body'}},
+                               {'titles': lambda r: titles.write(json.dumps(r) + '\\n'),
+                                'bodies': lambda r: bodies.write(json.dumps(r) + '\\n')})
 
-  
\ No newline at end of file
+        :param views: dictionary of view name to dictionary of its settings, see iter_views
+        :param sinks: dictionary of view name to a callable given each record of the view
+        :returns: dictionary of view name to the number of records handed to its sink
+        """
+        missing = [name for name in views if name not in sinks]
+        if missing:
+            raise ValueError("No sink for the views {}".format(', '.join(missing)))
+        counts = dict.fromkeys(views, 0)
+        for name, record in self.iter_views(views):
+            sinks[name](record)
+            counts[name] += 1
+        return counts
+
+    def split_views(self, views):
+        """
+        Parse the Posts file once into a separate iterator per view. Advancing one iterator reads on until it has a
+        record, and keeps the records of the other views until their iterators reach them, as itertools.tee does.
+        Consume the iterators together, or from threads of their own, to keep that buffer small.
+
+        :param views: dictionary of view name to dictionary of its settings, see iter_views
+        :returns: dictionary of view name to generator of its record dictionaries
+        """
+        records = self.iter_views(views)
+        buffers = {name: deque() for name in views}
+        lock = threading.Lock()
+
+        def view(buffer):
+            while True:
+                with lock:
+                    while not buffer:
+                        try:
+                            name, record = next(records)
+                        except StopIteration:
+                            return
+                        buffers[name].append(record)
+                    record = buffer.popleft()
+                yield record
+
+        return {name: view(buffer) for name, buffer in buffers.items()}
+
+    @property
+    def log(self):
+        """
+        Callable taking a message, Prodigy's log when Prodigy is installed, else one writing to log_dir/separse.log
+        """
+        if self._log is None:
+            self._log = get_log(self.community, self.log_dir)
+        return self._log
+
+    @property
+    def post_index(self):
+        """
+        Id -> byte offset index of the Posts file and its Comments file, used by get_post and get_thread. Built by one
+        pass over the files the first time it is needed, and kept memory-mapped in proj_dir/indexes until they change.
+        """
+        if self._post_index is None:
+            self._post_index = self._load_post_index()
+        return self._post_index
+
+    def _load_post_index(self):
+        self.prepare()
+        posts = self.file.get('Posts', None)
+        if posts is None and self.type == 'Comments':
+            posts, _ = self._find_other_file(self.file['Comments'], 'Posts')
+        if not isinstance(posts, Path):
+            raise ValueError("get_post and get_thread need a Posts xml file on disk")
+        comments = self.file.get('Comments', None)
+        if comments is None and self.type == 'Posts':
+            comments, _ = self._find_other_file(posts, 'Comments')
+        if not isinstance(comments, Path):
+            comments = None
+
+        path = self.proj_dir.joinpath('indexes', '{}.posts'.format(posts.stem))
+        index = PostIndex.load(path)
+        if index is None or index.source != PostIndex.describe(posts, comments):
+            if index is not None:
+                index.close()
+            self.log("STREAM: Building the post index of {}".format(posts.as_posix()))
+            PostIndex.from_xml(posts, comments).save(path)
+            index = PostIndex.load(path)
+        self._lookup_files = {'Posts': open(posts.as_posix(), 'rb')}
+        if comments is not None:
+            self._lookup_files['Comments'] = open(comments.as_posix(), 'rb')
+        return index
+
+    def _read_line(self, key, offset, fields):
+        """
+        :param key: string, 'Posts' or 'Comments'
+        :param offset: int, byte offset of the row
+        :param fields: iterable of attribute names to decode
+        :returns: dictionary of row attributes
+        """
+        with self._lookup_lock:
+            xf = self._lookup_files[key]
+            xf.seek(offset)
+            line = xf.readline()
+        return parse_row(line, fields)
+
+    def _lookup_post(self, offset):
+        """
+        :returns: Tuple of (_Post, title, tags), or None if the row is not a Question or an Answer
+        """
+        post = self._read_post(self._read_line('Posts', offset, self._POST_FIELDS))
+        if post is None:
+            return None
+        if post.posttype == 1:
+            return post, post.title, post.tags
+        parent = self.post_index.post(post.parentid) if post.parentid is not None else None
+        if parent is None:
+            return post, None, None
+        question = self._read_line('Posts', parent, self._QUESTION_FIELDS)
+        tags = question.get('Tags', None)
+        return post, question.get('Title', None), self._parse_tags(tags) if tags is not None else None
+
+    def _lookup_info(self, post, title, tags):
+        content_type = self.content_type if self.content_type in self._TYPES[:4] else 'post_both'
+        text = self._post_text(post, title, content_type)
+        info = self._post_info(post, title, tags, text, self._clean_text(text) if text else text)
+        info['meta']['file_type'] = 'Posts'
+        return info
+
+    def _lookup_comments(self, post_id, title, tags):
+        """
+        :returns: List of the dictionaries of the Comments of a post, in file order
+        """
+        if 'Comments' not in self._lookup_files:
+            return []
+        comments = []
+        for offset in self.post_index.comments(post_id):
+            atb = self._read_line('Comments', offset, self._COMMENT_FIELDS)
+            comment = _Comment(id=int(atb.get('Id', None)),
+                               postid=int(atb.get('PostId', None)),
+                               score=int(atb.get('Score', 0)),
+                               created=atb.get('CreationDate', None))
+            text = atb.get('Text', None)
+            info = self._comment_info(comment, title, tags, text, self._clean_text(text) if text else text)
+            info['meta']['file_type'] = 'Comments'
+            comments.append(info)
+        return comments
+
+    def get_post(self, post_id):
+        """
+        Read a single Question or Answer through the post index, without streaming the file
+
+        :param post_id: int or string, Id of the post
+        :returns: the post's dictionary, as the stream yields it, or None if there is no such post. The text is
+            built for the content_type, or as for post_both when the content_type is not a Posts one. onlytags and
+            filters are not applied.
+        """
+        offset = self.post_index.post(post_id)
+        if offset is None:
+            return None
+        found = self._lookup_post(offset)
+        return self._lookup_info(*found) if found is not None else None
+
+    def get_thread(self, post_id):
+        """
+        Read a Question with all of its Answers and the Comments of each, through the post index
+
+        :param post_id: int or string, Id of the Question, or of one of its Answers
+        :returns: dictionary of the 'question' dictionary, the List of 'answers' dictionaries and 'comments', a
+            dictionary of post Id to the List of that post's comment dictionaries, or None if there is no such post
+        """
+        offset = self.post_index.post(post_id)
+        if offset is None:
+            return None
+        found = self._lookup_post(offset)
+        if found is None:
+            return None
+        post, title, tags = found
+        if post.posttype == 2:
+            offset = self.post_index.post(post.parentid) if post.parentid is not None else None
+            if offset is None:
+                return None
+            post, title, tags = self._lookup_post(offset)
+
+        answers = [self._read_post(self._read_line('Posts', answer, self._POST_FIELDS))
+                   for answer in self.post_index.answers(post.id)]
+        thread = {'question': self._lookup_info(post, title, tags),
+                  'answers': [self._lookup_info(answer, title, tags) for answer in answers],
+                  'comments': {}}
+        for p in [post] + answers:
+            thread['comments'][int(p.id)] = self._lookup_comments(p.id, title, tags)
+        return thread
+
+    def __next__(self):
+        return self.iter.__next__()
+
+    def close(self):
+        """
+        Stop the stream that next() reads, and the threads and worker processes of a pipelined stream. It is also
+        stopped when the parser is garbage collected.
+        """
+        self._close_iter()
+
+    def __iter__(self):
+        metrics, clock = self._metrics, time.perf_counter
+        dedup = self._dedup_store() if self.dedup else None
+        records = self._iter_pipelined() if self.pipeline else self._records()
+        try:
+            for record, title, tags, text, cleantext, input_hash in records:
+                if cleantext is None:
+                    start = clock()
+                    cleantext = self._clean_text(text)
+                    metrics.clean += clock() - start
+                if isinstance(record, _Post):
+                    info = self._post_info(record, title, tags, text, cleantext)
+                elif isinstance(record, _Tag):
+                    info = self._tag_info(record, text)
+                else:
+                    info = self._comment_info(record, title, tags, text, cleantext)
+                if self.hashes:
+                    info['_input_hash'] = input_hash
+                    info['_task_hash'] = TaskHasher.task_hash(input_hash)
+                if dedup is not None:
+                    dedup.commit(self._dedup_key(text))
+
+                # yield the dictionary
+                metrics.emitted += 1
+                yield info
+        finally:
+            records.close()
+        metrics.stop()
+        self._finish_dedup()
+        self._report()
@@ -1,4 +1,18 @@
-from .utils import capture_7zip_stdout, query_yes_no, chunker, generate_file_markers
+from .utils import ArchiveMember, capture_7zip_stdout, query_yes_no, chunker, generate_file_markers, peak_rss, \
+    import_optional
+from .rows import TreeReader, iterparse_rows, LineReader, OffsetReader, parse_row, unescape_attribute
+from .cleaner import TagStripper, TextCleaner
+from .indexes import CommentIndex, PostLookup, TagTable, ActivityIndex, TagIndex, PostIndex
+from .parallel import map_ranges, threaded, worker_pool, call_async
+from .export import write_shards, read_shards, read_manifest
+from .checkpoint import Checkpoint
+from .manifest import CommunityManifest, fetch_listing, parse_listing, ARCHIVE_URL
+from .download import RangeDownloader, DownloadError, download_file
+from .parents import ParentCache
+from .filters import RowFilter
+from .metrics import Metrics
+from .hashes import TaskHasher
+from .dedup import DedupStore
 import os
 if os.name == 'nt':
     from .utils import find_program_win as find_program
@@ -0,0 +1,40 @@
+import os
+import pickle
+from pathlib import Path
+
+
+class Checkpoint(object):
+    """
+    Crash safe record of how far a parser got through an xml file: the byte offset of the next unread line, the row
+    counts and the bookkeeping needed to carry on from there. Every save replaces the file atomically, so an
+    interrupted run always leaves the last complete checkpoint behind.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: string or Path of the checkpoint file
+        """
+        self.path = Path(path)
+
+    def save(self, state):
+        """
+        :param state: picklable dictionary
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        partial = self.path.with_name(self.path.name + '.partial')
+        with open(partial, 'wb') as cf:
+            pickle.dump(state, cf, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(str(partial), str(self.path))
+
+    def load(self):
+        """
+        :returns: the saved dictionary, or None if there is no checkpoint
+        """
+        if not self.path.exists():
+            return None
+        with open(self.path, 'rb') as cf:
+            return pickle.load(cf)
+
+    def clear(self):
+        if self.path.exists():
+            self.path.unlink()
@@ -0,0 +1,125 @@
+import re
+from html import unescape
+from html.parser import HTMLParser
+
+
+class TagStripper(HTMLParser):
+    """
+    HTML Parser that receives a string with HTML tags, strips out tags. get_data() will return a string devoid of
+    HTML tags.
+
+    """
+    def __init__(self, convert_charrefs=True):
+        super().__init__()
+        self.reset()
+        self.strict = False
+        self.convert_charrefs = convert_charrefs
+        self.fed = []
+
+    def handle_data(self, d):
+        self.fed.append(d)
+
+    def get_data(self):
+        return ''.join(self.fed)
+
+    def error(self, message):
+        pass
+
+
+_SPACE = r'[ \t\n\r\f]'
+# Markup the fast path removes: start and end tags with plain names and well formed attributes, and comments
+# holding no '--' or '>'. HTMLParser strips these without emitting any text in every Python version, so the text
+# between them is exactly what it hands to handle_data. Anything else is left to HTMLParser.
+SIMPLE_MARKUP = re.compile(r"""
+    <(?:[a-zA-Z][a-zA-Z0-9]*
+            (?:{s}+[a-zA-Z_:][-a-zA-Z0-9_:.]*
+                (?:{s}*={s}*(?:"[^"<>]*"|'[^'<>]*'|[!\#-&(-;?-_a-~]+))?
+            )*{s}*/?>
+        |/[a-zA-Z][-.a-zA-Z0-9:_]*{s}*>
+        |!--(?!-)(?:[^-<>]|-(?!-))*-->
+    )
+""".format(s=_SPACE), re.VERBOSE)
+# Elements whose content HTMLParser reads as raw text, or may in newer Python versions
+RAW_TEXT = re.compile(r'<(?:script|style|textarea|title|xmp|iframe|noembed|noframes|noscript|plaintext)[ \t\n\r\f/>]',
+                      re.IGNORECASE)
+# HTMLParser holds back text ending in what could be the start of a character reference
+UNTERMINATED_REFERENCE = re.compile(r'&[^\s;]*$')
+NEWLINES = re.compile(r'\n+')
+
+
+class TextCleaner(object):
+    """
+    Strips the HTML from StackExchange text. Gives the same text as feeding it to a fresh TagStripper (without
+    calling close()) and collapsing newlines, but runs ordinary post HTML through a single regex split instead of
+    HTMLParser. Text using any construct beyond plain tags, comments and character references falls back to a
+    TagStripper, so the output never differs.
+
+    One cleaner is built per parser and reused for every row.
+    """
+
+    def __init__(self, newlines=True):
+        """
+        :param newlines: Boolean, If True, collapse runs of newlines into one, if False, replace them with a space.
+        """
+        self.newlines = newlines
+        self._newline = '\n' if newlines else ' '
+
+    def _strip_simple(self, text):
+        """
+        :returns: the stripped text, or None if the text needs HTMLParser
+        """
+        pieces = SIMPLE_MARKUP.split(text)
+        last = pieces[-1]
+        if '&' in last[-34:] and UNTERMINATED_REFERENCE.search(last[-34:]):
+            return None
+        stripped = ''.join(pieces)
+        if '<' in stripped:
+            return None
+        if '&' in stripped:
+            stripped = ''.join([unescape(piece) for piece in pieces])
+        return stripped
+
+    def strip(self, text, complete=False):
+        """
+        Remove HTML tags from text and unescape HTML character references
+
+        :param text: string of HTML
+        :param complete: Boolean, If True, return None when the HTML ends part way through a tag or a <script> or
+            <style> element, i.e. when stripping text + more would not equal stripping text, then stripping more.
+        :returns: string devoid of HTML tags, or None
+        """
+        if '<' not in text and '&' not in text:
+            return text
+        if not RAW_TEXT.search(text):
+            stripped = self._strip_simple(text)
+            if stripped is not None:
+                return stripped
+        stripper = TagStripper()
+        stripper.feed(text)
+        if complete and (stripper.rawdata or stripper.cdata_elem):
+            return None
+        return stripper.get_data()
+
+    def collapse(self, text):
+        """
+        Remove extra newlines or all newlines
+        """
+        if '\n' not in text:
+            return text
+        return NEWLINES.sub(self._newline, text)
+
+    def clean(self, text):
+        """
+        :param text: string of HTML
+        :returns: string, text without HTML and with newlines collapsed
+        """
+        return self.collapse(self.strip(text))
+
+    def clean_batch(self, texts):
+        """
+        Clean many texts in one call, e.g. the texts a worker process is sent together
+
+        :param texts: iterable of strings of HTML, or None
+        :returns: List of cleaned strings, None where the text was None
+        """
+        return [self.clean(text) if text is not None else None for text in texts]
@@ -0,0 +1,177 @@
+import math
+import mmap
+import os
+import threading
+from hashlib import blake2b
+from pathlib import Path
+
+
+class DedupStore(object):
+    """
+    Bloom filter of the texts already emitted, kept in a memory-mapped file so it carries over from one run to the
+    next. A text is hashed once with blake2b, and `hashes` bit positions are derived from the two halves of the
+    digest. A text whose bits are all set has probably been seen: a new text is taken for a duplicate with about the
+    false_positive_rate, and a duplicate is never missed. A stream checks its texts with hold and adds them with
+    commit once they are emitted.
+
+    The file is sized for `capacity` texts at `error_rate` when it is created, about 1.8 bytes per text at 0.1%, and
+    keeps its size and settings after that. Past the capacity the false positive rate grows, see stats. The pages
+    of the file are mapped in as bits are set, so the resident memory it takes grows towards the file size. Only one
+    parser should write to a store at a time.
+    """
+
+    MAGIC = b'SEDEDUP1'
+    _HEADER = 3  # int64 fields after MAGIC: number of bits, number of hashes, number of texts added
+    _ENTRIES = len(MAGIC) + 16
+
+    def __init__(self, path, capacity=10000000, error_rate=0.001):
+        """
+        :param path: string or Path of the store, created if missing
+        :param capacity: int, number of texts a new store is sized for
+        :param error_rate: float, false positive rate of a new store once it holds `capacity` texts
+        """
+        self.path = Path(path)
+        if not self.path.exists():
+            if capacity < 1 or not 0 < error_rate < 1:
+                raise ValueError("A dedup store needs a positive capacity and an error_rate between 0 and 1")
+            bits = int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2 / 8)) * 8
+            hashes = max(int(round(bits / capacity * math.log(2))), 1)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            partial = self.path.with_name(self.path.name + '.partial')
+            with open(partial, 'wb') as df:
+                df.write(self.MAGIC)
+                for value in (bits, hashes, 0):
+                    df.write(value.to_bytes(8, 'little'))
+                df.truncate(self._offset() + bits // 8)
+            os.replace(str(partial), str(self.path))
+
+        with open(self.path, 'r+b') as df:
+            if df.read(len(self.MAGIC)) != self.MAGIC:
+                raise ValueError("{} is not a dedup store".format(self.path))
+            self._map = mmap.mmap(df.fileno(), 0)
+        header = memoryview(self._map)[len(self.MAGIC):self._offset()].cast('q')
+        self.bits, self.hashes, self.entries = header[0], header[1], header[2]
+        header.release()
+        # Counters of this run, and the texts held until they are emitted
+        self.checked = 0
+        self.duplicates = 0
+        self._held = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _offset(cls):
+        return len(cls.MAGIC) + 8 * cls._HEADER
+
+    def _positions(self, text):
+        """
+        :returns: List of (byte offset in the file, bit mask) of the bits of a text
+        """
+        digest = blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        # Bit i is (first + i * step) % bits, stepped through without multiplying large ints
+        bits = self.bits
+        bit, step = int.from_bytes(digest[:8], 'little') % bits, (int.from_bytes(digest[8:], 'little') | 1) % bits
+        offset, positions = self._offset(), []
+        for _ in range(self.hashes):
+            positions.append((offset + (bit >> 3), 1 << (bit & 7)))
+            bit += step
+            if bit >= bits:
+                bit -= bits
+        return positions
+
+    def _set(self, positions):
+        """
+        Set the bits of a text, and count it if any of them was not set yet
+
+        :param positions: List from _positions
+        :returns: Boolean, True if the text is new
+        """
+        mapped, new = self._map, False
+        for byte, mask in positions:
+            value = mapped[byte]
+            if not value & mask:
+                mapped[byte] = value | mask
+                new = True
+        if new:
+            self.entries += 1
+            # The count is kept current in the file, so an interrupted run does not lose it
+            mapped[self._ENTRIES:self._ENTRIES + 8] = self.entries.to_bytes(8, 'little')
+        return new
+
+    def add(self, text):
+        """
+        Add a text, unless it is already in the store
+
+        :param text: string
+        :returns: Boolean, True if the text is new, False if it has probably been added before
+        """
+        positions = self._positions(text)
+        with self._lock:
+            self.checked += 1
+            if self._set(positions):
+                return True
+            self.duplicates += 1
+            return False
+
+    def hold(self, text):
+        """
+        Check a text that is about to be emitted, without adding it yet. The text is held in memory until commit adds
+        it, so a text that is never emitted, e.g. read ahead by a stream that is then closed, is not added.
+
+        :param text: string
+        :returns: Boolean, True if the text is neither in the store nor already held
+        """
+        positions = self._positions(text)
+        with self._lock:
+            self.checked += 1
+            mapped = self._map
+            if text in self._held or all(mapped[byte] & mask for byte, mask in positions):
+                self.duplicates += 1
+                return False
+            self._held[text] = positions
+            return True
+
+    def commit(self, text):
+        """
+        Add a text passed by hold, once it has been emitted
+
+        :param text: string
+        """
+        with self._lock:
+            positions = self._held.pop(text, None)
+            self._set(positions if positions is not None else self._positions(text))
+
+    def __contains__(self, text):
+        return all(self._map[byte] & mask for byte, mask in self._positions(text))
+
+    def __len__(self):
+        return self.entries
+
+    @property
+    def false_positive_rate(self):
+        """
+        Expected chance that a new text is taken for a duplicate, given the texts added so far
+        """
+        return (1 - math.exp(-self.hashes * self.entries / self.bits)) ** self.hashes
+
+    @property
+    def stats(self):
+        """
+        :returns: dictionary of the texts in the store, the texts checked and the duplicates found this run, the
+            size of the file in bytes, the number of bits and hashes, and the expected false positive rate
+        """
+        return {'entries': self.entries, 'checked': self.checked, 'duplicates': self.duplicates,
+                'bytes': self._offset() + self.bits // 8, 'bits': self.bits, 'hashes': self.hashes,
+                'false_positive_rate': self.false_positive_rate}
+
+    def flush(self):
+        """
+        Write the changed pages to disk
+        """
+        if self._map is not None:
+            self._map.flush()
+
+    def close(self):
+        if self._map is not None:
+            self.flush()
+            self._map.close()
+            self._map = None
@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+from multiprocessing.pool import ThreadPool
+from pathlib import Path
+# requests is slow to import, and only needed once something is downloaded
+
+
+class DownloadError(EnvironmentError):
+    pass
+
+
+class RangeDownloader(object):
+    """
+    Downloads a large file as byte ranges fetched over several pooled connections at once.
+
+    Ranges are written in place into <path>.part, and the ranges that are complete are recorded in a <path>.part.json
+    sidecar after each one, so an interrupted download carries on where it stopped. The sidecar also holds the size and
+    ETag (or Last-Modified date) the server reported. If either has changed, the partial file is thrown away and the
+    download starts again.
+    The file is only moved to <path> once its size has been checked.
+
+    Servers that do not accept Range requests get a single streamed request.
+    """
+
+    def __init__(self, connections=4, part_size=16, retries=3, timeout=60, session=None, log=None):
+        """
+        :param connections: int, number of ranges fetched at the same time
+        :param part_size: int, MB per range
+        :param retries: int, attempts per range before giving up
+        :param timeout: int, seconds to wait for the server to respond or send data
+        :param session: optional requests.Session to use
+        :param log: optional callable given progress messages
+        """
+        self.connections = max(int(connections), 1)
+        self.part_size = int(part_size * 1024**2)
+        self.retries = retries
+        self.timeout = timeout
+        if session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.connections)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+        self.log = log or (lambda message: None)
+
+    def _head(self, url):
+        r = self.session.head(url, allow_redirects=True, timeout=self.timeout)
+        r.raise_for_status()
+        size = r.headers.get('Content-Length', None)
+        return {'url': url,
+                'size': int(size) if size is not None else None,
+                # If-Range takes either the ETag or the Last-Modified date
+                'validator': r.headers.get('ETag', None) or r.headers.get('Last-Modified', None),
+                'ranges': r.headers.get('Accept-Ranges', '').lower() == 'bytes'}
+
+    @staticmethod
+    def _read_state(path):
+        try:
+            with open(path) as sf:
+                return json.load(sf)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_state(path, state):
+        partial = path.with_name(path.name + '.partial')
+        with open(partial, 'w') as sf:
+            json.dump(state, sf)
+        os.replace(str(partial), str(path))
+
+    def _fetch_range(self, url, validator, part_path, part, start, end):
+        """
+        Fetch bytes start to end inclusive into the .part file. Runs in a pool thread.
+
+        :returns: int, the index of the part
+        """
+        # Byte counts are of the file itself, so ask for it without any content encoding
+        headers = {'Range': 'bytes={}-{}'.format(start, end), 'Accept-Encoding': 'identity'}
+        if validator:
+            headers['If-Range'] = validator
+        import requests
+        for attempt in range(self.retries):
+            try:
+                with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as r:
+                    if r.status_code != 206:
+                        # If-Range failed, the file on the server has changed
+                        raise DownloadError("{} answered a range request with status {}".format(url, r.status_code))
+                    position = start
+                    with open(part_path, 'r+b') as pf:
+                        pf.seek(start)
+                        for chunk in r.iter_content(chunk_size=1024**2):
+                            pf.write(chunk)
+                            position += len(chunk)
+                if position != end + 1:
+                    raise requests.ConnectionError("range {}-{} of {} ended at {}".format(start, end, url, position))
+                return part
+            except requests.RequestException:
+                if attempt == self.retries - 1:
+                    raise
+
+    def _fetch_whole(self, url, part_path):
+        with self.session.get(url, headers={'Accept-Encoding': 'identity'}, stream=True, timeout=self.timeout) as r:
+            r.raise_for_status()
+            with open(part_path, 'wb') as pf:
+                for chunk in r.iter_content(chunk_size=1024**2):
+                    pf.write(chunk)
+
+    def download(self, url, path):
+        """
+        :param url: string, url of the file
+        :param path: string or Path to save the file to
+        :returns: Path of the downloaded file
+        """
+        path = Path(path)
+        part_path = path.with_name(path.name + '.part')
+        state_path = path.with_name(path.name + '.part.json')
+        remote = self._head(url)
+        size, validator = remote['size'], remote['validator']
+
+        if not remote['ranges'] or size is None:
+            self.log("DOWNLOAD: {} does not accept range requests, fetching it in one request".format(url))
+            self._fetch_whole(url, part_path)
+        else:
+            parts = [(i, start, min(start + self.part_size, size) - 1)
+                     for i, start in enumerate(range(0, size, self.part_size))]
+            state = self._read_state(state_path)
+            if state is None or not part_path.exists() or \
+                    (state['url'], state['size'], state['validator'], state['part_size']) != \
+                    (url, size, validator, self.part_size):
+                if state is not None:
+                    self.log("DOWNLOAD: {} has changed, starting again".format(url))
+                state = {'url': url, 'size': size, 'validator': validator, 'part_size': self.part_size, 'done': []}
+                with open(part_path, 'wb') as pf:
+                    pf.truncate(size)
+                self._write_state(state_path, state)
+            done = set(state['done'])
+            todo = [part for part in parts if part[0] not in done]
+            if done:
+                self.log("DOWNLOAD: Resuming {}, {} of {} parts left".format(url, len(todo), len(parts)))
+
+            # Once a part fails, the parts still queued are skipped and the ones in flight are waited for, so no
+            # thread writes to the .part file after download has returned
+            failed = threading.Event()
+
+            def fetch(part):
+                return None if failed.is_set() else self._fetch_range(url, validator, part_path, *part)
+
+            pool = ThreadPool(self.connections)
+            try:
+                for part in pool.imap_unordered(fetch, todo):
+                    state['done'].append(part)
+                    self._write_state(state_path, state)
+            finally:
+                failed.set()
+                pool.close()
+                pool.join()
+            if len(state['done']) != len(parts):
+                raise DownloadError("{} of {} parts of {} were downloaded".format(len(state['done']), len(parts), url))
+
+        if size is not None and part_path.stat().st_size != size:
+            raise DownloadError("{} is {} bytes, expected {}".format(part_path, part_path.stat().st_size, size))
+        os.replace(str(part_path), str(path))
+        if state_path.exists():
+            state_path.unlink()
+        return path
+
+
+def download_file(url, path, connections=4, **kwargs):
+    """
+    Download a file over several connections, resuming an earlier interrupted download of it
+
+    :param url: string, url of the file
+    :param path: string or Path to save the file to
+    :param connections: int, number of byte ranges fetched at the same time
+    :param kwargs: other RangeDownloader settings
+    :returns: Path of the downloaded file
+    """
+    return RangeDownloader(connections=connections, **kwargs).download(url, path)
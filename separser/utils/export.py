@@ -0,0 +1,200 @@
+import gzip
+import io
+import json
+import os
+import time
+from collections import deque
+from multiprocessing.pool import ThreadPool
+from pathlib import Path
+from .utils import import_optional
+
+MANIFEST = 'manifest.json'
+FORMATS = ['jsonl', 'parquet']
+COMPRESSIONS = {'jsonl': [None, 'gzip', 'zstd'], 'parquet': [None, 'snappy', 'gzip', 'zstd']}
+SUFFIXES = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+# Columns of a parquet shard that are not 'meta' keys
+RECORD_COLUMNS = ('html', 'text', 'meta_keys')
+RECORD_KEYS = ('meta', 'html', 'text')
+
+
+def _record_size(info):
+    # Rough size of a record, used to bound shards without encoding every record twice
+    return len(info.get('html') or '') + len(info.get('text') or '') + 256
+
+
+def _write_jsonl(path, records, compression):
+    if compression == 'zstd':
+        zstandard = import_optional('zstandard', 'zstd')
+        xf = zstandard.ZstdCompressor().stream_writer(open(path, 'wb'))
+    elif compression == 'gzip':
+        xf = gzip.open(path, 'wb', compresslevel=6)
+    else:
+        xf = open(path, 'wb')
+    with xf:
+        xf.write(''.join([json.dumps(info, ensure_ascii=False) + '\n' for info in records]).encode('utf-8'))
+
+
+def _write_parquet(path, records, compression):
+    pa = import_optional('pyarrow', 'parquet')
+    pq = import_optional('pyarrow.parquet', 'parquet')
+
+    keys, extras = [], []
+    for info in records:
+        for key in info['meta']:
+            if key not in keys:
+                keys.append(key)
+        # Keys beside meta, html and text, such as '_input_hash', have columns of their own
+        for key in info:
+            if key not in RECORD_KEYS and key not in extras:
+                extras.append(key)
+    names = list(RECORD_COLUMNS) + keys + extras
+    arrays = [pa.array([info['html'] for info in records], pa.string()),
+              pa.array([info['text'] for info in records], pa.string()),
+              pa.array([list(info['meta']) for info in records], pa.list_(pa.string()))]
+    columns = [(key, [info['meta'].get(key, None) for info in records]) for key in keys]
+    columns += [(key, [info.get(key, None) for info in records]) for key in extras]
+    json_columns = []
+    for key, values in columns:
+        try:
+            arrays.append(pa.array(values))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Values of more than one type, e.g. PostTags of '' or a List, are kept as json text
+            arrays.append(pa.array([json.dumps(value) for value in values], pa.string()))
+            json_columns.append(key)
+    table = pa.Table.from_arrays(arrays, names=names)
+    table = table.replace_schema_metadata({'json_columns': json.dumps(json_columns),
+                                           'record_keys': json.dumps(extras)})
+    pq.write_table(table, path, compression=compression or 'none')
+
+
+def _write_shard(path, records, file_format, compression):
+    """
+    Write one shard under a temporary name and move it into place, so a shard on disk is always complete
+
+    :returns: dictionary, the manifest entry of the shard
+    """
+    partial = path.with_name(path.name + '.partial')
+    if file_format == 'parquet':
+        _write_parquet(partial, records, compression)
+    else:
+        _write_jsonl(partial, records, compression)
+    os.replace(str(partial), str(path))
+    return {'file': path.name, 'records': len(records), 'bytes': path.stat().st_size}
+
+
+def write_shards(stream, directory, file_format='jsonl', compression='gzip', shard_size=64, workers=2, info=None):
+    """
+    Write a stream of parsed records to size bounded shards with a manifest.json listing them. Shards are encoded,
+    compressed and written by a pool of worker threads while the stream is read.
+
+    :param stream: iterable of record dictionaries, as yielded by StackExchangeParser
+    :param directory: string or Path, directory to write into, created if missing
+    :param file_format: string, 'jsonl' (one json record per line) or 'parquet' (needs pyarrow)
+    :param compression: string or None. jsonl: 'gzip' or 'zstd' (needs zstandard). parquet: 'snappy', 'gzip' or
+        'zstd'.
+    :param shard_size: int, approximate uncompressed MB of text per shard
+    :param workers: int, number of shards written at the same time
+    :param info: optional dictionary of extra fields for the manifest, e.g. the community and content_type
+    :returns: dictionary, the manifest
+    """
+    if file_format not in FORMATS:
+        raise ValueError("Acceptable export formats include {}".format(FORMATS))
+    if compression not in COMPRESSIONS[file_format]:
+        raise ValueError("Acceptable compressions for {} include {}".format(file_format, COMPRESSIONS[file_format]))
+    directory = Path(directory).absolute()
+    directory.mkdir(parents=True, exist_ok=True)
+    suffix = '.jsonl' + SUFFIXES[compression] if file_format == 'jsonl' else '.parquet'
+    limit = shard_size * 1024**2
+    workers = max(int(workers), 1)
+
+    shards = []
+    with ThreadPool(workers) as pool:
+        pending = deque()
+
+        def submit(records):
+            path = directory.joinpath('part-{:05d}{}'.format(len(shards) + len(pending), suffix))
+            pending.append(pool.apply_async(_write_shard, (path, records, file_format, compression)))
+            # Bound the shards held in memory
+            while len(pending) > workers:
+                shards.append(pending.popleft().get())
+
+        records, size = [], 0
+        for record in stream:
+            records.append(record)
+            size += _record_size(record)
+            if size >= limit:
+                submit(records)
+                records, size = [], 0
+        if records:
+            submit(records)
+        while pending:
+            shards.append(pending.popleft().get())
+
+    manifest = dict(info or {})
+    manifest.update({'format': file_format, 'compression': compression, 'records': sum(s['records'] for s in shards),
+                     'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'shards': shards})
+    with open(directory.joinpath(MANIFEST), 'w') as mf:
+        json.dump(manifest, mf, indent=2)
+    return manifest
+
+
+def read_manifest(directory):
+    """
+    :param directory: string or Path, directory written by write_shards
+    :returns: dictionary, the manifest
+    """
+    with open(Path(directory).joinpath(MANIFEST)) as mf:
+        return json.load(mf)
+
+
+def _read_jsonl(path, compression):
+    if compression == 'zstd':
+        zstandard = import_optional('zstandard', 'zstd')
+        raw = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    elif compression == 'gzip':
+        raw = gzip.open(path, 'rb')
+    else:
+        raw = open(path, 'rb')
+    with io.TextIOWrapper(raw, encoding='utf-8') as xf:
+        for line in xf:
+            yield json.loads(line)
+
+
+def _read_parquet(path):
+    pq = import_optional('pyarrow.parquet', 'parquet')
+
+    parquet = pq.ParquetFile(str(path))
+    metadata = parquet.schema_arrow.metadata or {}
+    json_columns = set(json.loads(metadata.get(b'json_columns', b'[]')))
+    extras = json.loads(metadata.get(b'record_keys', b'[]'))
+    for batch in parquet.iter_batches():
+        columns = batch.to_pydict()
+        html, text, meta_keys = (columns.pop(name) for name in RECORD_COLUMNS)
+        for key in json_columns:
+            columns[key] = [json.loads(value) for value in columns[key]]
+        extra_columns = [(key, columns.pop(key)) for key in extras]
+        for i, keys in enumerate(meta_keys):
+            record = {'meta': {key: columns[key][i] for key in keys}, 'html': html[i], 'text': text[i]}
+            for key, values in extra_columns:
+                if values[i] is not None:
+                    record[key] = values[i]
+            yield record
+
+
+def read_shards(directory):
+    """
+    Stream back the records of a directory written by write_shards, in the order they were written
+
+    :param directory: string or Path, directory written by write_shards
+    :returns: generator of record dictionaries, the same as the stream that was written
+    """
+    directory = Path(directory)
+    manifest = read_manifest(directory)
+    for shard in manifest['shards']:
+        path = directory.joinpath(shard['file'])
+        if manifest['format'] == 'parquet':
+            records = _read_parquet(path)
+        else:
+            records = _read_jsonl(path, manifest['compression'])
+        for record in records:
+            yield record
@@ -0,0 +1,135 @@
+import re
+from .rows import unescape_attribute
+
+# Criteria that only make sense for Posts rows
+POST_CRITERIA = ('post_types', 'min_views', 'accepted')
+
+
+class RowFilter(object):
+    """
+    Declarative filter on the attributes of StackExchange rows. The criteria are compiled once into a list of checks,
+    which are run either against the attribute dictionary of a row or against the raw bytes of a line before it is
+    decoded, so a rejected row costs a few byte searches. Every criterion that is set must hold.
+
+    Answers and Comments have no Tags of their own. They pass the tags criterion here, and are matched against the
+    tags of their Question once it has been looked up.
+
+        RowFilter(tags='python', min_score=5, post_types=2, created_from='2019-01-01', created_before='2020-01-01')
+    """
+
+    def __init__(self, tags=None, post_types=None, min_score=None, max_score=None, min_views=None, created_from=None,
+                 created_before=None, accepted=None):
+        """
+        :param tags: string or List of tags. Questions must carry at least one of them.
+        :param post_types: int or List of ints, PostTypeIds to keep, 1 for Questions and 2 for Answers
+        :param min_score: int, lowest Score kept
+        :param max_score: int, highest Score kept
+        :param min_views: int, lowest ViewCount kept. Rows without a ViewCount count as 0 views.
+        :param created_from: string, earliest CreationDate kept, e.g. '2019' or '2019-06-01'
+        :param created_before: string, CreationDates from this date on are dropped
+        :param accepted: Boolean, If True, only keep Questions with an accepted answer, if False, only those without
+            one. Answers are not affected.
+        """
+        if isinstance(tags, str):
+            tags = [tags]
+        if isinstance(post_types, (int, str)):
+            post_types = [post_types]
+        self.tags = list(tags) if tags else None
+        self.post_types = [int(post_type) for post_type in post_types] if post_types else None
+        self.min_score = min_score
+        self.max_score = max_score
+        self.min_views = min_views
+        self.created_from = created_from
+        self.created_before = created_before
+        self.accepted = accepted
+
+        # (attribute name, kind of check, argument) tuples, cheapest first
+        checks = []
+        if self.post_types is not None:
+            checks.append(('PostTypeId', 'in', {str(post_type) for post_type in self.post_types}))
+        if self.accepted is not None:
+            checks.append(('AcceptedAnswerId', 'accepted', bool(self.accepted)))
+        if self.min_score is not None:
+            checks.append(('Score', 'min', int(self.min_score)))
+        if self.max_score is not None:
+            checks.append(('Score', 'max', int(self.max_score)))
+        if self.min_views is not None:
+            checks.append(('ViewCount', 'min', int(self.min_views)))
+        if self.created_from is not None:
+            checks.append(('CreationDate', 'from', str(self.created_from)))
+        if self.created_before is not None:
+            checks.append(('CreationDate', 'before', str(self.created_before)))
+        if self.tags is not None:
+            checks.append(('Tags', 'tags', ['<{}>'.format(tag) for tag in self.tags]))
+        self._checks = checks
+        self._patterns = [re.compile(' {}="([^"]*)"'.format(name).encode()) for name, _, _ in checks]
+
+    @property
+    def criteria(self):
+        """
+        :returns: dictionary of the criteria that are set
+        """
+        names = ('tags', 'post_types', 'min_score', 'max_score', 'min_views', 'created_from', 'created_before',
+                 'accepted')
+        return {name: getattr(self, name) for name in names if getattr(self, name) is not None}
+
+    def check_file_type(self, file_type):
+        """
+        :param file_type: string, 'Posts', 'Comments' or 'Tags'
+        :raises ValueError: if a criterion does not apply to rows of the file
+        """
+        if file_type == 'Posts':
+            return
+        # Tags rows are matched by their TagName against the tags criterion
+        unusable = [name for name in self.criteria if name != 'tags' and (file_type == 'Tags' or name in POST_CRITERIA)]
+        if unusable:
+            raise ValueError("{} cannot filter {} rows".format(', '.join(unusable), file_type))
+
+    @staticmethod
+    def _passes(kind, argument, value, question):
+        if kind == 'in':
+            return value in argument
+        elif kind == 'accepted':
+            return not question or (value is not None) == argument
+        elif kind == 'tags':
+            return value is None or any(tag in value for tag in argument)
+        elif value is None:
+            if kind not in ('min', 'max'):
+                return False  # Rows without a date are dropped
+            value = '0'  # Rows without a count have none
+        if kind == 'min':
+            return int(value) >= argument
+        elif kind == 'max':
+            return int(value) <= argument
+        elif kind == 'from':
+            return value >= argument
+        return value < argument
+
+    def match(self, atb):
+        """
+        :param atb: dictionary of row attributes
+        :returns: Boolean, True if the row meets every criterion
+        """
+        question = atb.get('PostTypeId', None) == '1'
+        for name, kind, argument in self._checks:
+            if not self._passes(kind, argument, atb.get(name, None), question):
+                return False
+        return True
+
+    def match_line(self, line):
+        """
+        :param line: bytes, a single line <row/> element, as the lines reader sees it before decoding it
+        :returns: Boolean, True if the row meets every criterion
+        """
+        question = b' PostTypeId="1"' in line
+        for (name, kind, argument), pattern in zip(self._checks, self._patterns):
+            found = pattern.search(line)
+            value = found.group(1).decode() if found is not None else None
+            if kind == 'tags' and value is not None:
+                value = unescape_attribute(value)
+            if not self._passes(kind, argument, value, question):
+                return False
+        return True
+
+    def __bool__(self):
+        return bool(self._checks)
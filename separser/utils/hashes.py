@@ -0,0 +1,62 @@
+from zlib import crc32
+
+
+def _signed(value):
+    # Prodigy's hashes are signed 32 bit ints
+    return (value ^ 0x80000000) - 0x80000000
+
+
+class TaskHasher(object):
+    """
+    Prodigy _input_hash and _task_hash values of the records of a parser. Prodigy keeps the hashes a loader sets
+    rather than hashing every task itself. The input hash is taken over the community, file type, Id and HTML text of
+    a record and the newline setting of its cleaner, so it is known before the text is cleaned, and rows already
+    annotated can be skipped without cleaning them. It is a CRC32 over those bytes, about three times as fast as a
+    cryptographic hash of the same text.
+
+    The hashes are 32 bit like Prodigy's own, but are not the values Prodigy computes, so they only match tasks that
+    were loaded with hashes from this loader. The records carry no labels, spans or options, so the task hash only
+    depends on the input hash. Recipes that add them hash the task again.
+    """
+
+    def __init__(self, community, file_type, newlines=True):
+        """
+        :param community: string, name of the StackExchange community
+        :param file_type: string, 'Posts', 'Comments' or 'Tags'
+        :param newlines: Boolean, the newlines setting of the cleaner of the text
+        """
+        self._seed = crc32('{}\x1f{}\x1f{:d}\x1f'.format(community, file_type, bool(newlines)).encode())
+
+    def input_hash(self, record_id, text):
+        """
+        :param record_id: int or string, Id of the row
+        :param text: string, HTML text of the record
+        :returns: int
+        """
+        return _signed(crc32(text.encode('utf-8', 'surrogatepass'), crc32(b'%d\x1f' % int(record_id), self._seed)))
+
+    def input_hashes(self, ids, texts):
+        """
+        :param ids: iterable of row Ids
+        :param texts: iterable of HTML texts, in the same order
+        :returns: List of ints
+        """
+        seed = self._seed
+        return [(crc32(text.encode('utf-8', 'surrogatepass'), crc32(b'%d\x1f' % int(record_id), seed))
+                 ^ 0x80000000) - 0x80000000 for record_id, text in zip(ids, texts)]
+
+    @staticmethod
+    def task_hash(input_hash):
+        """
+        :param input_hash: int, from input_hash
+        :returns: int
+        """
+        return _signed(crc32(b'task\x1f%d' % input_hash))
+
+    @staticmethod
+    def task_hashes(input_hashes):
+        """
+        :param input_hashes: iterable of ints, from input_hashes
+        :returns: List of ints
+        """
+        return [(crc32(b'task\x1f%d' % input_hash) ^ 0x80000000) - 0x80000000 for input_hash in input_hashes]
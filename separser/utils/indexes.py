@@ -0,0 +1,670 @@
+import heapq
+import json
+import mmap
+import os
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from .rows import iterparse_rows, unescape_attribute
+
+TAG_PATTERN = re.compile('<(.+?)>')
+
+
+class TagTable(object):
+    """
+    Interns StackExchange tag names as small integer ids, so tag lists can be stored as arrays of ids.
+
+    """
+
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+
+    def intern(self, name):
+        """
+        :param name: string, tag name
+        :returns: int, id of the tag, assigned on first sight
+        """
+        tag_id = self.ids.get(name, None)
+        if tag_id is None:
+            tag_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return tag_id
+
+    def __len__(self):
+        return len(self.names)
+
+
+class CommentIndex(object):
+    """
+    PostId -> comment text index built from a single streaming pass over a StackExchange Comments.xml file.
+
+    Comment texts are concatenated into one buffer, grouped by PostId and kept in document order within each post.
+    Three flat arrays address the buffer:
+        keys: sorted unique PostIds
+        starts: for each key, the position of its first comment in bounds (len(keys) + 1 entries)
+        bounds: for each comment, its start position in the buffer (len(comments) + 1 entries)
+
+    Posts.xml is ordered by Id, so lookups made while streaming it walk the keys with a cursor and cost O(1). Lookups
+    made out of order fall back to a binary search.
+    """
+
+    def __init__(self, keys, starts, bounds, buffer):
+        self._keys = keys
+        self._starts = starts
+        self._bounds = bounds
+        self._buffer = buffer
+        self._cursor = 0
+
+    @classmethod
+    def from_xml(cls, source):
+        """
+        Build the index from a Comments.xml file
+
+        :param source: string path name or binary file object of a StackExchange Comments.xml file
+        :returns: CommentIndex
+        """
+        post_ids = array('q')
+        texts = []
+        for atb in iterparse_rows(source):
+            post_id = atb.get('PostId', None)
+            if post_id is None:
+                continue
+            post_ids.append(int(post_id))
+            texts.append(atb.get('Text', ''))
+
+        # A stable sort keeps the comments of each post in their original (Id) order
+        order = sorted(range(len(post_ids)), key=post_ids.__getitem__)
+
+        keys, starts, bounds = array('q'), array('q'), array('q', [0])
+        position = 0
+        for n, i in enumerate(order):
+            post_id = post_ids[i]
+            if not keys or keys[-1] != post_id:
+                keys.append(post_id)
+                starts.append(n)
+            position += len(texts[i])
+            bounds.append(position)
+        starts.append(len(order))
+
+        buffer = ''.join([texts[i] for i in order])
+        return cls(keys, starts, bounds, buffer)
+
+    def _find(self, post_id):
+        keys = self._keys
+        i = self._cursor
+        if i < len(keys) and keys[i] == post_id:
+            self._cursor = i + 1
+            return i
+        i = bisect_left(keys, post_id)
+        if i < len(keys) and keys[i] == post_id:
+            self._cursor = i + 1
+            return i
+        return None
+
+    def get(self, post_id):
+        """
+        Fetch the comments of a post
+
+        :param post_id: int or string, Id of the parent post
+        :returns: List of comment texts in document order, empty if the post has no comments
+        """
+        i = self._find(int(post_id))
+        if i is None:
+            return []
+        bounds, buffer = self._bounds, self._buffer
+        return [buffer[bounds[j]:bounds[j + 1]] for j in range(self._starts[i], self._starts[i + 1])]
+
+    def __contains__(self, post_id):
+        i = bisect_left(self._keys, int(post_id))
+        return i < len(self._keys) and self._keys[i] == int(post_id)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class PostLookup(object):
+    """
+    Post Id -> (title, tags) lookup built from a single streaming pass over a StackExchange Posts.xml file.
+
+    Only posts carrying a Title or Tags (questions) are kept and post bodies are never stored, so memory is
+    proportional to the question count. Tags are interned through a TagTable and stored as a flat array of tag ids.
+    """
+
+    def __init__(self, tag_table=None):
+        self.tags = tag_table if tag_table is not None else TagTable()
+        self._rows = {}
+        self._titles = []
+        self._tag_bounds = array('l', [0])
+        self._tag_ids = array('l')
+
+    @classmethod
+    def from_xml(cls, source, tag_table=None):
+        """
+        Build the lookup from a Posts.xml file
+
+        :param source: string path name or binary file object of a StackExchange Posts.xml file
+        :param tag_table: optional TagTable to intern tags into, shared with other indexes
+        :returns: PostLookup
+        """
+        lookup = cls(tag_table)
+        for atb in iterparse_rows(source):
+            title = atb.get('Title', None)
+            tags = atb.get('Tags', None)
+            if title is None and tags is None:
+                continue
+            lookup.add(atb['Id'], title, TAG_PATTERN.findall(tags) if tags else None)
+        return lookup
+
+    def add(self, post_id, title, tags):
+        """
+        :param post_id: int or string, Id of the post
+        :param title: string or None, title of the post
+        :param tags: List of tag names or None
+        """
+        self._rows[int(post_id)] = len(self._titles)
+        self._titles.append(title)
+        if tags:
+            self._tag_ids.extend(self.tags.intern(tag) for tag in tags)
+        self._tag_bounds.append(len(self._tag_ids))
+
+    def get(self, post_id, default=None):
+        """
+        :param post_id: int or string, Id of the post
+        :returns: Tuple of (title, List of tags or None), or default if the post is not in the lookup
+        """
+        row = self._rows.get(int(post_id), None)
+        if row is None:
+            return default
+        start, end = self._tag_bounds[row], self._tag_bounds[row + 1]
+        names = self.tags.names
+        tags = [names[tag_id] for tag_id in self._tag_ids[start:end]] if end > start else None
+        return self._titles[row], tags
+
+    def __contains__(self, post_id):
+        return int(post_id) in self._rows
+
+    def __len__(self):
+        return len(self._titles)
+
+
+class ActivityIndex(object):
+    """
+    Id -> last activity index of a StackExchange xml file, saved after parsing one dump so the next dump can be parsed
+    as a delta. Two parallel sorted arrays hold the row Ids and their activity stamps, the latest of the row's dates
+    packed into an integer (2019-08-31T12:34:56.789 -> 20190831123456789), so the index costs 16 bytes per row.
+
+    Rows come in Id order, so changed() walks the Ids with a cursor and costs O(1), falling back to a binary search.
+    """
+
+    MAGIC = b'SEAI'
+
+    def __init__(self, ids=None, stamps=None):
+        self.ids = ids if ids is not None else array('q')
+        self.stamps = stamps if stamps is not None else array('q')
+        self._cursor = 0
+
+    @staticmethod
+    def stamp(*dates):
+        """
+        :param dates: ISO date strings, or None
+        :returns: int, the latest date packed into an integer, 0 if there is none
+        """
+        dates = [date for date in dates if date]
+        if not dates:
+            return 0
+        d = max(dates)  # YYYY-MM-DDTHH:MM:SS.fff
+        return int(d[0:4] + d[5:7] + d[8:10] + d[11:13] + d[14:16] + d[17:19] + d[20:23].ljust(3, '0'))
+
+    def add(self, row_id, stamp):
+        self.ids.append(int(row_id))
+        self.stamps.append(stamp)
+
+    def _find(self, row_id):
+        ids = self.ids
+        i = self._cursor
+        if not (i < len(ids) and ids[i] == row_id):
+            i = bisect_left(ids, row_id)
+            if not (i < len(ids) and ids[i] == row_id):
+                return None
+        self._cursor = i + 1
+        return i
+
+    def changed(self, row_id, stamp):
+        """
+        :param row_id: int, Id of a row of the new dump
+        :param stamp: int, activity stamp of the row
+        :returns: Boolean, True if the row is not in the index or has changed since
+        """
+        i = self._find(row_id)
+        return i is None or stamp > self.stamps[i]
+
+    def deleted(self, newer):
+        """
+        :param newer: ActivityIndex of a later dump
+        :returns: array of the Ids in this index that are missing from newer
+        """
+        gone = array('q')
+        theirs, j = newer.ids, 0
+        for row_id in self.ids:
+            while j < len(theirs) and theirs[j] < row_id:
+                j += 1
+            if j == len(theirs) or theirs[j] != row_id:
+                gone.append(row_id)
+        return gone
+
+    def sort(self):
+        """
+        Put the index in Id order, for files whose rows are not
+        """
+        if any(self.ids[i] > self.ids[i + 1] for i in range(len(self.ids) - 1)):
+            order = sorted(range(len(self.ids)), key=self.ids.__getitem__)
+            self.ids = array('q', [self.ids[i] for i in order])
+            self.stamps = array('q', [self.stamps[i] for i in order])
+
+    def save(self, path):
+        """
+        :param path: string or Path, file to write, replaced atomically
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.sort()
+        partial = path.with_name(path.name + '.partial')
+        with open(partial, 'wb') as xf:
+            xf.write(self.MAGIC + len(self.ids).to_bytes(8, 'little'))
+            self.ids.tofile(xf)
+            self.stamps.tofile(xf)
+        os.replace(str(partial), str(path))
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param path: string or Path, file written by save
+        :returns: ActivityIndex, or None if the file does not exist
+        """
+        path = Path(path)
+        if not path.exists():
+            return None
+        with open(path, 'rb') as xf:
+            if xf.read(4) != cls.MAGIC:
+                raise ValueError("{} is not an activity index".format(path))
+            n = int.from_bytes(xf.read(8), 'little')
+            ids, stamps = array('q'), array('q')
+            ids.fromfile(xf, n)
+            stamps.fromfile(xf, n)
+        return cls(ids, stamps)
+
+    def __contains__(self, row_id):
+        return self._find(int(row_id)) is not None
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class TagIndex(object):
+    """
+    Tag dictionary and tag -> posts inverted index of a StackExchange dump, built from one pass over the raw lines of
+    Posts.xml and, when there is one, Tags.xml.
+
+    The dictionary interns every tag name through a TagTable, with its Count from Tags.xml (the number of Questions
+    carrying it otherwise) and an optional name -> name map of synonyms. The inverted index holds, for every tag, the
+    sorted byte offsets of the Questions carrying it and of their Answers, so the posts of a tag can be read by seeking
+    straight to them.
+
+    The index is saved to a single file: a json header with the dictionary, then an array of where each tag's offsets
+    start, then the offsets. Loading it only reads the header and the starts; the offsets of a tag are read from disk
+    when they are asked for.
+    """
+
+    MAGIC = b'SETI'
+    _RAW_TYPE = re.compile(rb' PostTypeId="([0-9]+)"')
+    _RAW_ID = re.compile(rb' Id="([0-9]+)"')
+    _RAW_PARENT = re.compile(rb' ParentId="([0-9]+)"')
+    _RAW_TAGS = re.compile(rb' Tags="([^"]*)"')
+    _RAW_TAG = re.compile(rb'&lt;(.+?)&gt;')
+
+    def __init__(self, tag_table, counts, synonyms=None, starts=None, postings=None, source=None, path=None):
+        """
+        :param tag_table: TagTable of the tag names
+        :param counts: List of the number of posts of each tag id
+        :param synonyms: dictionary of tag name to the tag name it stands for
+        :param starts: array of len(tag_table) + 1 positions of each tag's offsets, when they are on disk
+        :param postings: List of an array of offsets per tag id, when they are in memory
+        :param source: dictionary describing the Posts.xml file the index was built from
+        :param path: Path of the saved index the offsets are read from
+        """
+        self.tags = tag_table
+        self.counts = counts
+        self.synonyms = synonyms or {}
+        self.source = source or {}
+        self._starts = starts
+        self._postings = postings
+        self._path = path
+        self._data = None
+
+    @staticmethod
+    def describe(path):
+        """
+        :param path: Path of a Posts.xml file
+        :returns: dictionary identifying the version of the file
+        """
+        stat = Path(path).stat()
+        return {'file': Path(path).as_posix(), 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+    @classmethod
+    def from_xml(cls, posts, tags=None, synonyms=None):
+        """
+        Build the index
+
+        :param posts: string or Path of a StackExchange Posts.xml file
+        :param tags: optional string path name or binary file object of the Tags.xml file of the same dump
+        :param synonyms: optional dictionary of tag name to the tag name it stands for
+        :returns: TagIndex
+        """
+        table, counts = TagTable(), []
+        if tags is not None:
+            for atb in iterparse_rows(tags):
+                table.intern(atb['TagName'])
+                counts.append(int(atb.get('Count', 0)))
+        postings = [array('q') for _ in table.names]
+
+        # Tag ids of the Questions with Answers, in Id order, for their Answers to look up
+        question_ids, bounds, tag_ids = array('q'), array('q', [0]), array('l')
+        offset = 0
+        with open(Path(posts).as_posix(), 'rb') as xf:
+            for line in xf:
+                position = offset + len(line) - len(line.lstrip())
+                offset += len(line)
+                row_type = cls._RAW_TYPE.search(line)
+                if row_type is None:
+                    continue
+                row_type = row_type.group(1)
+                if row_type == b'1':
+                    raw = cls._RAW_TAGS.search(line)
+                    ids = [table.intern(unescape_attribute(tag.decode()))
+                           for tag in cls._RAW_TAG.findall(raw.group(1))] if raw is not None else []
+                    for tag_id in ids:
+                        if tag_id == len(postings):
+                            postings.append(array('q'))
+                            counts.append(0)
+                        postings[tag_id].append(position)
+                        if tags is None:
+                            counts[tag_id] += 1
+                    if ids and b' AnswerCount="0"' not in line:
+                        question_ids.append(int(cls._RAW_ID.search(line).group(1)))
+                        tag_ids.extend(ids)
+                        bounds.append(len(tag_ids))
+                elif row_type == b'2':
+                    parent = cls._RAW_PARENT.search(line)
+                    if parent is None:
+                        continue
+                    parent = int(parent.group(1))
+                    i = bisect_left(question_ids, parent)
+                    if i < len(question_ids) and question_ids[i] == parent:
+                        for tag_id in tag_ids[bounds[i]:bounds[i + 1]]:
+                            postings[tag_id].append(position)
+        return cls(table, counts, synonyms, postings=postings, source=cls.describe(posts))
+
+    def save(self, path):
+        """
+        :param path: string or Path, file to write, replaced atomically
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = json.dumps({'source': self.source, 'names': self.tags.names, 'counts': self.counts,
+                             'synonyms': self.synonyms}).encode()
+        starts = array('q', [0])
+        for tag_id in range(len(self.tags)):
+            starts.append(starts[-1] + len(self.offsets_of(tag_id)))
+        partial = path.with_name(path.name + '.partial')
+        with open(partial, 'wb') as xf:
+            xf.write(self.MAGIC + len(header).to_bytes(8, 'little'))
+            xf.write(header)
+            starts.tofile(xf)
+            for tag_id in range(len(self.tags)):
+                self.offsets_of(tag_id).tofile(xf)
+        os.replace(str(partial), str(path))
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param path: string or Path, file written by save
+        :returns: TagIndex, or None if the file does not exist
+        """
+        path = Path(path)
+        if not path.exists():
+            return None
+        with open(path, 'rb') as xf:
+            if xf.read(4) != cls.MAGIC:
+                raise ValueError("{} is not a tag index".format(path))
+            header = json.loads(xf.read(int.from_bytes(xf.read(8), 'little')).decode())
+            table = TagTable()
+            for name in header['names']:
+                table.intern(name)
+            starts = array('q')
+            starts.fromfile(xf, len(table) + 1)
+            index = cls(table, header['counts'], header['synonyms'], starts=starts, source=header['source'],
+                        path=path)
+            index._data = xf.tell()
+        return index
+
+    def resolve(self, name):
+        """
+        :param name: string, tag name or synonym
+        :returns: int, id of the tag, or None if the dump has no such tag
+        """
+        name = self.synonyms.get(name, name)
+        return self.tags.ids.get(name, None)
+
+    def count(self, name):
+        """
+        :param name: string, tag name or synonym
+        :returns: int, number of posts of the tag, 0 if the dump has no such tag
+        """
+        tag_id = self.resolve(name)
+        return self.counts[tag_id] if tag_id is not None else 0
+
+    def offsets_of(self, tag_id):
+        """
+        :param tag_id: int, id of a tag
+        :returns: sorted array of the byte offsets of the Questions carrying the tag and of their Answers
+        """
+        if self._postings is not None:
+            return self._postings[tag_id]
+        offsets = array('q')
+        with open(self._path, 'rb') as xf:
+            xf.seek(self._data + offsets.itemsize * self._starts[tag_id])
+            offsets.fromfile(xf, self._starts[tag_id + 1] - self._starts[tag_id])
+        return offsets
+
+    def offsets(self, names):
+        """
+        :param names: iterable of tag names or synonyms
+        :returns: sorted array of the byte offsets of the posts of any of the tags
+        """
+        ids = {self.resolve(name) for name in names} - {None}
+        merged, last = array('q'), -1
+        for offset in heapq.merge(*[self.offsets_of(tag_id) for tag_id in sorted(ids)]):
+            if offset != last:
+                merged.append(offset)
+                last = offset
+        return merged
+
+    def __contains__(self, name):
+        return self.resolve(name) is not None
+
+    def __len__(self):
+        return len(self.tags)
+
+
+class PostIndex(object):
+    """
+    Id -> byte offset index of a StackExchange Posts.xml and, optionally, its Comments.xml, for reading single posts
+    and threads without streaming the files.
+
+    Six sorted int64 arrays make up the index:
+        post ids and the offsets of their rows
+        the ParentIds of the Answers and the offsets of the Answers, grouped by ParentId
+        the PostIds of the Comments and the offsets of the Comments, grouped by PostId
+    A saved index is memory-mapped, so opening it costs nothing whatever its size, and a lookup is a binary search
+    followed by one seek and one line read.
+    """
+
+    MAGIC = b'SEPOSTIX'
+    _RAW_ID = re.compile(rb' Id="([0-9]+)"')
+    _RAW_PARENT = re.compile(rb' ParentId="([0-9]+)"')
+    _RAW_POST = re.compile(rb' PostId="([0-9]+)"')
+    _HEADER = 7  # int64 fields after MAGIC: 3 array lengths, then the size and mtime of both files
+
+    def __init__(self, arrays, source):
+        """
+        :param arrays: List of the six arrays, or memoryviews of them
+        :param source: Tuple of (Posts size, Posts mtime, Comments size, Comments mtime), zeros without Comments
+        """
+        self.post_ids, self.post_offsets, self.answer_parents, self.answer_offsets, self.comment_posts, \
+            self.comment_offsets = arrays
+        self.source = tuple(source)
+        self._map = None
+
+    @staticmethod
+    def describe(posts, comments=None):
+        """
+        :returns: Tuple of (Posts size, Posts mtime, Comments size, Comments mtime) identifying the files
+        """
+        described = []
+        for path in (posts, comments):
+            stat = Path(path).stat() if path is not None else None
+            described.extend((stat.st_size, stat.st_mtime_ns) if stat is not None else (0, 0))
+        return tuple(described)
+
+    @staticmethod
+    def _scan(path, *patterns):
+        # For each pattern, the raw ids it finds and the offsets of their rows
+        found = [(array('q'), array('q')) for _ in patterns]
+        offset = 0
+        with open(Path(path).as_posix(), 'rb') as xf:
+            for line in xf:
+                position = offset + len(line) - len(line.lstrip())
+                offset += len(line)
+                for pattern, (keys, offsets) in zip(patterns, found):
+                    key = pattern.search(line)
+                    if key is not None:
+                        keys.append(int(key.group(1)))
+                        offsets.append(position)
+        return found
+
+    @staticmethod
+    def _group(keys, offsets):
+        # Stable sort, so rows keep their file order within a key
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        return array('q', [keys[i] for i in order]), array('q', [offsets[i] for i in order])
+
+    @classmethod
+    def from_xml(cls, posts, comments=None):
+        """
+        Build the index with one pass over each file
+
+        :param posts: string or Path of a StackExchange Posts.xml file
+        :param comments: optional string or Path of the Comments.xml file of the same dump
+        :returns: PostIndex
+        """
+        rows, answers = cls._scan(posts, cls._RAW_ID, cls._RAW_PARENT)
+        post_ids, post_offsets = cls._group(*rows)
+        answer_parents, answer_offsets = cls._group(*answers)
+        if comments is not None:
+            comment_posts, comment_offsets = cls._group(*cls._scan(comments, cls._RAW_POST)[0])
+        else:
+            comment_posts, comment_offsets = array('q'), array('q')
+        return cls([post_ids, post_offsets, answer_parents, answer_offsets, comment_posts, comment_offsets],
+                   cls.describe(posts, comments))
+
+    def save(self, path):
+        """
+        :param path: string or Path, file to write, replaced atomically
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = array('q', [len(self.post_ids), len(self.answer_parents), len(self.comment_posts)])
+        header.extend(self.source)
+        partial = path.with_name(path.name + '.partial')
+        with open(partial, 'wb') as xf:
+            xf.write(self.MAGIC)
+            header.tofile(xf)
+            for values in (self.post_ids, self.post_offsets, self.answer_parents, self.answer_offsets,
+                           self.comment_posts, self.comment_offsets):
+                xf.write(values)
+        os.replace(str(partial), str(path))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-map a saved index
+
+        :param path: string or Path, file written by save
+        :returns: PostIndex, or None if the file does not exist
+        """
+        path = Path(path)
+        if not path.exists():
+            return None
+        with open(path, 'rb') as xf:
+            if xf.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError("{} is not a post index".format(path))
+            mapped = mmap.mmap(xf.fileno(), 0, access=mmap.ACCESS_READ)
+        words = memoryview(mapped)[len(cls.MAGIC):].cast('q')
+        posts, answers, comments = words[0:3]
+        arrays, position = [], cls._HEADER
+        for n in (posts, posts, answers, answers, comments, comments):
+            arrays.append(words[position:position + n])
+            position += n
+        index = cls(arrays, words[3:7])
+        index._map = (mapped, words, arrays)
+        return index
+
+    def close(self):
+        """
+        Release the memory map of a loaded index
+        """
+        if self._map is not None:
+            mapped, words, arrays = self._map
+            for values in arrays:
+                values.release()
+            words.release()
+            mapped.close()
+            self._map = None
+
+    @staticmethod
+    def _range(keys, key):
+        return bisect_left(keys, key), bisect_right(keys, key)
+
+    def post(self, post_id):
+        """
+        :param post_id: int or string, Id of a post
+        :returns: int, byte offset of the post's row in Posts.xml, or None if there is no such post
+        """
+        i = bisect_left(self.post_ids, int(post_id))
+        if i < len(self.post_ids) and self.post_ids[i] == int(post_id):
+            return self.post_offsets[i]
+        return None
+
+    def answers(self, post_id):
+        """
+        :param post_id: int or string, Id of a Question
+        :returns: List of the byte offsets of its Answers in Posts.xml, in file order
+        """
+        start, end = self._range(self.answer_parents, int(post_id))
+        return list(self.answer_offsets[start:end])
+
+    def comments(self, post_id):
+        """
+        :param post_id: int or string, Id of a post
+        :returns: List of the byte offsets of its Comments in Comments.xml, in file order
+        """
+        start, end = self._range(self.comment_posts, int(post_id))
+        return list(self.comment_offsets[start:end])
+
+    def __contains__(self, post_id):
+        return self.post(post_id) is not None
+
+    def __len__(self):
+        return len(self.post_ids)
@@ -6,14 +6,12 @@ class Log(object):
     def __init__(self, name, log_dir=None):
         self.name = name
 
-        if isinstance(log_dir, str):
+        if isinstance(log_dir, (str, Path)):
             self.log_dir = Path(log_dir).absolute()
-            if not self.log_dir.exists():
-                self.log_dir.mkdir(parents=True)
-        elif isinstance(log_dir, Path):
-            self.log_dir = log_dir
         else:
-            self.log_dir = Path.home().joinpath('logs/').as_posix()
+            self.log_dir = Path.home().joinpath('logs/')
+        if not self.log_dir.exists():
+            self.log_dir.mkdir(parents=True)
 
         loggers = logging.Logger.manager.loggerDict
         if self.name in loggers.keys():
@@ -35,9 +33,28 @@ class Log(object):
     # TODO refactor into class that has various verbosity levels
     def _log(self, message, *args, **kwargs):
         logger = self._logger
-        logger.info(message )
-        [logger.debug(arg) for arg in args]
-        [logger.debug(kwarg) for kwarg in kwargs]
+        logger.info(message)
+        if (args or kwargs) and logger.isEnabledFor(logging.DEBUG):
+            for arg in args:
+                logger.debug(arg)
+            for key, value in kwargs.items():
+                logger.debug('%s: %s', key, value)
 
     def __call__(self, message, *args, **kwargs):
         return self._log(message, *args, **kwargs)
+
+
+def get_log(name, log_dir=None):
+    """
+    Prodigy's log when Prodigy is installed, else a Log writing to log_dir/separse.log. Prodigy is only imported once
+    a log is needed, as importing it is slow.
+
+    :param name: string, name of the logger
+    :param log_dir: string or Path of the log directory
+    :returns: callable taking a message
+    """
+    try:
+        from prodigy import log
+    except (ImportError, ModuleNotFoundError):
+        return Log(name=name, log_dir=log_dir)
+    return log
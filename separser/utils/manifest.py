@@ -0,0 +1,98 @@
+import json
+import os
+import time
+from pathlib import Path
+# requests and bs4 are slow to import, so they are imported by the functions that use them
+
+ARCHIVE_URL = 'https://archive.org/download/stackexchange/'
+
+
+def parse_listing(html):
+    """
+    Read the community archives and dump date out of an archive.org directory listing
+
+    :param html: string, the listing page
+    :returns: Tuple of (List of community names, string date of the dump as YYYYMMDD)
+    """
+    from bs4 import BeautifulSoup
+    page_html = BeautifulSoup(html, 'lxml')
+    div = page_html.find('div', class_='download-directory-listing')
+    coms, dates = [], set()
+    for row in div.select('table.directory-listing-table tr'):
+        contents = row.contents
+        com = str(contents[1].contents[0].contents[0])
+        if '7z' in com:
+            coms.append(com.replace('.7z', ''))
+            d = contents[3].contents[0][:11]
+            dates.add(d[3:].replace('-', ''))
+    return coms, dates.pop()
+
+
+def fetch_listing(url=ARCHIVE_URL, timeout=60):
+    """
+    :param url: string, url of the StackExchange dump directory listing
+    :returns: Tuple of (List of community names, string date of the dump as YYYYMMDD)
+    """
+    import requests
+    page = requests.get(url, timeout=timeout)
+    page.raise_for_status()
+    return parse_listing(page.text)
+
+
+class CommunityManifest(object):
+    """
+    The community names and dump date of the StackExchange archive, cached in a json file so that they are only
+    fetched from the archive once every `ttl` hours. A stale cache is used when the archive cannot be reached.
+    """
+
+    def __init__(self, path, url=ARCHIVE_URL, ttl=24):
+        """
+        :param path: string or Path of the cache file
+        :param url: string, url of the archive directory listing the cache is for
+        :param ttl: number of hours the cache is trusted for
+        """
+        self.path = Path(path)
+        self.url = url
+        self.ttl = ttl
+        self.source = None
+
+    def _read(self):
+        try:
+            with open(self.path) as mf:
+                cached = json.load(mf)
+        except (OSError, ValueError):
+            return None
+        return cached if cached.get('url', None) == self.url else None
+
+    def _write(self, communities, date):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        partial = self.path.with_name(self.path.name + '.partial')
+        with open(partial, 'w') as mf:
+            json.dump({'url': self.url, 'fetched': time.time(), 'date': date, 'communities': sorted(communities)}, mf)
+        os.replace(str(partial), str(self.path))
+
+    def load(self, fetch, offline=False):
+        """
+        :param fetch: callable returning (List of community names, date) from the archive
+        :param offline: Boolean, If True, never call fetch, and use the cache however old it is
+        :returns: Tuple of (set of community names, string date or None). Both are empty when offline without a
+            cache. `source` is then set to 'cache', 'stale cache', 'archive' or None.
+        """
+        cached = self._read()
+        if cached is not None and (offline or time.time() - cached['fetched'] < self.ttl * 3600):
+            self.source = 'cache'
+            return set(cached['communities']), cached['date']
+        if offline:
+            self.source = None
+            return set(), None
+        import requests
+        try:
+            communities, date = fetch()
+        except (requests.RequestException, OSError):
+            if cached is None:
+                raise
+            self.source = 'stale cache'
+            return set(cached['communities']), cached['date']
+        self._write(communities, date)
+        self.source = 'archive'
+        return set(communities), date
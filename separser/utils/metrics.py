@@ -0,0 +1,73 @@
+import time
+
+
+class Metrics(object):
+    """
+    Progress counters and cumulative stage timings of a parse. The parser adds to the attributes directly, so keeping
+    them costs a few additions and clock reads per row. snapshot() turns them into totals and rates.
+
+    The stages are
+        parse: reading rows and decoding their attributes
+        enrich: checking rows against the filters, looking up their Question or parent post and assembling their text
+        clean: stripping the HTML from the text
+    """
+
+    def __init__(self, every=10000):
+        """
+        :param every: int, number of rows read between two reports
+        """
+        self.every = int(every)
+        self.due = self.every
+        self.started = None
+        self.stopped = None
+        self.emitted = 0
+        # Bytes read by the worker processes of a split file
+        self.bytes = 0
+        # Rows dropped after they were decoded, and rows dropped on their raw bytes by the lines reader. The two are
+        # counted apart, as the pipelined mode drops them in different threads.
+        self.dropped = {}
+        self.dropped_raw = {}
+        self.parse = 0.0
+        self.enrich = 0.0
+        self.clean = 0.0
+
+    def start(self):
+        if self.started is None:
+            self.started = time.perf_counter()
+
+    def stop(self):
+        self.stopped = time.perf_counter()
+
+    def drop(self, reason, count=1):
+        """
+        :param reason: string, why the rows were dropped, e.g. 'filter' or 'post_type'
+        :param count: int, number of rows
+        """
+        self.dropped[reason] = self.dropped.get(reason, 0) + count
+
+    def snapshot(self, rows, bytes_read, skipped=0):
+        """
+        :param rows: int, rows read so far
+        :param bytes_read: int, bytes read so far, besides those of the worker processes
+        :param skipped: int, rows the reader skipped as they are not Questions or Answers
+        :returns: dictionary of the counts, rates and stage seconds
+        """
+        dropped = dict(self.dropped)
+        for reason, count in self.dropped_raw.items():
+            dropped[reason] = dropped.get(reason, 0) + count
+        if skipped:
+            dropped['post_type'] = dropped.get('post_type', 0) + skipped
+        if self.started is None:
+            seconds = 0.0
+        else:
+            seconds = (self.stopped if self.stopped is not None else time.perf_counter()) - self.started
+        read = bytes_read + self.bytes
+        return {'rows': rows,
+                'emitted': self.emitted,
+                'dropped': dropped,
+                'bytes': read,
+                'seconds': seconds,
+                'rows_per_sec': rows / seconds if seconds else 0.0,
+                'mb_per_sec': read / 1024**2 / seconds if seconds else 0.0,
+                'stages': {'parse': self.parse, 'enrich': self.enrich, 'clean': self.clean},
+                'finished': self.stopped is not None}
@@ -0,0 +1,133 @@
+import threading
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+from queue import Queue, Full
+
+# Object whose method the worker processes call, set once per worker by the pool initializer
+_worker_obj = None
+
+
+def _init_worker(obj):
+    global _worker_obj
+    _worker_obj = obj
+
+
+def _call(method, args):
+    return getattr(_worker_obj, method)(*args)
+
+
+def worker_pool(obj, processes):
+    """
+    :param obj: picklable object, copied once into every worker process
+    :param processes: int, number of worker processes
+    :returns: multiprocessing Pool, for call_async
+    """
+    return Pool(processes, initializer=_init_worker, initargs=(obj,))
+
+
+def call_async(pool, method, *args):
+    """
+    Call obj.<method>(*args) in a worker of a worker_pool
+
+    :returns: AsyncResult
+    """
+    return pool.apply_async(_call, (method, args))
+
+
+def map_ranges(obj, method, markers, processes, ordered=True, window=None):
+    """
+    Call obj.<method>(start, end) for every (start, end) byte range across a pool of worker processes. obj is pickled
+    once per worker rather than once per range.
+
+    :param obj: picklable object that owns the worker method
+    :param method: string, name of the method to call
+    :param markers: iterable of (start byte, end byte) tuples
+    :param processes: int, number of worker processes
+    :param ordered: Boolean, If True, yield results in the order of markers. If False, yield them as they complete.
+    :param window: int, maximum number of ranges in flight, so a slow consumer does not buffer the whole file.
+        Defaults to twice the number of processes.
+    :returns: generator of method results
+    """
+    window = window or 2 * processes
+    markers = iter(markers)
+    with worker_pool(obj, processes) as pool:
+        if ordered:
+            pending = deque(pool.apply_async(_call, (method, marker)) for marker in islice(markers, window))
+            while pending:
+                result = pending.popleft().get()
+                pending.extend(pool.apply_async(_call, (method, marker)) for marker in islice(markers, 1))
+                yield result
+        else:
+            done = Queue()
+
+            def submit(marker):
+                pool.apply_async(_call, (method, marker), callback=done.put, error_callback=done.put)
+
+            in_flight = 0
+            for marker in islice(markers, window):
+                submit(marker)
+                in_flight += 1
+            while in_flight:
+                result = done.get()
+                in_flight -= 1
+                if isinstance(result, BaseException):
+                    raise result
+                for marker in islice(markers, 1):
+                    submit(marker)
+                    in_flight += 1
+                yield result
+
+
+def threaded(iterable, depth=4):
+    """
+    Iterate over iterable in a background thread, handing its items over through a bounded queue. The thread waits
+    while depth items are queued, so a slow consumer holds the producer back instead of letting items pile up.
+    Chained, each stage of a pipeline runs in its own thread.
+
+    Closing the generator stops the thread, and closes iterable if it is a generator, so a chain of stages shuts
+    down from the consumer end. An exception raised by iterable is raised again in the consumer.
+
+    :param iterable: iterable to run in the thread
+    :param depth: int, maximum number of items waiting in the queue
+    :returns: generator of the items of iterable, in order
+    """
+    items = Queue(maxsize=depth)
+    stop = threading.Event()
+    end = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((end, None))
+        except BaseException as e:
+            put((end, e))
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is end:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
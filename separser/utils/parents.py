@@ -0,0 +1,208 @@
+import os
+import sqlite3
+import sys
+import tempfile
+from array import array
+from .indexes import TagTable
+
+# Bytes a dict slot and its int key cost on top of the entry itself
+_SLOT_BYTES = sys.getsizeof(2**40) + 3 * 8
+
+
+class _Parent(object):
+    __slots__ = ('title', 'tags', 'answers', 'seen')
+
+    def __init__(self, title, tags, answers, seen=0):
+        self.title = title
+        self.tags = tags
+        self.answers = answers
+        self.seen = seen
+
+    def size(self):
+        return _SLOT_BYTES + sys.getsizeof(self) + sys.getsizeof(self.title) + sys.getsizeof(self.tags)
+
+
+class ParentCache(object):
+    """
+    Question Id -> (title, tags, answer counts) cache used to give Answers the title and tags of their Question.
+
+    Questions are added as they are read and dropped once all of their answers have been seen. Questions whose answers
+    were deleted never see them all, so instead of growing without bound the cache keeps at most `max_bytes` of
+    entries in memory. Past that, the oldest entries are spilled to an sqlite file, which is only consulted on a
+    miss. Answers mostly follow their Question closely, so the entries left waiting longest are the ones least likely
+    to be asked for again.
+
+    Entries are __slots__ objects holding the title, the tags as an array of TagTable ids and the answer counts.
+    """
+
+    def __init__(self, max_bytes=256 * 1024**2, directory=None, tag_table=None):
+        """
+        :param max_bytes: int, memory budget of the in-memory entries
+        :param directory: string or Path of the directory for the spill file, the temp directory if None
+        :param tag_table: optional TagTable to intern tags into, shared with other indexes
+        """
+        self.max_bytes = int(max_bytes)
+        self.directory = directory
+        self.tags = tag_table if tag_table is not None else TagTable()
+        self._entries = {}
+        self.bytes = 0
+        self._store = None
+        self._store_path = None
+        self.stored = 0
+        # Counters
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.spilled = 0
+
+    def _pack_tags(self, tags):
+        if tags is None:
+            return None
+        return array('I', [self.tags.intern(tag) for tag in tags]).tobytes()
+
+    def _unpack_tags(self, packed):
+        if packed is None:
+            return None
+        ids = array('I')
+        ids.frombytes(packed)
+        names = self.tags.names
+        return [names[tag_id] for tag_id in ids]
+
+    def add(self, post_id, title, tags, answers):
+        """
+        :param post_id: int or string, Id of the Question
+        :param title: string or None, title of the Question
+        :param tags: List of tag names or None
+        :param answers: int, number of Answers the Question has
+        """
+        entry = _Parent(title, self._pack_tags(tags), answers)
+        post_id = int(post_id)
+        previous = self._entries.get(post_id, None)
+        if previous is not None:
+            self.bytes -= previous.size()
+        self._entries[post_id] = entry
+        self.bytes += entry.size()
+        if self.bytes > self.max_bytes:
+            self._spill()
+
+    def answer(self, post_id):
+        """
+        Count an Answer of a Question, dropping the Question once all of its answers have been seen
+
+        :param post_id: int or string, Id of the parent Question
+        :returns: Tuple of (title, List of tags or None), or None if the Question is not in the cache
+        """
+        post_id = int(post_id)
+        entry = self._entries.get(post_id, None)
+        if entry is not None:
+            self.hits += 1
+            entry.seen += 1
+            if entry.seen >= entry.answers:
+                del self._entries[post_id]
+                self.bytes -= entry.size()
+            return entry.title, self._unpack_tags(entry.tags)
+
+        row = self._fetch(post_id)
+        if row is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        title, packed, answers, seen = row
+        if seen + 1 >= answers:
+            self._store.execute('DELETE FROM parents WHERE id = ?', (post_id,))
+            self.stored -= 1
+        else:
+            self._store.execute('UPDATE parents SET seen = ? WHERE id = ?', (seen + 1, post_id))
+        return title, self._unpack_tags(packed)
+
+    def _fetch(self, post_id):
+        if not self.stored:
+            return None
+        return self._store.execute('SELECT title, tags, answers, seen FROM parents WHERE id = ?',
+                                   (post_id,)).fetchone()
+
+    def _open_store(self):
+        handle, self._store_path = tempfile.mkstemp(prefix='parents_', suffix='.sqlite', dir=self.directory)
+        os.close(handle)
+        # The store only lives as long as the cache, so durability is not needed
+        self._store = sqlite3.connect(self._store_path, check_same_thread=False)
+        self._store.execute('PRAGMA journal_mode = OFF')
+        self._store.execute('PRAGMA synchronous = OFF')
+        self._store.execute('CREATE TABLE parents (id INTEGER PRIMARY KEY, title TEXT, tags BLOB, answers INTEGER, '
+                            'seen INTEGER)')
+
+    def _spill(self):
+        """
+        Move the oldest entries to the store, down to three quarters of the memory budget
+        """
+        if self._store is None:
+            self._open_store()
+        target = self.bytes - self.max_bytes * 3 // 4
+        freed, rows = 0, []
+        for post_id, entry in self._entries.items():
+            if freed >= target:
+                break
+            freed += entry.size()
+            rows.append((post_id, entry.title, entry.tags, entry.answers, entry.seen))
+        with self._store:
+            self._store.executemany('INSERT OR REPLACE INTO parents VALUES (?, ?, ?, ?, ?)', rows)
+        for row in rows:
+            del self._entries[row[0]]
+        self.bytes -= freed
+        self.stored += len(rows)
+        self.spilled += len(rows)
+
+    def __contains__(self, post_id):
+        post_id = int(post_id)
+        return post_id in self._entries or self._fetch(post_id) is not None
+
+    def __len__(self):
+        return len(self._entries) + self.stored
+
+    @property
+    def stats(self):
+        """
+        :returns: dictionary of the entry counts, memory use and hit, miss and spill counters
+        """
+        return {'entries': len(self._entries), 'stored': self.stored, 'bytes': self.bytes, 'hits': self.hits,
+                'disk_hits': self.disk_hits, 'misses': self.misses, 'spilled': self.spilled}
+
+    def _rows(self):
+        for post_id, entry in self._entries.items():
+            yield post_id, entry.title, entry.tags, entry.answers, entry.seen
+        if self.stored:
+            for row in self._store.execute('SELECT id, title, tags, answers, seen FROM parents'):
+                yield row
+
+    def close(self):
+        """
+        Delete the spill file
+        """
+        if self._store is not None:
+            self._store.close()
+            os.remove(self._store_path)
+            self._store = None
+            self.stored = 0
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def __getstate__(self):
+        # Checkpoints hold every entry, wherever it is kept, and a restored cache spills again as it needs to
+        state = {key: value for key, value in self.__dict__.items() if key not in ('_entries', '_store')}
+        state['rows'] = list(self._rows())
+        return state
+
+    def __setstate__(self, state):
+        rows = state.pop('rows')
+        self.__dict__.update(state)
+        self._entries, self._store, self._store_path = {}, None, None
+        self.bytes, self.stored = 0, 0
+        for post_id, title, tags, answers, seen in rows:
+            entry = self._entries[post_id] = _Parent(title, tags, answers, seen)
+            self.bytes += entry.size()
+            if self.bytes > self.max_bytes:
+                self._spill()
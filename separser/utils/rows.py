@@ -0,0 +1,267 @@
+import re
+from bisect import bisect_left
+from xml.etree import ElementTree as ET
+
+
+class _CountedReader(object):
+    """
+    Binary file wrapper counting the bytes read through it
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes = 0
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        self.bytes += len(data)
+        return data
+
+
+class TreeReader(object):
+    """
+    ElementTree reader for StackExchange xml files. Yields the attributes of every <row/> element and detaches each
+    processed row from the root element, so memory use stays flat however many rows the file holds. Clearing a row
+    is not enough: the emptied element stays attached to the root, which grows by one element per row.
+    """
+
+    def __init__(self, source):
+        """
+        :param source: string path name or binary file object of a StackExchange xml file
+        """
+        self.source = source
+        self.root = None
+        self.rows = 0
+        # Rows skipped without being yielded, always 0 here as every row is parsed
+        self.skipped = 0
+        self._counted = None
+
+    @property
+    def bytes(self):
+        """
+        Bytes handed to the xml parser so far, which reads ahead of the rows it has yielded by up to 64KB
+        """
+        return self._counted.bytes if self._counted is not None else 0
+
+    def __iter__(self):
+        owned = isinstance(self.source, (str, bytes)) or hasattr(self.source, '__fspath__')
+        xf = open(self.source, 'rb') if owned else self.source
+        self._counted = _CountedReader(xf)
+        try:
+            context = ET.iterparse(self._counted, events=('start', 'end'))
+            _, root = next(context)
+            self.root = root.tag
+            for event, elem in context:
+                if event == 'end' and elem.tag == 'row':
+                    self.rows += 1
+                    yield elem.attrib
+                    root.clear()
+        finally:
+            if owned:
+                xf.close()
+
+
+def iterparse_rows(source):
+    """
+    Stream the attributes of every <row/> element in a StackExchange xml file in constant memory
+
+    :param source: string path name or binary file object of a StackExchange xml file
+    :returns: iterator of attribute dictionaries, one per row
+    """
+    return iter(TreeReader(source))
+
+
+ROW_START = b'<row '
+# Character references and '&amp;' are expanded in a single pass, since either can produce a '&'
+REFERENCE = re.compile(r'&(#[0-9]+|#x[0-9a-fA-F]+|amp);')
+
+
+def _expand_reference(match):
+    ref = match.group(1)
+    if ref == 'amp':
+        return '&'
+    elif ref[1] == 'x':
+        return chr(int(ref[2:], 16))
+    return chr(int(ref[1:]))
+
+
+def unescape_attribute(value):
+    """
+    Expand the entity and character references of an xml attribute value
+
+    :param value: string, attribute value as it appears between the quotes
+    :returns: string
+    """
+    if '&' not in value:
+        return value
+    # In a well formed value every '&' starts a reference, so these replacements cannot misfire. None of them
+    # produce a '&', so '&amp;' is left for last.
+    value = value.replace('&#xA;', '\n').replace('&lt;', '<').replace('&gt;', '>').replace('&quot;', '"')\
+        .replace('&apos;', "'").replace('&#xD;', '\r')
+    if '&#' in value:
+        return REFERENCE.sub(_expand_reference, value)
+    return value.replace('&amp;', '&')
+
+
+def parse_row(line, fields=None):
+    """
+    Read the attributes of a single line <row .../> element the way an xml parser does
+
+    :param line: bytes, one line of a StackExchange xml file holding a <row/> element
+    :param fields: set of attribute names to decode, or None to decode every attribute
+    :returns: dictionary of attribute name to value
+    """
+    line = line.decode('utf-8')
+    if '\t' in line:
+        line = line.replace('\t', ' ')  # xml turns literal tabs in attribute values into spaces
+    # Attribute values cannot hold a raw '"', so splitting on it alternates between names and values, and the
+    # closing '/>' is left unpaired
+    parts = iter(line.split('"'))
+    row = {}
+    for name, value in zip(parts, parts):
+        name = name[name.rfind(' ') + 1:-1]
+        if fields is None or name in fields:
+            row[name] = unescape_attribute(value) if '&' in value else value
+    return row
+
+
+class LineReader(object):
+    """
+    Fast reader for StackExchange xml files. Every dump file holds one self-closing <row .../> element per line, so
+    rows are split out of each line directly instead of being built into ElementTree elements, and only the
+    attributes that are asked for are decoded.
+
+    Yields the same attribute dictionaries as iterparse_rows, restricted to `fields`.
+    """
+
+    def __init__(self, source, start=0, end=None, fields=None, where=None, keep=None):
+        """
+        :param source: string path name or binary file object of a StackExchange xml file. A file object that cannot
+            seek, such as a 7zip stream, can only be read from the start.
+        :param start: int, byte offset of the first line to read. Must be the start of a line.
+        :param end: int or None, byte offset at which to stop reading
+        :param fields: iterable of attribute names to decode, or None to decode every attribute
+        :param where: dictionary of attribute name to the values accepted for it. Rows with any other value are
+            skipped on their raw bytes, before anything is decoded.
+        :param keep: optional callable given the raw bytes of every row, before `where` is checked. Rows it returns
+            False for are skipped without being decoded.
+        """
+        self.source = source
+        self.start = start
+        self.end = end
+        self.fields = set(fields) if fields is not None else None
+        self.keep = keep
+        self.where = [re.compile(b'|'.join(re.escape(' {}="{}"'.format(name, value).encode()) for value in values))
+                      for name, values in (where or {}).items()]
+        self.root = None
+        self.rows = 0
+        # Rows skipped by `where`
+        self.skipped = 0
+        self.offset = start
+
+    @property
+    def bytes(self):
+        """
+        Bytes read so far
+        """
+        return self.offset - self.start
+
+    def _open(self, seek=False):
+        """
+        :param seek: Boolean, If True, the source has to be seekable
+        :returns: Tuple of (binary file object, Boolean, True if it was opened here and is closed after reading)
+        """
+        if isinstance(self.source, (str, bytes)) or hasattr(self.source, '__fspath__'):
+            return open(self.source, 'rb'), True
+        if seek and not (hasattr(self.source, 'seekable') and self.source.seekable()):
+            raise ValueError("{} needs a seekable file to read from a byte offset, e.g. an xml file on disk rather "
+                             "than a 7zip stream".format(type(self).__name__))
+        return self.source, False
+
+    def _read_root(self, xf):
+        # The root element is only seen from the start of the file
+        for line in xf:
+            stripped = line.lstrip()
+            if stripped.startswith(ROW_START):
+                break
+            if stripped.startswith(b'<') and not stripped.startswith((b'<?', b'</')):
+                self.root = stripped[1:].split(b'>')[0].split()[0].decode()
+                break
+
+    def __iter__(self):
+        xf, owned = self._open(seek=bool(self.start))
+        try:
+            if self.start:
+                if self.root is None:
+                    xf.seek(0)
+                    self._read_root(xf)
+                xf.seek(self.start)
+            fields, where, keep, end = self.fields, self.where, self.keep, self.end
+            offset = self.start
+            for line in xf:
+                offset += len(line)
+                self.offset = offset
+                stripped = line.lstrip()
+                if stripped.startswith(ROW_START):
+                    self.rows += 1
+                    if keep is not None and not keep(stripped):
+                        pass
+                    elif where and not all(pattern.search(stripped) for pattern in where):
+                        self.skipped += 1
+                    else:
+                        yield parse_row(stripped, fields)
+                elif self.root is None and stripped.startswith(b'<') and not stripped.startswith((b'<?', b'</')):
+                    self.root = stripped[1:].split(b'>')[0].split()[0].decode()
+                if end is not None and offset >= end:
+                    break
+        finally:
+            if owned:
+                xf.close()
+
+
+class OffsetReader(LineReader):
+    """
+    LineReader over only the rows starting at the given byte offsets, e.g. the posts of a tag found through a
+    TagIndex. The lines in between are never read.
+    """
+
+    def __init__(self, source, offsets, start=0, end=None, fields=None, where=None, keep=None):
+        """
+        :param source: string path name or binary file object of a StackExchange xml file, which must be seekable
+        :param offsets: sorted array of the byte offsets of the rows to read
+        :param start: int, rows before this byte offset are skipped
+        :param end: int or None, rows from this byte offset on are skipped
+        """
+        super().__init__(source, start=start, end=end, fields=fields, where=where, keep=keep)
+        self.offsets = offsets
+        self._bytes = 0
+
+    @property
+    def bytes(self):
+        return self._bytes
+
+    def __iter__(self):
+        xf, owned = self._open(seek=True)
+        try:
+            if self.root is None:
+                xf.seek(0)
+                self._read_root(xf)
+            fields, where, keep, end, offsets = self.fields, self.where, self.keep, self.end, self.offsets
+            for i in range(bisect_left(offsets, self.start), len(offsets)):
+                offset = offsets[i]
+                if end is not None and offset >= end:
+                    break
+                xf.seek(offset)
+                line = xf.readline()
+                self.offset = offset + len(line)
+                self._bytes += len(line)
+                self.rows += 1
+                if keep is not None and not keep(line):
+                    pass
+                elif where and not all(pattern.search(line) for pattern in where):
+                    self.skipped += 1
+                else:
+                    yield parse_row(line, fields)
+        finally:
+            if owned:
+                xf.close()
@@ -1,15 +1,21 @@
+import importlib
+import io
 import shutil
 import os
 import sys
 import threading
 import subprocess
-import requests
 try:
     import winreg
 except ModuleNotFoundError:
     pass
+try:
+    import resource
+except ModuleNotFoundError:  # Windows
+    resource = None
 from .log import Log
 import math
+from pathlib import Path
 
 
 def find_program_win(name, program_to_find='SOFTWARE\\7-Zip'):
@@ -31,6 +37,7 @@ def find_program_win(name, program_to_find='SOFTWARE\\7-Zip'):
             log("Attempting to download {}".format(url))
             local_filename = url.split('/')[-1]
 
+            import requests
             with requests.get(url, stream=True) as r:
                 r.raise_for_status()
                 homepath = os.environ.get('HOMEPATH', ".")
@@ -118,6 +125,125 @@ def capture_7zip_stdout(call):
     return create_dict(captured_stdout)
 
 
+class ArchiveMember(object):
+    """
+    A StackExchange xml file inside a 7-Zip archive. Opening it pipes `7z e -so` into the caller, so the xml is parsed
+    as it is decompressed and the archive is neither modified nor extracted to disk.
+
+    Mirrors the parts of the pathlib.Path interface the parser uses for extracted files. The name is the one the file
+    would be given by extraction, i.e. '<community>_Posts.xml'.
+    """
+
+    def __init__(self, program, archive, member, members=None):
+        """
+        :param program: string path to the 7z executable
+        :param archive: string or Path to the 7-Zip archive
+        :param member: string, name of the xml file within the archive
+        :param members: optional collection of every file name in the archive, used to find sibling files
+        """
+        self.program = program
+        self.archive = Path(archive).absolute()
+        self.member = member
+        self.members = members
+        com_name = self.archive.name.split('.')[0]
+        file_type = member.split('_')[-1]
+        self.name = '{}_{}'.format(com_name, file_type)
+        self.stem, self.suffix = self.name.rsplit('.', 1)
+        self.suffix = '.' + self.suffix
+        self.parent = self.archive.parent
+
+    def exists(self):
+        return self.archive.exists() and (self.members is None or self.member in self.members)
+
+    def as_posix(self):
+        return '{}:{}'.format(self.archive.as_posix(), self.member)
+
+    def sibling(self, file_type):
+        """
+        :param file_type: string, StackExchange file type such as 'Posts' or 'Comments'
+        :returns: ArchiveMember for that file type in the same archive, or None if the archive does not contain it
+        """
+        for member in (self.members or []):
+            if member.split('_')[-1] == '{}.xml'.format(file_type):
+                return ArchiveMember(self.program, self.archive, member, self.members)
+        return None
+
+    def open(self):
+        """
+        :returns: binary file object streaming the decompressed xml. It can be read and iterated line by line, but
+            not seeked.
+        """
+        return io.BufferedReader(_ArchiveStream([self.program, 'e', '-so', '-bd', self.archive.as_posix(),
+                                                 self.member]), buffer_size=1024 * 1024)
+
+
+class _ArchiveStream(io.RawIOBase):
+    """
+    Read-only raw file object over the stdout of a 7z process. Reaps the process at end of file or on close, and
+    raises if 7z failed so a truncated stream is not mistaken for a complete file.
+    """
+
+    def __init__(self, call):
+        super().__init__()
+        self.call = call
+        self._process = subprocess.Popen(call, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                         bufsize=1024 * 1024)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._process.stdout.closed:
+            return 0  # At the end of the file already
+        read = self._process.stdout.readinto(buffer)
+        if not read:
+            self._finish(eof=True)
+        return read
+
+    def close(self):
+        if not self.closed:
+            self._finish(eof=False)
+        super().close()
+
+    def _finish(self, eof):
+        process = self._process
+        if process.stdout.closed:
+            return
+        if not eof and process.poll() is None:
+            process.kill()  # closed before the end of the file, stop decompressing
+        process.stdout.close()
+        returncode = process.wait()
+        if eof and returncode != 0:
+            raise EnvironmentError("7-Zip exited with code {} while running {}".format(returncode, ' '.join(self.call)))
+
+
+def import_optional(name, extra):
+    """
+    Import a module that is only needed by some features
+
+    :param name: string, name of the module, e.g. 'pyarrow.parquet'
+    :param extra: string, the extra of the package in setup.py that installs it
+    :returns: the module
+    :raises ImportError: naming the extra to install when the module is missing
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        raise ImportError("{} is not installed, install it with pip install 'stackexchangeparser[{}]'"
+                          .format(name.split('.')[0], extra)) from e
+
+
+def peak_rss():
+    """
+    :returns: float, peak resident set size of this process in MB, or None where the OS does not report it
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+
+
 def query_yes_no(question, default="yes"):
     """Ask a yes/no question via input() and return answer.
 
@@ -160,22 +286,28 @@ def chunker(seq, chunks):
 
 
 def generate_file_markers(file_obj, mem_size=100, mem_unit='MB'):
+    """
+    Split a StackExchange xml file into byte ranges of roughly mem_size that start and end on line boundaries. Every
+    <row/> element of a dump sits on its own line, so each range holds whole rows.
 
-    UNITS = {'GB': 4**1024, 'MB': 3**1024, 'KB': 2**1024, 'B': 1}
+    :param file_obj: string or Path of the xml file
+    :param mem_size: int, approximate size of each range
+    :param mem_unit: string, one of 'GB', 'MB', 'KB' or 'B'
+    :returns: List of (start byte, end byte) tuples covering the whole file
+    """
+    UNITS = {'GB': 1024**3, 'MB': 1024**2, 'KB': 1024, 'B': 1}
     if mem_unit not in UNITS.keys():
         mem_unit = 'MB'
 
-    chunk_size = mem_size * UNITS[mem_unit]
+    chunk_size = max(int(mem_size * UNITS[mem_unit]), 1)
     end_byte = os.stat(file_obj).st_size
     cur_byte = 0
     file_markers = []
-    with open(file_obj, 'r') as xf:
-        for i in list(range(start=cur_byte, stop=end_byte, step=chunk_size))[1:]:
-            xf.seek(i, os.SEEK_CUR)
-            line = xf.readline()
-            if line != '':
-                next_byte = xf.tell()+1
-                file_markers.append((cur_byte, next_byte))
-                cur_byte = next_byte
-            else:
-                file_markers.append((cur_byte, end_byte))
+    with open(file_obj, 'rb') as xf:
+        while cur_byte < end_byte:
+            xf.seek(min(cur_byte + chunk_size, end_byte))
+            xf.readline()  # Move on to the start of the next line
+            next_byte = min(xf.tell(), end_byte)
+            file_markers.append((cur_byte, next_byte))
+            cur_byte = next_byte
+    return file_markers
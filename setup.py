@@ -26,6 +26,10 @@ setup(
                       'plac',
                       'lxml'
                       ],
+    extras_require={'parquet': ['pyarrow'],
+                    'batches': ['numpy'],
+                    'zstd': ['zstandard']
+                    },
     entry_points={
         'console_scripts': [
             'separse=separser.utils.command_line:main'
@@ -0,0 +1,17 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).absolute().parents[1]))
+sys.path.insert(0, str(Path(__file__).absolute().parents[1].joinpath('benchmarks')))
+
+from synthetic import write_dump  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def dump(tmp_path_factory):
+    """
+    Paths of a small synthetic dump, shared by the tests
+    """
+    return write_dump(tmp_path_factory.mktemp('dump'), questions=300)
@@ -0,0 +1,45 @@
+import shutil
+
+import pytest
+
+from separser import StackExchangeParser
+from separser.batch import BatchRunner
+from separser.utils import read_shards
+from synthetic import write_dump
+
+
+@pytest.fixture
+def proj_dir(dump, tmp_path):
+    # Two communities extracted into the project dir, so the runner needs no network
+    proj_dir = tmp_path / 'proj'
+    proj_dir.mkdir()
+    for path in dump.values():
+        shutil.copy(str(path), str(proj_dir))
+    write_dump(proj_dir, questions=50, community='example', seed=1)
+    return proj_dir
+
+
+@pytest.mark.parametrize('content_type', ['post_both', 'comments_both'])
+def test_run_equals_parse(proj_dir, tmp_path, content_type):
+    communities = ['synthetic.stackexchange.com', 'example.stackexchange.com', 'missing.stackexchange.com']
+    runner = BatchRunner(communities, proj_dir=proj_dir, processes=2, offline=True, content_type=content_type,
+                         filters={'min_score': 2})
+    summary = runner.run(tmp_path / 'out', compression=None)
+    assert summary['failed'] == ['missing.stackexchange.com']
+    assert 'not cached' in summary['communities']['missing.stackexchange.com']['error']
+    # Largest first
+    assert [community for community, _ in runner.schedule()][:2] == communities[:2]
+
+    for community in communities[:2]:
+        file_type = 'Comments' if 'comments' in content_type else 'Posts'
+        path = proj_dir / '{}_{}.xml'.format(community.split('.')[0], file_type)
+        expected = list(StackExchangeParser(path.as_posix(), community, proj_dir=tmp_path / 'direct', offline=True,
+                                            content_type=content_type, filters={'min_score': 2}))
+        assert expected and list(read_shards(tmp_path / 'out' / community)) == expected
+        result = summary['communities'][community]
+        assert result['records'] == len(expected) and 'error' not in result
+
+
+def test_reserved_kwargs(proj_dir):
+    with pytest.raises(ValueError):
+        BatchRunner(['synthetic.stackexchange.com'], proj_dir=proj_dir, offline=True, splits=2)
@@ -0,0 +1,54 @@
+import re
+
+import pytest
+
+from separser.utils import LineReader, TagStripper, TextCleaner
+
+NEWLINE = re.compile(r'\n+')
+
+TRICKY = [
+    '',
+    'plain text\n\n\nwith newlines',
+    '<p>a &amp; b &lt;c&gt; &quot;d&quot; &#39;e&#39; &#x27;f&#x27; &eacute; &nbsp;end</p>',
+    '<p>unterminated &amp',
+    '<p>ends in &',
+    '<p>&notit; &copy2020 &#12345678;</p>',
+    '<pre><code>if a &lt; b:\n\n    print("<b>")\n</code></pre>\n\n<p>after</p>',
+    '<p>Inline <code>x &gt; 0 &amp;&amp; y</code> and <kbd>Ctrl</kbd>+<kbd>C</kbd></p>',
+    '<ul>\n<li>one\n<ol>\n<li>nested <em>two</em></li>\n<li>three</li>\n</ol>\n</li>\n<li>four</li>\n</ul>',
+    '<p>a <a href="https://example.com/?a=1&amp;b=2" rel="nofollow noreferrer">link</a></p>',
+    "<img src='x.png' alt=\"a > b\" /><br/><hr>",
+    '<!-- a comment --><p>x</p><!-- -- odd -- --><!---->',
+    '<script>var a = "<p>not a tag</p>";</script><p>after</p>',
+    '<style>p > a { color: red }</style>text',
+    '<p>a < b and c > d</p>',
+    '<p>unclosed <b',
+    '<p>literal separator <\x00> in the text</p>',
+    '<p>NUL \x00 alone</p>',
+    '<![CDATA[ raw ]]><?pi x?><!DOCTYPE html><p>x</p>',
+    '<p>Unicode \u00e9\u4e2d\U0001F600 and \r\n line ends\r\n\r\n</p>',
+    '<blockquote>\n<p>quoted</p>\n</blockquote>\n\n\n\n<p>tail</p>\n',
+]
+
+
+def legacy_clean(text, newlines):
+    # What the parser did before TextCleaner: a fresh TagStripper per text, then the newline regex
+    stripper = TagStripper()
+    stripper.feed(text)
+    return NEWLINE.sub('\n' if newlines else ' ', stripper.get_data())
+
+
+@pytest.mark.parametrize('newlines', [True, False])
+def test_tricky_html(newlines):
+    cleaner = TextCleaner(newlines=newlines)
+    expected = [legacy_clean(text, newlines) for text in TRICKY]
+    assert [cleaner.clean(text) for text in TRICKY] == expected
+    assert cleaner.clean_batch(TRICKY) == expected
+    assert cleaner.clean_batch([None] + TRICKY + [None]) == [None] + expected + [None]
+
+
+@pytest.mark.parametrize('newlines', [True, False])
+def test_dump_bodies(dump, newlines):
+    texts = [atb['Body'] for atb in LineReader(dump['Posts'].as_posix(), fields={'Body'}) if 'Body' in atb]
+    cleaner = TextCleaner(newlines=newlines)
+    assert cleaner.clean_batch(texts) == [legacy_clean(text, newlines) for text in texts]
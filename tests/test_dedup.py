@@ -0,0 +1,65 @@
+import pytest
+
+from separser import StackExchangeParser
+from separser.utils import DedupStore
+
+
+def test_store(tmp_path):
+    store = DedupStore(tmp_path / 'a.bloom', capacity=1000, error_rate=0.01)
+    assert store.add('<p>a</p>') and not store.add('<p>a</p>')
+    # A held text is not in the store until it is committed, but is not handed out twice
+    assert store.hold('<p>b</p>') and not store.hold('<p>b</p>')
+    assert '<p>b</p>' not in store
+    store.commit('<p>b</p>')
+    assert '<p>b</p>' in store and not store.hold('<p>b</p>')
+    store.hold('<p>never emitted</p>')
+    store.close()
+
+    # The count in the header is current without a flush, and held texts were not added
+    reopened = DedupStore(tmp_path / 'a.bloom')
+    assert len(reopened) == 2 and '<p>never emitted</p>' not in reopened
+
+
+def test_second_run(dump, tmp_path):
+    def stream():
+        return StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                                   content_type='post_both', dedup=True)
+    first = list(stream())
+    assert first and not list(stream())
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'pipeline': 2}, {'splits': 2}])
+def test_closed_stream(dump, tmp_path, kwargs):
+    # Records read ahead but never handed over are emitted by the next run
+    def stream(**extra):
+        return StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                                   content_type='post_both', dedup=True, **extra)
+    full = list(StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                                    content_type='post_both'))
+    parser = stream(**kwargs)
+    first = [next(parser) for _ in range(20)]
+    parser.close()
+    rest = list(stream())
+    assert len(first) + len(rest) == len(full)
+
+
+def test_content_types(dump, tmp_path):
+    # Each content_type and newlines setting dedups against its own texts only, in the same project dir
+    def stream(content_type, newlines=True, dedup=True):
+        return list(StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                                        content_type=content_type, newlines=newlines, dedup=dedup))
+    assert stream('post_both')
+    assert stream('all_text') == stream('all_text', dedup=False)
+    assert stream('post_both', newlines=False) == stream('post_both', newlines=False, dedup=False)
+    assert not stream('post_both') and not stream('all_text') and not stream('post_both', newlines=False)
+
+
+def test_views(dump, tmp_path):
+    parser = StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                                 content_type='post_both', dedup=True)
+    assert list(parser)
+    views = {'both': {}, 'all': {'content_type': 'all_text'}, 'flat': {'newlines': False}}
+    parser = StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                                 content_type='post_both', dedup=True)
+    names = {name for name, _ in parser.iter_views(views)}
+    assert names == {'all', 'flat'}
@@ -0,0 +1,65 @@
+import re
+import shutil
+
+import pytest
+
+from separser import StackExchangeParser
+
+ROW_ID = re.compile(r' Id="([0-9]+)"')
+ACTIVITY = re.compile(r' LastActivityDate="[^"]*"')
+
+
+def _next_dump(path, to):
+    """
+    Write the next dump of Posts.xml: every 40th row deleted, every 25th touched since, and a new Question
+
+    :returns: Tuple of (set of deleted Ids, set of Ids new or changed)
+    """
+    deleted, changed, lines = set(), set(), []
+    with open(path, encoding='utf-8') as xf:
+        for line in xf:
+            match = ROW_ID.search(line)
+            if match is not None:
+                row_id = int(match.group(1))
+                if row_id % 40 == 0:
+                    deleted.add(row_id)
+                    continue
+                if row_id % 25 == 0:
+                    line = ACTIVITY.sub('', line).replace(' />', ' LastActivityDate="2030-01-01T00:00:00.000" />')
+                    changed.add(row_id)
+                last = row_id
+            if line.startswith('</posts>'):
+                lines.append('  <row Id="{}" PostTypeId="1" CreationDate="2030-01-02T00:00:00.000" Score="1" '
+                             'Body="&lt;p&gt;new&lt;/p&gt;" Title="A new question" Tags="&lt;python&gt;" '
+                             'AnswerCount="0" CommentCount="0" />\n'.format(last + 1))
+                changed.add(last + 1)
+            lines.append(line)
+    with open(to, 'w', encoding='utf-8') as xf:
+        xf.writelines(lines)
+    return deleted, changed
+
+
+@pytest.mark.parametrize('reader', ['iterparse', 'lines'])
+def test_delta(dump, tmp_path, reader):
+    current = tmp_path / 'dump' / 'synthetic_Posts.xml'
+    current.parent.mkdir()
+    shutil.copy(str(dump['Posts']), str(current))
+
+    def parser(**kwargs):
+        return StackExchangeParser(current.as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path / 'proj',
+                                   content_type='post_both', reader=reader, **kwargs)
+    first = parser(delta=True)
+    assert list(first) == list(parser()) and len(first.deleted_ids) == 0
+
+    deleted, changed = _next_dump(dump['Posts'], current)
+    second = parser(delta=True)
+    records = list(second)
+    assert records == [record for record in parser() if record['meta']['Id'] in changed]
+    # Changed Answers of unchanged Questions still have their Question's title
+    assert any(record['meta'].get('ParentTitle', None) for record in records)
+    assert sorted(second.deleted_ids) == sorted(deleted)
+    assert second.metrics['rows'] == second.metrics['emitted'] + sum(second.metrics['dropped'].values())
+
+    # Nothing has changed since
+    third = parser(delta=True)
+    assert list(third) == [] and len(third.deleted_ids) == 0
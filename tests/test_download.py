@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from separser.utils import RangeDownloader, DownloadError
+
+# Parts of 4 KB, so a small file is fetched in several ranges
+PART_SIZE = 4096 / 1024**2
+
+
+class _ArchiveHandler(BaseHTTPRequestHandler):
+    """
+    Serves server.data at any path, with Range and If-Range support unless server.ranges is False
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def _send_headers(self, status, length, content_range=None):
+        server = self.server
+        self.send_response(status)
+        self.send_header('Content-Length', str(length))
+        if server.etag:
+            self.send_header('ETag', server.etag)
+        if server.ranges:
+            self.send_header('Accept-Ranges', 'bytes')
+        if content_range:
+            self.send_header('Content-Range', content_range)
+        self.end_headers()
+
+    def do_HEAD(self):
+        server = self.server
+        self._send_headers(200, server.size if server.size is not None else len(server.data))
+
+    def do_GET(self):
+        server = self.server
+        data, requested = server.data, self.headers.get('Range', None)
+        server.requests.append(requested)
+        if_range = self.headers.get('If-Range', None)
+        if requested is None or not server.ranges or (if_range is not None and if_range != server.etag):
+            self._send_headers(200, len(data))
+            self.wfile.write(data)
+            return
+        if server.fail_after is not None and len(server.requests) > server.fail_after:
+            self._send_headers(503, 0)
+            return
+        start, end = (int(value) for value in requested.split('=')[1].split('-'))
+        end = min(end, len(data) - 1)
+        self._send_headers(206, end - start + 1, 'bytes {}-{}/{}'.format(start, end, len(data)))
+        self.wfile.write(data[start:end + 1])
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _ArchiveHandler)
+    httpd.data, httpd.etag, httpd.ranges = os.urandom(5 * 4096 + 123), '"v1"', True
+    httpd.size, httpd.fail_after, httpd.requests = None, None, []
+    httpd.url = 'http://127.0.0.1:{}/synthetic.stackexchange.com.7z'.format(httpd.server_address[1])
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _downloader(messages=None):
+    return RangeDownloader(connections=1, part_size=PART_SIZE, retries=1, timeout=10,
+                           log=messages.append if messages is not None else None)
+
+
+def test_ranges(server, tmp_path):
+    path = RangeDownloader(connections=3, part_size=PART_SIZE, timeout=10).download(server.url, tmp_path / 'a.7z')
+    assert path.read_bytes() == server.data
+    assert len(server.requests) == 6
+    assert not (tmp_path / 'a.7z.part').exists() and not (tmp_path / 'a.7z.part.json').exists()
+
+
+def test_resume(server, tmp_path):
+    path = tmp_path / 'a.7z'
+    server.fail_after = 2
+    with pytest.raises(DownloadError):
+        _downloader().download(server.url, path)
+    with open(str(path) + '.part.json') as sf:
+        assert sorted(json.load(sf)['done']) == [0, 1]
+
+    server.fail_after, server.requests = None, []
+    messages = []
+    assert _downloader(messages).download(server.url, path).read_bytes() == server.data
+    # Only the parts that were missing are fetched again
+    assert server.requests == ['bytes={}-{}'.format(start, min(start + 4096, len(server.data)) - 1)
+                               for start in range(2 * 4096, len(server.data), 4096)]
+    assert any('Resuming' in message for message in messages)
+
+
+def test_etag_change(server, tmp_path):
+    path = tmp_path / 'a.7z'
+    server.fail_after = 2
+    with pytest.raises(DownloadError):
+        _downloader().download(server.url, path)
+
+    # The archive is replaced on the server by one of the same size
+    server.data, server.etag = os.urandom(len(server.data)), '"v2"'
+    server.fail_after, server.requests = None, []
+    messages = []
+    assert _downloader(messages).download(server.url, path).read_bytes() == server.data
+    assert len(server.requests) == 6
+    assert any('has changed' in message for message in messages)
+
+
+def test_no_range_support(server, tmp_path):
+    server.ranges = False
+    messages = []
+    assert _downloader(messages).download(server.url, tmp_path / 'a.7z').read_bytes() == server.data
+    assert server.requests == [None]
+    assert any('does not accept range requests' in message for message in messages)
+
+
+def test_size_mismatch(server, tmp_path):
+    # The server announces more bytes than it sends
+    server.ranges, server.size = False, len(server.data) + 10
+    with pytest.raises(DownloadError):
+        _downloader().download(server.url, tmp_path / 'a.7z')
+    assert not (tmp_path / 'a.7z').exists()
@@ -0,0 +1,64 @@
+import sys
+
+import pytest
+
+from separser import StackExchangeParser
+from separser.utils import read_manifest, read_shards
+
+FORMATS = [('jsonl', None), ('jsonl', 'gzip'), ('jsonl', 'zstd'), ('parquet', None), ('parquet', 'snappy'),
+           ('parquet', 'zstd')]
+
+
+def _parser(dump, tmp_path, file_type='Posts', **kwargs):
+    content_type = {'Posts': 'post_both', 'Comments': 'comments_both', 'Tags': 'tags'}[file_type]
+    return StackExchangeParser(dump[file_type].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path / 'proj',
+                               content_type=content_type, **kwargs)
+
+
+@pytest.mark.parametrize('file_format, compression', FORMATS)
+@pytest.mark.parametrize('file_type', ['Posts', 'Comments', 'Tags'])
+def test_round_trip(dump, tmp_path, file_type, file_format, compression):
+    if file_format == 'parquet':
+        pytest.importorskip('pyarrow')
+    if compression == 'zstd':
+        pytest.importorskip('zstandard')
+    expected = list(_parser(dump, tmp_path, file_type))
+    # Shards of about 50 KB, so the records are spread over several of them
+    manifest = _parser(dump, tmp_path, file_type).export(tmp_path / 'out', file_format=file_format,
+                                                         compression=compression, shard_size=0.05, workers=3)
+    assert manifest['records'] == len(expected) == sum(shard['records'] for shard in manifest['shards'])
+    assert len(manifest['shards']) > 1 or file_type == 'Tags'
+    assert read_manifest(tmp_path / 'out') == manifest
+    assert list(read_shards(tmp_path / 'out')) == expected
+
+
+@pytest.mark.parametrize('file_format', ['jsonl', 'parquet'])
+def test_hashes(dump, tmp_path, file_format):
+    if file_format == 'parquet':
+        pytest.importorskip('pyarrow')
+    expected = list(_parser(dump, tmp_path, hashes=True))
+    _parser(dump, tmp_path, hashes=True).export(tmp_path / 'out', file_format=file_format, compression=None)
+    assert list(read_shards(tmp_path / 'out')) == expected
+
+
+def test_bad_settings(dump, tmp_path):
+    with pytest.raises(ValueError):
+        _parser(dump, tmp_path).export(tmp_path / 'out', file_format='csv')
+    with pytest.raises(ValueError):
+        _parser(dump, tmp_path).export(tmp_path / 'out', file_format='parquet', compression='bz2')
+
+
+@pytest.mark.parametrize('modules, extra, file_format, compression', [
+    (['zstandard'], 'zstd', 'jsonl', 'zstd'), (['pyarrow', 'pyarrow.parquet'], 'parquet', 'parquet', None)])
+def test_missing_extra(dump, tmp_path, monkeypatch, modules, extra, file_format, compression):
+    # A module set to None in sys.modules cannot be imported
+    for module in modules:
+        monkeypatch.setitem(sys.modules, module, None)
+    with pytest.raises(ImportError, match=r'stackexchangeparser\[{}\]'.format(extra)):
+        _parser(dump, tmp_path).export(tmp_path / 'out', file_format=file_format, compression=compression)
+
+
+def test_batches_extra(dump, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'numpy', None)
+    with pytest.raises(ImportError, match=r'stackexchangeparser\[batches\]'):
+        next(_parser(dump, tmp_path).iter_batches())
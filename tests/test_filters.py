@@ -0,0 +1,64 @@
+import pytest
+
+from separser import StackExchangeParser
+from separser.utils import RowFilter
+
+GRID = [{'tags': 'python'}, {'tags': ['sql', 'git']}, {'post_types': 1}, {'post_types': 2}, {'min_score': 5},
+        {'max_score': 0}, {'min_views': 1000}, {'created_from': '2014'}, {'created_before': '2012-06-01'},
+        {'accepted': True}, {'accepted': False},
+        {'tags': 'python', 'min_score': 5, 'post_types': 2, 'created_from': '2012', 'created_before': '2016'},
+        {'tags': 'sql', 'accepted': True, 'min_views': 500},
+        {'min_score': 3, 'max_score': 10, 'created_from': '2011-03'}]
+COMMENT_GRID = [{'tags': 'python'}, {'min_score': 3}, {'max_score': 1, 'created_from': '2013'},
+                {'tags': ['sql', 'git'], 'created_before': '2015'}]
+
+
+def _keep(meta, criteria):
+    # The criteria applied to a record the unfiltered parse gave
+    question = 'ParentId' not in meta and 'PostId' not in meta
+    tags = meta.get('Tags', meta.get('ParentTags', meta.get('PostTags', None)))
+    score = meta.get('PostScore', meta.get('Score', None))
+    checks = {'tags': lambda wanted: bool(tags) and any(tag in tags for tag in ([wanted] if isinstance(wanted, str)
+                                                                                 else wanted)),
+              'post_types': lambda wanted: (1 if question else 2) == wanted,
+              'min_score': lambda wanted: score >= wanted,
+              'max_score': lambda wanted: score <= wanted,
+              'min_views': lambda wanted: meta['Views'] >= wanted,
+              'created_from': lambda wanted: meta['CreationDate'] >= wanted,
+              'created_before': lambda wanted: meta['CreationDate'] < wanted,
+              'accepted': lambda wanted: not question or (meta['AcceptedAnswer'] is not None) == wanted}
+    return all(checks[name](wanted) for name, wanted in criteria.items())
+
+
+def _records(path, tmp_path, content_type, **kwargs):
+    return list(StackExchangeParser(path, 'synthetic.stackexchange.com', proj_dir=tmp_path, content_type=content_type,
+                                    **kwargs))
+
+
+@pytest.mark.parametrize('reader', ['iterparse', 'lines'])
+@pytest.mark.parametrize('criteria', GRID)
+def test_posts_grid(dump, tmp_path, reader, criteria):
+    path = dump['Posts'].as_posix()
+    full = _records(path, tmp_path, 'post_both', reader=reader)
+    expected = [record for record in full if _keep(record['meta'], criteria)]
+    assert 0 < len(expected) < len(full)
+    assert _records(path, tmp_path, 'post_both', reader=reader, filters=criteria) == expected
+    assert _records(path, tmp_path, 'post_both', reader=reader, filters=RowFilter(**criteria)) == expected
+
+
+@pytest.mark.parametrize('criteria', COMMENT_GRID)
+def test_comments_grid(dump, tmp_path, criteria):
+    path = dump['Comments'].as_posix()
+    full = _records(path, tmp_path, 'comments_both')
+    expected = [record for record in full if _keep(record['meta'], criteria)]
+    assert 0 < len(expected) < len(full)
+    assert _records(path, tmp_path, 'comments_both', filters=criteria) == expected
+
+
+def test_unusable_criteria(dump, tmp_path):
+    with pytest.raises(ValueError):
+        StackExchangeParser(dump['Comments'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                            content_type='comments_both', filters={'post_types': 2})
+    with pytest.raises(ValueError):
+        StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                            content_type='post_both', onlytags='python', filters={'tags': 'sql'})
@@ -0,0 +1,46 @@
+import pytest
+
+from separser import StackExchangeParser
+from separser.utils import TaskHasher
+
+TEXTS = ['<p>a</p>', '<p>b</p>', '', '<p>é 😀</p>', '<p>a</p>' * 1000]
+
+
+def test_signed_and_stable():
+    hasher = TaskHasher('synthetic.stackexchange.com', 'Posts')
+    inputs = [hasher.input_hash(i, text) for i, text in enumerate(TEXTS)]
+    tasks = [TaskHasher.task_hash(input_hash) for input_hash in inputs]
+    assert all(-2**31 <= value < 2**31 for value in inputs + tasks)
+    assert any(value < 0 for value in inputs + tasks)
+    # The same records hash the same in another hasher, and differently under other settings
+    assert inputs == [TaskHasher('synthetic.stackexchange.com', 'Posts').input_hash(i, text)
+                      for i, text in enumerate(TEXTS)]
+    assert hasher.input_hash('7', '<p>a</p>') == hasher.input_hash(7, '<p>a</p>')
+    for other in (TaskHasher('other.stackexchange.com', 'Posts'), TaskHasher('synthetic.stackexchange.com', 'Comments'),
+                  TaskHasher('synthetic.stackexchange.com', 'Posts', newlines=False)):
+        assert other.input_hash(1, '<p>b</p>') != inputs[1]
+    assert hasher.input_hash(2, '<p>b</p>') != inputs[1]
+
+
+def test_batch_equals_single():
+    hasher = TaskHasher('synthetic.stackexchange.com', 'Posts', newlines=False)
+    ids = list(range(len(TEXTS)))
+    inputs = hasher.input_hashes(ids, TEXTS)
+    assert inputs == [hasher.input_hash(i, text) for i, text in zip(ids, TEXTS)]
+    assert TaskHasher.task_hashes(inputs) == [TaskHasher.task_hash(input_hash) for input_hash in inputs]
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'reader': 'lines'}, {'pipeline': 2}, {'splits': 2}])
+def test_half_known(dump, tmp_path, monkeypatch, kwargs):
+    def stream(**extra):
+        return StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                                   content_type='post_both', hashes=True, **dict(kwargs, **extra))
+    records = list(stream())
+    known = {record['_input_hash'] for record in records[::2]}
+    # Each record is hashed once, in a batch
+    monkeypatch.setattr(TaskHasher, 'input_hash', None)
+    parser = stream(known_hashes=known)
+    rest = list(parser)
+    assert rest == records[1::2]
+    assert parser.metrics['dropped']['known'] == len(known)
+    assert all(record['_task_hash'] == TaskHasher.task_hash(record['_input_hash']) for record in rest)
@@ -0,0 +1,132 @@
+from xml.etree import ElementTree as ET
+
+import pytest
+
+from separser import StackExchangeParser
+from separser.utils import CommentIndex, OffsetReader, PostLookup, TagIndex, iterparse_rows
+
+
+def _tags(atb):
+    return [tag for tag in atb.get('Tags', '').strip('<>').split('><') if tag]
+
+
+def test_comment_index(dump):
+    # The same comments, in the same order, as the XPath scan of the Comments tree the parser used to run per post
+    root = ET.parse(dump['Comments'].as_posix()).getroot()
+    index = CommentIndex.from_xml(dump['Comments'].as_posix())
+    post_ids = {atb['PostId'] for atb in iterparse_rows(dump['Comments'].as_posix())}
+    assert len(index) == len(post_ids)
+    for post_id in sorted(post_ids, key=int) + ['0', '999999']:
+        expected = [comment.attrib['Text'] for comment in root.findall("*[@PostId='{}']".format(post_id))]
+        assert index.get(post_id) == expected and (post_id in index) == bool(expected)
+    # Out of order lookups find the same comments
+    assert [index.get(post_id) for post_id in sorted(post_ids)] == \
+        [[c.attrib['Text'] for c in root.findall("*[@PostId='{}']".format(post_id))] for post_id in sorted(post_ids)]
+
+
+@pytest.mark.parametrize('reader', ['iterparse', 'lines'])
+def test_all_text(dump, tmp_path, reader):
+    # The text of every all_text record is the one the per post XPath scan gave
+    root = ET.parse(dump['Comments'].as_posix()).getroot()
+    posts = {atb['Id']: atb for atb in iterparse_rows(dump['Posts'].as_posix())}
+    records = list(StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                                       content_type='all_text', reader=reader))
+    assert records
+    for record in records:
+        meta = record['meta']
+        atb = posts[str(meta['Id'])]
+        title = meta.get('Title', meta.get('ParentTitle', None))
+        comments = [comment.attrib['Text'] for comment in root.findall("*[@PostId='{}']".format(meta['Id']))] \
+            if int(atb.get('CommentCount', 0)) > 0 else []
+        if comments:
+            expected = title + '\n' + atb['Body'] + '\n'.join(comments)
+        else:
+            expected = '\n'.join(part for part in (title, atb.get('Body', None)) if part)
+        assert record['html'] == expected
+
+
+def test_post_lookup(dump):
+    rows = list(iterparse_rows(dump['Posts'].as_posix()))
+    lookup = PostLookup.from_xml(dump['Posts'].as_posix())
+    # Questions, and the odd other post with a Title or Tags, are kept
+    kept = [atb for atb in rows if 'Title' in atb or 'Tags' in atb]
+    assert len(lookup) == len(kept)
+    for atb in rows:
+        if 'Title' in atb or 'Tags' in atb:
+            assert lookup.get(atb['Id']) == (atb.get('Title', None), _tags(atb) or None) and int(atb['Id']) in lookup
+        else:
+            assert lookup.get(atb['Id']) is None and atb['Id'] not in lookup
+
+
+@pytest.mark.parametrize('content_type', ['comments_both', 'comments_body'])
+def test_comment_parents(dump, tmp_path, content_type):
+    # The parent title, tags and text of every comment are the ones the search of the Posts tree by Id gave
+    root = ET.parse(dump['Posts'].as_posix()).getroot()
+    records = list(StackExchangeParser(dump['Comments'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                                       content_type=content_type))
+    assert len(records) == sum(1 for _ in iterparse_rows(dump['Comments'].as_posix()))
+    comments = {atb['Id']: atb for atb in iterparse_rows(dump['Comments'].as_posix())}
+    for record in records:
+        meta = record['meta']
+        parent = root.find("*[@Id='{}']".format(meta['PostId']))
+        title, tags = parent.attrib.get('Title', ''), _tags(parent.attrib) or ''
+        body = comments[str(meta['Id'])]['Text']
+        assert (meta['PostTitle'], meta['PostTags']) == (title, tags)
+        assert record['html'] == (title + '\n' + body if content_type == 'comments_both' and title else body)
+
+
+@pytest.fixture(scope='module')
+def tag_index(dump):
+    return TagIndex.from_xml(dump['Posts'], dump['Tags'].as_posix(), synonyms={'py': 'python'})
+
+
+def test_tag_offsets(dump, tag_index):
+    # The rows at the offsets of a tag are its Questions and their Answers, in file order
+    rows = list(iterparse_rows(dump['Posts'].as_posix()))
+    tagged = {}
+    for atb in rows:
+        if atb['PostTypeId'] == '1':
+            tagged[atb['Id']] = _tags(atb)
+    for tag in ('python', 'sql', 'c++'):
+        expected = [atb for atb in rows if tag in tagged.get(atb['Id'] if atb['PostTypeId'] == '1'
+                                                             else atb.get('ParentId'), [])]
+        assert expected and list(OffsetReader(dump['Posts'].as_posix(), tag_index.offsets([tag]))) == expected
+    assert tag_index.count('py') == tag_index.count('python') > 0 and 'py' in tag_index
+    assert 'missing' not in tag_index and len(tag_index.offsets(['missing'])) == 0
+
+
+def test_save_load(tag_index, tmp_path):
+    tag_index.save(tmp_path / 'posts.tags')
+    loaded = TagIndex.load(tmp_path / 'posts.tags')
+    assert loaded.tags.names == tag_index.tags.names and loaded.counts == tag_index.counts
+    assert loaded.synonyms == {'py': 'python'} and loaded.source == tag_index.source
+    assert all(loaded.offsets_of(tag_id) == tag_index.offsets_of(tag_id) for tag_id in range(len(tag_index)))
+    assert loaded.offsets(['py', 'sql']) == tag_index.offsets(['python', 'sql'])
+    assert TagIndex.load(tmp_path / 'missing.tags') is None
+
+
+@pytest.mark.parametrize('content_type', ['post_both', 'post_title'])
+def test_onlytags(dump, tmp_path, content_type):
+    def stream(**kwargs):
+        return list(StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                                        content_type=content_type, reader='lines', **kwargs))
+    expected = stream(onlytags=['python', 'sql'])
+    assert expected
+    assert stream(onlytags=['python', 'sql'], tag_index=True) == expected
+    assert stream(filters={'tags': 'python', 'min_score': 5}, tag_index=True) == \
+        stream(filters={'tags': 'python', 'min_score': 5})
+
+
+def test_synonyms(dump, tmp_path):
+    def parser(**kwargs):
+        return StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                                   content_type='post_both', reader='lines', **kwargs)
+    expected = list(parser(onlytags='python'))
+    assert list(parser(onlytags='python', tag_index=True)) == expected
+    # The index was built without synonyms, and is built again with them
+    synonyms = {'py': 'python', 'py3': 'python'}
+    stream = parser(onlytags=['py', 'py3'], tag_index=True, tag_synonyms=synonyms)
+    assert list(stream) == expected and stream.tag_index.synonyms == synonyms
+    assert list(parser(onlytags='py', tag_synonyms=synonyms)) == expected
+    views = parser(tag_synonyms=synonyms).iter_views({'py': {'onlytags': 'py'}})
+    assert [record for _, record in views] == expected
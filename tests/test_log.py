@@ -0,0 +1,14 @@
+from separser import StackExchangeParser
+from separser import stackExchangeParser as module
+
+
+def test_log_is_lazy(dump, tmp_path, monkeypatch):
+    # Resolving the log may import Prodigy, so the constructor leaves it until a message is logged
+    resolved = []
+    monkeypatch.setattr(module, 'get_log', lambda name, log_dir=None: resolved.append(name) or [].append)
+    parser = StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path)
+    assert resolved == []
+    parser.prepare()
+    assert resolved == ['synthetic.stackexchange.com']
+    list(parser)
+    assert len(resolved) == 1
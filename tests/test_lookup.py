@@ -0,0 +1,53 @@
+from collections import defaultdict
+
+import pytest
+
+from separser import StackExchangeParser
+
+
+def _parser(dump, tmp_path, path=None, content_type='post_both', **kwargs):
+    return StackExchangeParser((path or dump['Posts']).as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                               content_type=content_type, **kwargs)
+
+
+@pytest.mark.parametrize('content_type', ['post_both', 'post_title', 'all_text'])
+def test_get_post(dump, tmp_path, content_type):
+    streamed = list(_parser(dump, tmp_path, content_type=content_type))
+    parser = _parser(dump, tmp_path, content_type=content_type)
+    assert [parser.get_post(record['meta']['Id']) for record in streamed] == streamed
+    assert parser.get_post(10**9) is None
+    # The index is kept in proj_dir and used by the next parser
+    assert _parser(dump, tmp_path, content_type=content_type).get_post(streamed[-1]['meta']['Id']) == streamed[-1]
+
+
+def test_get_thread(dump, tmp_path):
+    streamed = list(_parser(dump, tmp_path))
+    answers = defaultdict(list)
+    for record in streamed:
+        if 'ParentId' in record['meta']:
+            answers[record['meta']['ParentId']].append(record)
+    comments = defaultdict(list)
+    for comment in _parser(dump, tmp_path, dump['Comments'], 'comments_body'):
+        comments[comment['meta']['PostId']].append(comment)
+
+    parser = _parser(dump, tmp_path)
+    questions = [record for record in streamed if 'ParentId' not in record['meta']]
+    for question in questions[::7]:
+        meta = question['meta']
+        thread = parser.get_thread(meta['Id'])
+        assert thread['question'] == question
+        assert thread['answers'] == answers[meta['Id']]
+        # The Comments of the thread carry the Question's title and tags, whichever post they are on
+        assert sorted(thread['comments']) == sorted([meta['Id']] + [a['meta']['Id'] for a in answers[meta['Id']]])
+        for post_id, found in thread['comments'].items():
+            expected = [dict(comment, meta=dict(comment['meta'], PostTitle=meta['Title'], PostTags=meta['Tags']))
+                        for comment in comments[post_id]]
+            assert found == expected
+        # An Answer finds the thread of its Question
+        for answer in answers[meta['Id']][:1]:
+            assert parser.get_thread(answer['meta']['Id']) == thread
+    assert parser.get_thread(10**9) is None
+
+    # A parser of the Comments file reads the same threads
+    comments_parser = _parser(dump, tmp_path, dump['Comments'], 'comments_both')
+    assert comments_parser.get_thread(questions[0]['meta']['Id']) == parser.get_thread(questions[0]['meta']['Id'])
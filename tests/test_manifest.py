@@ -0,0 +1,118 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from separser import StackExchangeParser
+from separser.utils import CommunityManifest, fetch_listing, parse_listing
+
+# A small archive.org directory listing, in the layout parse_listing reads
+LISTING = """<html><body><div class="download-directory-listing">
+<table class="directory-listing-table"><tbody>
+{}
+</tbody></table></div></body></html>""".format('\n'.join(
+    '<tr>\n<td><a href="{0}">{0}</a></td>\n<td>01-Sep-2019 12:00</td>\n<td>1.0M</td>\n</tr>'.format(name)
+    for name in ('synthetic.stackexchange.com.7z', 'example.stackexchange.com.7z', 'Sites.xml')))
+
+
+class _ListingHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests += 1
+        body = LISTING.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def archive():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _ListingHandler)
+    httpd.requests = 0
+    httpd.url = 'http://127.0.0.1:{}/download/stackexchange/'.format(httpd.server_address[1])
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _age(path, hours):
+    # Move the time the cache was fetched back by hours
+    with open(path) as mf:
+        cached = json.load(mf)
+    cached['fetched'] -= hours * 3600
+    with open(path, 'w') as mf:
+        json.dump(cached, mf)
+
+
+def test_fetch(archive):
+    communities, date = fetch_listing(archive.url)
+    assert communities == ['synthetic.stackexchange.com', 'example.stackexchange.com']
+    assert date == parse_listing(LISTING)[1]
+
+
+def test_cache_and_ttl(archive, tmp_path):
+    path = tmp_path / 'communities.json'
+    manifest = CommunityManifest(path, url=archive.url, ttl=1)
+    fetch = lambda: fetch_listing(archive.url)  # noqa: E731
+    communities, date = manifest.load(fetch)
+    assert manifest.source == 'archive' and 'synthetic.stackexchange.com' in communities
+
+    assert manifest.load(fetch) == (communities, date)
+    assert manifest.source == 'cache' and archive.requests == 1
+
+    _age(path, 2)
+    assert manifest.load(fetch) == (communities, date)
+    assert manifest.source == 'archive' and archive.requests == 2
+
+    # A cache of another archive is not used
+    other = CommunityManifest(path, url=archive.url + 'other/', ttl=1)
+    assert other.load(lambda: (['other.stackexchange.com'], '20200101'))[0] == {'other.stackexchange.com'}
+    assert other.source == 'archive'
+
+
+def test_offline_fallback(archive, tmp_path):
+    path = tmp_path / 'communities.json'
+    fetch = lambda: fetch_listing(archive.url, timeout=5)  # noqa: E731
+    communities, date = CommunityManifest(path, url=archive.url, ttl=1).load(fetch)
+    _age(path, 2)
+    archive.shutdown()
+    archive.server_close()
+
+    # The archive cannot be reached, so the stale cache is used
+    manifest = CommunityManifest(path, url=archive.url, ttl=1)
+    assert manifest.load(fetch) == (communities, date)
+    assert manifest.source == 'stale cache'
+
+    # Offline, the cache is used however old it is, and nothing is fetched
+    manifest = CommunityManifest(path, url=archive.url, ttl=1)
+    assert manifest.load(None, offline=True) == (communities, date)
+    assert manifest.source == 'cache'
+
+    # Without a cache, offline mode knows no communities, and a failed fetch is raised
+    manifest = CommunityManifest(tmp_path / 'missing.json', url=archive.url, ttl=1)
+    assert manifest.load(None, offline=True) == (set(), None)
+    with pytest.raises(OSError):
+        manifest.load(fetch)
+
+
+def test_verify_community_names(archive, dump, tmp_path):
+    parser = StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                                 archive_url=archive.url)
+    assert parser._verify_community_names('synthetic_stackexchange_com') == 'synthetic.stackexchange.com'
+    with pytest.raises(ValueError):
+        parser._verify_community_names('missing.stackexchange.com')
+    assert archive.requests == 1
+
+    # A second parser in the same project dir checks names against the cached set
+    parser = StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                                 archive_url=archive.url)
+    assert parser._verify_community_names('example.stackexchange.com') == 'example.stackexchange.com'
+    assert parser.manifest.source == 'cache' and archive.requests == 1
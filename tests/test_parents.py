@@ -0,0 +1,78 @@
+import os
+import pickle
+import random
+
+from separser import StackExchangeParser
+from separser.utils import ParentCache
+
+
+def _calls(seed=0, questions=2000):
+    # Questions with a few Answers each, most soon after their Question, some much later or never
+    rng = random.Random(seed)
+    calls, pending, late = [], [], []
+    for post_id in range(1, questions + 1):
+        answers = rng.randint(1, 4)
+        calls.append(('add', post_id, 'title {}'.format(post_id), rng.sample(['python', 'sql', 'git', 'c++'], 2),
+                      answers))
+        (late if post_id % 10 == 0 else pending).extend([post_id] * rng.randint(0, answers))
+        rng.shuffle(pending)
+        while pending and rng.random() < 0.7:
+            calls.append(('answer', pending.pop()))
+    calls.extend(('answer', post_id) for post_id in pending + late + [0, questions + 1])
+    return calls
+
+
+def _run(cache, calls):
+    results = []
+    for call in calls:
+        if call[0] == 'add':
+            cache.add(*call[1:])
+        else:
+            results.append(cache.answer(call[1]))
+    return results
+
+
+def test_spill_equals_unbounded(tmp_path):
+    calls = _calls()
+    unbounded = ParentCache(directory=tmp_path)
+    expected = _run(unbounded, calls)
+    assert unbounded.spilled == 0 and unbounded._store is None
+
+    cache = ParentCache(max_bytes=16 * 1024, directory=tmp_path)
+    assert _run(cache, calls) == expected
+    stats = cache.stats
+    assert stats['spilled'] > 0 and stats['disk_hits'] > 0 and stats['bytes'] <= 16 * 1024
+    answers = sum(1 for call in calls if call[0] == 'answer')
+    assert stats['hits'] + stats['disk_hits'] + stats['misses'] == answers
+    assert stats['misses'] == unbounded.misses >= 2
+    assert stats['hits'] + stats['disk_hits'] == unbounded.hits
+    assert len(cache) == len(unbounded) == stats['entries'] + stats['stored']
+
+    path = cache._store_path
+    assert os.path.exists(path)
+    cache.close()
+    assert not os.path.exists(path)
+
+
+def test_pickle(tmp_path):
+    # A checkpoint keeps the entries in memory and on disk
+    calls = _calls(seed=1)
+    cache = ParentCache(max_bytes=16 * 1024, directory=tmp_path)
+    half = len(calls) // 2
+    _run(cache, calls[:half])
+    assert cache.stored
+    restored = pickle.loads(pickle.dumps(cache))
+    assert len(restored) == len(cache)
+    assert _run(restored, calls[half:]) == _run(cache, calls[half:])
+
+
+def test_parser_spill(dump, tmp_path):
+    def parser(**kwargs):
+        return StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                                   content_type='post_both', **kwargs)
+    expected = list(parser())
+    # A budget of 2 KB holds a handful of Questions
+    small = parser(cache_size=2 / 1024)
+    assert list(small) == expected
+    stats = small.parent_post_attribs.stats
+    assert stats['spilled'] > 0 and stats['disk_hits'] > 0
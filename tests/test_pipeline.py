@@ -0,0 +1,63 @@
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from separser import StackExchangeParser
+
+
+def _stream(dump, tmp_path, **kwargs):
+    return StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                               content_type='post_both', pipeline=2, **kwargs)
+
+
+def _stage_threads(before, timeout=5):
+    # The stages take a moment to wind down once they are stopped
+    deadline = time.monotonic() + timeout
+    while threading.active_count() > before and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return threading.active_count() - before
+
+
+def test_pipeline_matches_sequential(dump, tmp_path):
+    sequential = list(StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com',
+                                          proj_dir=tmp_path, content_type='post_both'))
+    assert list(_stream(dump, tmp_path)) == sequential
+
+
+def test_early_close(dump, tmp_path):
+    before = threading.active_count()
+    stream = iter(_stream(dump, tmp_path))
+    for _ in range(10):
+        next(stream)
+    stream.close()
+    assert _stage_threads(before) == 0
+
+
+def test_parser_close(dump, tmp_path):
+    before = threading.active_count()
+    parser = _stream(dump, tmp_path)
+    next(parser)
+    parser.close()
+    assert _stage_threads(before) == 0
+
+
+def test_abandoned_stream(dump, tmp_path):
+    # The way Prodigy reads a loader: next() on the parser, which is then dropped without closing it
+    before = threading.active_count()
+    parser = _stream(dump, tmp_path)
+    next(parser)
+    del parser
+    assert _stage_threads(before) == 0
+
+
+def test_open_stream_at_exit(dump, tmp_path):
+    # A stream still open when the interpreter exits must not hang the exit
+    script = ("import sys; sys.path.insert(0, {root!r})\n"
+              "from separser import StackExchangeParser\n"
+              "parser = StackExchangeParser({path!r}, 'synthetic.stackexchange.com', proj_dir={proj!r}, "
+              "content_type='post_both', pipeline=2)\n"
+              "next(parser)\n").format(root=str(Path(__file__).absolute().parents[1]),
+                                       path=dump['Posts'].as_posix(), proj=str(tmp_path))
+    subprocess.run([sys.executable, '-c', script], check=True, timeout=60)
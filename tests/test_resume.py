@@ -0,0 +1,55 @@
+import pytest
+
+from separser import StackExchangeParser
+
+
+def _records(dump, tmp_path, **kwargs):
+    return list(StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                                    content_type='post_both', **kwargs))
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'reader': 'lines'}, {'splits': 2}, {'onlytags': ['python']},
+                                    {'splits': 2, 'onlytags': ['python']}])
+def test_resume_from_id(dump, tmp_path, kwargs):
+    # Answers after the resume point keep the title and tags of their Question before it
+    full = _records(dump, tmp_path, **kwargs)
+    resume_id = sorted(int(record['meta']['Id']) for record in full)[len(full) // 2]
+    after = [record for record in full if int(record['meta']['Id']) > resume_id]
+
+    def key(record):
+        return int(record['meta']['Id'])
+    resumed = _records(dump, tmp_path, resume_from={'Id': resume_id}, **kwargs)
+    assert sorted(resumed, key=key) == sorted(after, key=key)
+
+
+def test_resume_metrics(dump, tmp_path):
+    parser = StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                                 content_type='post_both', resume_from={'Id': 500})
+    records = list(parser)
+    metrics = parser.metrics
+    assert metrics['emitted'] == len(records)
+    assert metrics['rows'] == metrics['emitted'] + sum(metrics['dropped'].values())
+    assert metrics['dropped']['resume'] > 0
+
+
+@pytest.mark.parametrize('resume', ['Checkpoint', 'Id'])
+def test_checkpoint_metrics(dump, tmp_path, resume):
+    # Stop part way through a parse that saves checkpoints, then resume from the last one
+    full = _records(dump, tmp_path / 'full', reader='lines')
+    stream = iter(StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                                      content_type='post_both', reader='lines', checkpoint=100))
+    first = [next(stream) for _ in range(len(full) // 2)]
+    stream.close()
+    resume_from = {'Checkpoint': None} if resume == 'Checkpoint' else {'Id': int(first[-1]['meta']['Id'])}
+    parser = StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                                 content_type='post_both', reader='lines', resume_from=resume_from)
+    records = list(parser)
+    if resume == 'Id':
+        assert records == full[len(first):]
+    else:
+        # Records yielded after the checkpoint was taken are yielded again
+        assert records == full[len(full) - len(records):] and len(records) >= len(full) - len(first)
+    metrics = parser.metrics
+    assert metrics['rows'] == parser.total and metrics['emitted'] == len(records)
+    assert metrics['rows'] == metrics['emitted'] + sum(metrics['dropped'].values())
+    assert metrics['dropped']['resume'] > 0
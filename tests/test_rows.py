@@ -0,0 +1,72 @@
+import io
+import shutil
+import subprocess
+import sys
+from array import array
+
+import pytest
+
+from separser import StackExchangeParser
+from separser.utils import LineReader, OffsetReader, iterparse_rows
+from separser.utils.utils import _ArchiveStream
+
+
+def _stream(path):
+    # The same file object ArchiveMember.open returns, over a process that writes the file to stdout like 7z e -so
+    call = [sys.executable, '-c', 'import shutil, sys; shutil.copyfileobj(open(sys.argv[1], "rb"), sys.stdout.buffer)',
+            str(path)]
+    return io.BufferedReader(_ArchiveStream(call), buffer_size=1024 * 1024)
+
+
+@pytest.mark.parametrize('file_type', ['Posts', 'Comments', 'Tags'])
+def test_lines_equals_iterparse(dump, file_type):
+    path = dump[file_type].as_posix()
+    assert list(LineReader(path)) == list(iterparse_rows(path))
+
+
+@pytest.mark.parametrize('file_type', ['Posts', 'Comments'])
+def test_lines_on_stream(dump, file_type):
+    reader = LineReader(_stream(dump[file_type]))
+    assert list(reader) == list(iterparse_rows(dump[file_type].as_posix()))
+    assert reader.root == file_type.lower()
+
+
+def test_offsets_need_seek(dump):
+    with pytest.raises(ValueError):
+        list(LineReader(_stream(dump['Posts']), start=100))
+    with pytest.raises(ValueError):
+        list(OffsetReader(_stream(dump['Posts']), array('q', [100])))
+
+
+def test_offset_reader(dump):
+    # Rows read at their offsets are the same as the rows read in turn
+    path = dump['Posts'].as_posix()
+    offsets, offset = array('q'), 0
+    with open(path, 'rb') as xf:
+        for line in xf:
+            if line.lstrip().startswith(b'<row'):
+                offsets.append(offset + len(line) - len(line.lstrip()))
+            offset += len(line)
+    every_other = offsets[::2]
+    assert list(OffsetReader(path, every_other)) == list(LineReader(path))[::2]
+
+
+@pytest.mark.skipif(shutil.which('7z') is None, reason='needs 7-Zip')
+@pytest.mark.parametrize('content_type', ['post_both', 'all_text', 'comments_both'])
+def test_lines_on_archive(dump, tmp_path, capfd, content_type):
+    archive = tmp_path / 'synthetic.stackexchange.com.7z'
+    for file_type in ('Posts', 'Comments'):
+        member = tmp_path / '{}.xml'.format(file_type)
+        shutil.copy(str(dump[file_type]), str(member))
+        subprocess.run([shutil.which('7z'), 'a', '-bd', str(archive), str(member)], check=True,
+                       stdout=subprocess.DEVNULL)
+        member.unlink()
+    source = dump['Comments'] if 'comments' in content_type else dump['Posts']
+    expected = list(StackExchangeParser(source.as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path / 'a',
+                                        content_type=content_type, offline=True))
+    # The archive listing is read from the process's stdout, which pytest otherwise captures
+    with capfd.disabled():
+        streamed = list(StackExchangeParser(archive.as_posix(), 'synthetic.stackexchange.com',
+                                            proj_dir=tmp_path / 'b', content_type=content_type, offline=True,
+                                            extract=False, reader='lines'))
+    assert streamed == expected
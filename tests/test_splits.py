@@ -0,0 +1,69 @@
+import pytest
+
+import separser.stackExchangeParser as module
+from separser import StackExchangeParser
+from separser.utils import generate_file_markers
+
+
+@pytest.fixture
+def small_ranges(monkeypatch):
+    # Ranges of 16 KB, so the test dump is split across many of them and Answers fall in other ranges than their
+    # Questions
+    monkeypatch.setattr(module, 'generate_file_markers',
+                        lambda path, mem_size: generate_file_markers(path, mem_size=16, mem_unit='KB'))
+
+
+def _records(dump, tmp_path, **kwargs):
+    return list(StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                                    **kwargs))
+
+
+def _key(record):
+    return record['meta']['Id']
+
+
+def test_markers(dump):
+    path = dump['Posts'].as_posix()
+    markers = generate_file_markers(path, mem_size=16, mem_unit='KB')
+    with open(path, 'rb') as xf:
+        data = xf.read()
+    assert len(markers) > 4 and markers[0][0] == 0 and markers[-1][1] == len(data)
+    assert all(end == start for (_, end), (start, _) in zip(markers, markers[1:]))
+    assert all(data[start - 1:start] == b'\n' for start, _ in markers[1:])
+
+
+@pytest.mark.parametrize('content_type', ['post_title', 'post_body', 'post_both'])
+@pytest.mark.parametrize('reader', ['iterparse', 'lines'])
+def test_splits_equal_sequential(dump, tmp_path, small_ranges, content_type, reader):
+    sequential = _records(dump, tmp_path, content_type=content_type, reader=reader)
+    assert _records(dump, tmp_path, content_type=content_type, reader=reader, splits=2) == sequential
+
+
+@pytest.mark.parametrize('kwargs', [{'onlytags': ['python', 'sql']}, {'filters': {'min_score': 5, 'post_types': 2}}])
+def test_splits_filters(dump, tmp_path, small_ranges, kwargs):
+    sequential = _records(dump, tmp_path, content_type='post_both', **kwargs)
+    assert _records(dump, tmp_path, content_type='post_both', splits=3, **kwargs) == sequential
+
+
+@pytest.mark.parametrize('order', ['completed', 'split', 'ending', 'shuffle'])
+def test_splits_orders(dump, tmp_path, small_ranges, order):
+    # The same records in another order. Answers only have their Question's title and tags when its range came out
+    # first.
+    sequential = {_key(record): record for record in _records(dump, tmp_path, content_type='post_both')}
+    split = _records(dump, tmp_path, content_type='post_both', splits=3, order=order)
+    assert sorted(_key(record) for record in split) == sorted(sequential)
+    for record in split:
+        expected = sequential[_key(record)]
+        if record != expected:
+            meta = record['meta']
+            assert 'ParentId' in meta and meta['ParentTitle'] is None and meta['ParentTags'] is None
+            assert record['html'] == expected['html'].split('\n', 1)[1]
+
+
+def test_splits_metrics(dump, tmp_path, small_ranges):
+    parser = StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path,
+                                 content_type='post_both', splits=2, onlytags='python')
+    records = list(parser)
+    metrics = parser.metrics
+    assert metrics['emitted'] == len(records)
+    assert metrics['rows'] == metrics['emitted'] + sum(metrics['dropped'].values())
@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+from separser import StackExchangeParser
+
+VIEWS = {'titles': {'content_type': 'post_title'},
+         'bodies': {'content_type': 'post_body', 'newlines': False},
+         'both': {'content_type': 'post_both'},
+         'python': {'content_type': 'post_both', 'filters': {'tags': 'python', 'min_score': 5}},
+         'answers': {'content_type': 'post_body', 'onlytags': ['git'], 'filters': {'post_types': 2}},
+         'all': {'content_type': 'all_text', 'newlines': False}}
+
+
+def _parser(dump, tmp_path, **kwargs):
+    return StackExchangeParser(dump['Posts'].as_posix(), 'synthetic.stackexchange.com', proj_dir=tmp_path, **kwargs)
+
+
+def _separate(dump, tmp_path, **kwargs):
+    # Each view parsed on its own, with its filters on top of the parser's
+    expected = {}
+    for name, view in VIEWS.items():
+        settings = dict(kwargs, **view)
+        if 'filters' in kwargs and 'filters' in view:
+            settings['filters'] = dict(kwargs['filters'], **view['filters'])
+        expected[name] = list(_parser(dump, tmp_path, **settings))
+    return expected
+
+
+@pytest.mark.parametrize('reader', ['iterparse', 'lines'])
+@pytest.mark.parametrize('kwargs', [{}, {'filters': {'min_score': 3}}])
+def test_views_equal_separate_parses(dump, tmp_path, reader, kwargs):
+    expected = _separate(dump, tmp_path, reader=reader, **kwargs)
+    parser = _parser(dump, tmp_path, reader=reader, content_type='post_title', **kwargs)
+    got = {name: [] for name in VIEWS}
+    for name, record in parser.iter_views(VIEWS):
+        got[name].append(record)
+    assert got == expected
+    assert all(expected.values())
+    metrics = parser.metrics
+    assert metrics['rows'] == metrics['emitted'] + sum(metrics['dropped'].values())
+
+
+def test_split_views(dump, tmp_path):
+    expected = _separate(dump, tmp_path)
+    iterators = _parser(dump, tmp_path).split_views(VIEWS)
+    got = {}
+    threads = [threading.Thread(target=lambda name=name: got.__setitem__(name, list(iterators[name])))
+               for name in VIEWS]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert got == expected
+
+
+def test_fan_out(dump, tmp_path):
+    expected = _separate(dump, tmp_path)
+    got = {name: [] for name in VIEWS}
+    counts = _parser(dump, tmp_path).fan_out(VIEWS, {name: got[name].append for name in VIEWS})
+    assert got == expected
+    assert counts == {name: len(records) for name, records in expected.items()}
+
+
+@pytest.mark.parametrize('views', [{'x': {'content_type': 'comments_body'}}, {'x': {'colour': 1}}, {}])
+def test_bad_views(dump, tmp_path, views):
+    with pytest.raises(ValueError):
+        next(_parser(dump, tmp_path).iter_views(views))